@@ -0,0 +1,276 @@
+"""Gradient backends
+
+Each backend evaluates a target :class:`model.Model` and provides the
+unnormalized log posterior (``log_posterior``), its gradient w.r.t.
+parameters (``grad``) and both of them from one forward pass
+(``value_and_grad``), with the same signature as :func:`model.calc_grad`.
+Parameters may be of shape ``(D, )`` or ``(K, D)``, in which case all
+``K`` chains are evaluated against the minibatch in one call.
+
+* ``chainer``: builds the computational graph of
+  :func:`model.calc_log_posterior` and runs ``backward()``.
+  Chainer is imported when the backend is created.
+  Kept as the reference implementation of the Gaussian mixture, which is
+  the only model it supports.
+* ``numpy``: closed-form, vectorized evaluation by the model itself
+  (e.g. :func:`model.calc_log_posterior_numpy` for the mixture).
+* ``sharded``: same as ``numpy``, but large minibatches are split into
+  chunks whose log likelihood and gradient are summed on a thread pool.
+
+:class:`ControlVariate` wraps any backend to reduce the variance of
+minibatch gradients.
+"""
+
+from multiprocessing import pool as mp_pool
+
+import numpy
+import six
+
+import model
+
+
+class ChainerBackend(object):
+
+    name = 'chainer'
+
+    def __init__(self, target=None):
+        if (target is not None
+                and not isinstance(target, model.GaussianMixture)):
+            raise ValueError('chainer backend only supports the Gaussian '
+                             'mixture')
+        self.model = model.GaussianMixture()
+        import chainer
+        self._chainer = chainer
+
+    def log_posterior(self, theta, x, n=None):
+        theta = self._chainer.Variable(numpy.array(theta, dtype=numpy.float32))
+        return model.calc_log_posterior(theta, x, n).data
+
+    def grad(self, theta, x, n=None):
+        return model.calc_grad(theta, x, n)
+
+    def value_and_grad(self, theta, x, n=None):
+        return model.calc_log_posterior_and_grad(theta, x, n)
+
+
+class NumpyBackend(object):
+
+    name = 'numpy'
+
+    def __init__(self, target=None):
+        self.model = model.GaussianMixture() if target is None else target
+
+    def log_posterior(self, theta, x, n=None):
+        return self.model.log_posterior(theta, x, n)
+
+    def grad(self, theta, x, n=None):
+        return self.model.grad(theta, x, n)
+
+    def value_and_grad(self, theta, x, n=None):
+        return self.model.value_and_grad(theta, x, n)
+
+
+class ShardedBackend(NumpyBackend):
+    """NumPy backend reducing per-chunk partial sums on a thread pool
+
+    Data are split into chunks of ``chunk_size`` points. The log
+    likelihood and its gradient summed over each chunk are computed by
+    worker threads (NumPy releases the GIL in array operations) and
+    added up in chunk order, so results do not depend on the number of
+    threads. Temporaries are of size ``O(threads * K * chunk_size)``
+    regardless of the data size. Minibatches of at most one chunk are
+    evaluated directly on the calling thread.
+
+    The thread pool is started on first use and stopped by :meth:`close`,
+    or on leaving a ``with`` block.
+
+    Args:
+        target(model.Model): model to evaluate
+        chunk_size(int): # of data points per chunk
+        threads(int): # of worker threads. If ``None``, the number of
+        CPUs is used.
+    """
+
+    name = 'sharded'
+
+    def __init__(self, target=None, chunk_size=65536, threads=None):
+        super(ShardedBackend, self).__init__(target)
+        self.chunk_size = chunk_size
+        self.threads = threads
+        self._pool = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_pool'] = None
+        return state
+
+    def close(self):
+        """Stops the worker threads"""
+
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _map(self, f, x):
+        chunks = [x[i: i + self.chunk_size]
+                  for i in six.moves.range(0, len(x), self.chunk_size)]
+        if len(chunks) == 1:
+            return [f(chunks[0])]
+        if self._pool is None:
+            self._pool = mp_pool.ThreadPool(self.threads)
+        return self._pool.map(f, chunks)
+
+    def _sum(self, parts):
+        total = numpy.array(parts[0], dtype=numpy.float64)
+        for p in parts[1:]:
+            total += p
+        return total
+
+    def log_posterior(self, theta, x, n=None):
+        theta = numpy.asarray(theta)
+        log_likelihood = self._sum(self._map(
+            lambda c: numpy.sum(self.model.log_likelihood(theta, c),
+                                axis=-1), x))
+        scale = 1.0 if n is None else n / len(x)
+        return self.model.log_prior(theta) + scale * log_likelihood
+
+    def grad(self, theta, x, n=None):
+        theta = numpy.asarray(theta)
+        grad = self._sum(self._map(
+            lambda c: self.model.grad_log_likelihood(theta, c), x))
+        grad *= 1.0 if n is None else n / len(x)
+        grad += self.model.grad_log_prior(theta)
+        return grad
+
+    def value_and_grad(self, theta, x, n=None):
+        theta = numpy.asarray(theta)
+        parts = self._map(
+            lambda c: self.model.value_and_grad_log_likelihood(theta, c), x)
+        value = self._sum([p[0] for p in parts])
+        grad = self._sum([p[1] for p in parts])
+        scale = 1.0 if n is None else n / len(x)
+        grad *= scale
+        grad += self.model.grad_log_prior(theta)
+        return self.model.log_prior(theta) + scale * value, grad
+
+
+class ControlVariate(object):
+    """Control-variate (SVRG) gradient estimator
+
+    Minibatch gradients are corrected with the full-data gradient at an
+    anchor parameter::
+
+        g(theta) = g_full(anchor) + g_batch(theta) - g_batch(anchor)
+
+    which is unbiased and whose variance vanishes as ``theta`` approaches
+    the anchor. The anchor is moved to the current parameter every
+    ``refresh`` epochs by :meth:`begin_epoch`, which costs one full-data
+    gradient evaluation. ``g_batch(theta)`` and ``g_batch(anchor)`` are
+    evaluated in one call of the wrapped backend by stacking the two
+    parameters as chains. Until the first anchor is set, gradients are
+    passed through.
+
+    Args:
+        grad_backend: backend to wrap
+        refresh(int): interval of anchor updates in epochs
+    """
+
+    def __init__(self, grad_backend, refresh=1):
+        self.grad_backend = grad_backend
+        self.name = grad_backend.name + '+cv'
+        self.refresh = refresh
+        self.anchor = None
+        self.anchor_grad = None
+
+    def begin_epoch(self, theta, x, n, epoch):
+        """Updates the anchor if the epoch is due
+
+        Args:
+            theta(numpy.ndarray): current parameter
+            x(numpy.ndarray): whole training data
+            n(int): training data size
+            epoch(int): index of the epoch about to start
+        """
+
+        if self.anchor is not None and epoch % self.refresh != 0:
+            return
+        self.anchor = numpy.array(theta, dtype=numpy.float64)
+        self.anchor_grad = numpy.asarray(
+            self.grad_backend.grad(self.anchor, x, n), dtype=numpy.float64)
+
+    def get_state(self):
+        return {'anchor': self.anchor, 'anchor_grad': self.anchor_grad}
+
+    def set_state(self, state):
+        self.anchor = state['anchor']
+        self.anchor_grad = state['anchor_grad']
+
+    def close(self):
+        close(self.grad_backend)
+
+    def _correct(self, g, g_anchor):
+        g = numpy.array(g, dtype=numpy.float64)
+        g -= g_anchor
+        g += self.anchor_grad
+        return g
+
+    def log_posterior(self, theta, x, n=None):
+        return self.grad_backend.log_posterior(theta, x, n)
+
+    def grad(self, theta, x, n=None):
+        if self.anchor is None:
+            return self.grad_backend.grad(theta, x, n)
+        g = self.grad_backend.grad(numpy.stack((theta, self.anchor)), x, n)
+        return self._correct(g[0], g[1])
+
+    def value_and_grad(self, theta, x, n=None):
+        if self.anchor is None:
+            return self.grad_backend.value_and_grad(theta, x, n)
+        value, g = self.grad_backend.value_and_grad(
+            numpy.stack((theta, self.anchor)), x, n)
+        return value[0], self._correct(g[0], g[1])
+
+
+def close(grad_backend):
+    """Releases resources of backend if it has any
+
+    Backends holding threads (e.g. :class:`ShardedBackend`) and wrappers
+    of backends provide ``close``.
+    """
+
+    hook = getattr(grad_backend, 'close', None)
+    if hook is not None:
+        hook()
+
+
+BACKENDS = {
+    'chainer': ChainerBackend,
+    'numpy': NumpyBackend,
+    'sharded': ShardedBackend,
+}
+
+
+def get_backend(name, target=None, **kwargs):
+    """Returns gradient backend
+
+    Args:
+        name(str): backend name, one of ``BACKENDS``
+        target(model.Model): model to evaluate. If ``None``, the Gaussian
+        mixture is used.
+        kwargs: passed to the constructor of the backend
+    Returns:
+        backend object with ``log_posterior``, ``grad`` and
+        ``value_and_grad`` methods
+    """
+
+    if name not in BACKENDS:
+        raise ValueError('unknown backend: {} (choose from {})'.format(
+            name, ', '.join(sorted(BACKENDS))))
+    return BACKENDS[name](target, **kwargs)
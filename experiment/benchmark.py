@@ -0,0 +1,316 @@
+"""Throughput benchmark of samplers
+
+Runs each sampler over a grid of data size ``N``, ``batchsize``, ``L`` and
+number of chains, and reports for each configuration
+
+* steps/s (driver iterations; each yields ``chains`` samples)
+* gradient evaluations/s
+* time spent in gradient evaluation, RNG, minibatch slicing and
+  bookkeeping (trace and diagnostics), and the rest of the kernel
+* peak memory allocated during the run (``tracemalloc``, measured in
+  a separate run so that tracing does not distort timings)
+* ESS per second (minimum over parameters)
+
+Results are stored as JSON. Given a previous result with ``--compare``,
+the benchmark exits with status 1 if steps/s of any configuration
+regressed by more than ``--threshold``.
+
+Usage::
+
+    python benchmark.py --output bench.json
+    python benchmark.py --compare bench.json --threshold 0.2
+"""
+
+from __future__ import print_function
+import argparse
+import itertools
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy
+
+import backend
+import diagnostics
+import model
+import samplers
+import stepsize
+import tracefile
+
+
+# step sizes for N = 100, scaled by 100 / N since the posterior contracts
+STEPSIZE = {'sgld': 0.01, 'sghmc': 0.005, 'msgnht': 0.005, 'hmc': 0.01,
+            'psgld': 0.01, 'psghmc': 0.005, 'sghmc-ss': 0.005,
+            'msgnht-ss': 0.005, 'santa': 0.001, 'nuts': 0.01}
+# samplers without inner steps
+NO_L = ('sgld', 'psgld', 'santa', 'nuts')
+# samplers run on the whole data only, and only if requested by --sampler;
+# on minibatches, NUTS trees keep growing to the maximum depth
+FULL_BATCH = ('nuts', )
+PHASES = ('grad', 'rng', 'minibatch', 'bookkeeping')
+
+
+class _Timer(object):
+
+    def __init__(self):
+        self.time = dict((phase, 0.0) for phase in PHASES)
+        self.count = dict((phase, 0) for phase in PHASES)
+
+    def wrap(self, phase, f):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                self.time[phase] += time.perf_counter() - start
+                self.count[phase] += 1
+        return timed
+
+
+class _TimedBackend(object):
+
+    def __init__(self, grad_backend, timer):
+        self.name = grad_backend.name
+        self.log_posterior = timer.wrap('grad', grad_backend.log_posterior)
+        self.grad = timer.wrap('grad', grad_backend.grad)
+        self.value_and_grad = timer.wrap('grad', grad_backend.value_and_grad)
+        self._grad_backend = grad_backend
+
+    def close(self):
+        backend.close(self._grad_backend)
+
+
+class _TimedRNG(object):
+
+    def __init__(self, rng, timer):
+        self._rng = rng
+        self._timer = timer
+
+    def __getattr__(self, name):
+        return self._timer.wrap('rng', getattr(self._rng, name))
+
+
+class _TimedMinibatchIterator(samplers.MinibatchIterator):
+
+    def __init__(self, timer, *args, **kwargs):
+        super(_TimedMinibatchIterator, self).__init__(*args, **kwargs)
+        self._timer = timer
+
+    def epoch(self):
+        it = super(_TimedMinibatchIterator, self).epoch()
+        next_batch = self._timer.wrap('minibatch', lambda: next(it, None))
+        while True:
+            batch = next_batch()
+            if batch is None:
+                return
+            yield batch
+
+
+class _TimedHooks(object):
+
+    def __init__(self, trace, monitor, timer):
+        self.append = timer.wrap('bookkeeping', trace.append)
+        self.update = timer.wrap('bookkeeping', monitor.update)
+        self.should_stop = monitor.should_stop
+
+
+def _params(sampler, L):
+    if sampler in NO_L:
+        return {}
+    return {'L': L}
+
+
+def run_one(sampler, N, batchsize, L, chains, epoch, grad_backend='numpy',
+            seed=0, measure_memory=True):
+    """Benchmarks one configuration
+
+    Returns:
+        dict: configuration and measured metrics
+    """
+
+    config = {'sampler': sampler, 'N': N, 'batchsize': batchsize,
+              'L': L if sampler not in NO_L else None, 'chains': chains,
+              'epoch': epoch, 'backend': grad_backend}
+    x = model.generate(N, rng=numpy.random.default_rng([seed, 0xda7a]))
+    eps = stepsize.Constant(STEPSIZE[sampler] * 100 / N)
+
+    def setup(timer):
+        rng = numpy.random.default_rng(seed)
+        kernel = samplers.get_sampler(
+            sampler,
+            grad_backend=_TimedBackend(backend.get_backend(grad_backend),
+                                       timer),
+            rng=_TimedRNG(rng, timer), **_params(sampler, L))
+        batches = _TimedMinibatchIterator(timer, x, batchsize, rng=rng)
+        theta = model.sample_from_prior(chains, rng=rng)
+        trace = tracefile.ArrayTrace(epoch * len(batches), theta.shape)
+        monitor = diagnostics.OnlineDiagnostics(theta.shape)
+        return kernel, batches, theta, trace, monitor
+
+    timer = _Timer()
+    kernel, batches, theta, trace, monitor = setup(timer)
+    hooks = _TimedHooks(trace, monitor, timer)
+    start = time.perf_counter()
+    samplers.run(kernel, theta, x, epoch, batchsize, eps,
+                 sampling=batches, trace=hooks, monitor=hooks)
+    elapsed = time.perf_counter() - start
+    backend.close(kernel.grad_backend)
+
+    steps = trace.n_seen
+    result = dict(config)
+    result.update({
+        'time': elapsed,
+        'steps_per_sec': steps / elapsed,
+        'grad_evals': timer.count['grad'],
+        'grad_evals_per_sec': timer.count['grad'] / elapsed,
+        'ess_per_sec': float(numpy.min(monitor.total_ess())) / elapsed,
+    })
+    for phase in PHASES:
+        result['time_' + phase] = timer.time[phase]
+    result['time_other'] = elapsed - sum(timer.time.values())
+
+    if measure_memory:
+        timer = _Timer()
+        kernel, batches, theta, trace, monitor = setup(timer)
+        hooks = _TimedHooks(trace, monitor, timer)
+        tracemalloc.start()
+        try:
+            samplers.run(kernel, theta, x, epoch, batchsize, eps,
+                         sampling=batches, trace=hooks, monitor=hooks)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            backend.close(kernel.grad_backend)
+        result['peak_memory'] = peak
+    return result
+
+
+def config_key(result):
+    return tuple(result.get(k) for k in
+                 ('sampler', 'N', 'batchsize', 'L', 'chains', 'epoch',
+                  'backend'))
+
+
+def compare(results, baseline, threshold):
+    """Finds configurations whose throughput regressed
+
+    Args:
+        results(list of dict): current results
+        baseline(list of dict): previous results
+        threshold(float): tolerated relative decrease of steps/s
+    Returns:
+        list of tuple: ``(config key, baseline steps/s, current steps/s)``
+        of regressed configurations
+    """
+
+    previous = dict((config_key(r), r) for r in baseline)
+    regressions = []
+    for r in results:
+        p = previous.get(config_key(r))
+        if p is None:
+            continue
+        if r['steps_per_sec'] < (1 - threshold) * p['steps_per_sec']:
+            regressions.append((config_key(r), p['steps_per_sec'],
+                                r['steps_per_sec']))
+    return regressions
+
+
+def _environment():
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL)
+        commit = commit.decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'machine': platform.machine(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def _ints(s):
+    return [int(v) for v in s.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='sampler benchmark')
+    parser.add_argument('--sampler',
+                        default=','.join(sorted(set(STEPSIZE)
+                                                - set(FULL_BATCH))),
+                        type=lambda s: s.split(','),
+                        help='comma-separated samplers ({} only run with '
+                        'batchsize N)'.format(', '.join(FULL_BATCH)))
+    parser.add_argument('--N', default=[100, 10000], type=_ints,
+                        help='comma-separated data sizes')
+    parser.add_argument('--batchsize', default=[10, 100], type=_ints,
+                        help='comma-separated batchsizes')
+    parser.add_argument('--L', default=[10], type=_ints,
+                        help='comma-separated # of inner steps')
+    parser.add_argument('--chains', default=[1, 100], type=_ints,
+                        help='comma-separated # of chains')
+    parser.add_argument('--steps', default=2000, type=int,
+                        help='approximate # of steps per configuration')
+    parser.add_argument('--backend', default='numpy', type=str,
+                        choices=sorted(backend.BACKENDS),
+                        help='gradient backend')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip peak memory measurement')
+    parser.add_argument('--output', default=None, type=str,
+                        help='path to output JSON')
+    parser.add_argument('--compare', default=None, type=str,
+                        help='JSON of previous results to compare with')
+    parser.add_argument('--threshold', default=0.2, type=float,
+                        help='tolerated relative decrease of steps/s')
+    args = parser.parse_args()
+
+    results = []
+    header = ('sampler', 'N', 'batchsize', 'L', 'chains', 'steps/s',
+              'grads/s', 'ESS/s', 'grad', 'rng', 'batch', 'book', 'other',
+              'peak MB')
+    print('\t'.join(header))
+    for sampler, N, batchsize, L, chains in itertools.product(
+            args.sampler, args.N, args.batchsize, args.L, args.chains):
+        if batchsize > N or (sampler in NO_L and L != args.L[0]):
+            continue
+        if sampler in FULL_BATCH and batchsize != N:
+            continue
+        n_batch = (N + batchsize - 1) // batchsize
+        epoch = max(1, args.steps // n_batch)
+        r = run_one(sampler, N, batchsize, L, chains, epoch, args.backend,
+                    measure_memory=not args.no_memory)
+        results.append(r)
+        fraction = ['{:.0%}'.format(r['time_' + phase] / r['time'])
+                    for phase in PHASES + ('other',)]
+        print('\t'.join([sampler, str(N), str(batchsize), str(r['L']),
+                         str(chains),
+                         '{:.0f}'.format(r['steps_per_sec']),
+                         '{:.0f}'.format(r['grad_evals_per_sec']),
+                         '{:.1f}'.format(r['ess_per_sec'])]
+                        + fraction
+                        + ['{:.2f}'.format(r.get('peak_memory', 0) / 2**20)]))
+        sys.stdout.flush()
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': _environment(), 'results': results},
+                      f, indent=1, sort_keys=True)
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for key, before, after in regressions:
+            print('regression: {} {:.0f} -> {:.0f} steps/s'.format(
+                key, before, after))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
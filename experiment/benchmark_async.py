@@ -0,0 +1,138 @@
+"""Benchmark of asynchronous against sequential SG-MCMC
+
+Samples the posterior of Bayesian linear regression, whose exact
+posterior is Gaussian, by SGLD with :func:`samplers.run` and with
+:func:`samplers.run_async` for each number of workers, and reports
+
+* steps/s (process start-up included)
+* mean and maximum staleness and # of dropped gradients
+* posterior accuracy of the samples: the largest error of the mean in
+  units of the posterior standard deviation, and the largest relative
+  error of the standard deviation
+
+Chains start from the exact posterior, so the errors measure the bias of
+the stationary distribution (from step size, gradient noise and
+staleness) rather than burn-in.
+
+Usage::
+
+    python benchmark_async.py --workers 1,2,4 --staleness 8
+"""
+
+from __future__ import print_function
+import argparse
+import json
+import time
+
+import numpy
+
+import backend
+import benchmark
+import model
+import samplers
+import stepsize
+
+
+def linear_posterior(target, x):
+    """Returns mean and standard deviation of the exact posterior
+
+    Args:
+        target(model.LinearRegression): model
+        x(numpy.ndarray): data of shape ``(N, n_features + 1)``
+    """
+
+    design = numpy.column_stack((x[:, :-1], numpy.ones(len(x))))
+    precision = (numpy.dot(design.T, design) / target.noise_var
+                 + numpy.eye(target.dim) / target.prior_var)
+    cov = numpy.linalg.inv(precision)
+    mean = numpy.dot(cov, numpy.dot(design.T, x[:, -1])) / target.noise_var
+    return mean, numpy.sqrt(numpy.diag(cov))
+
+
+def run_one(target, x, n_epoch, batchsize, eps, chains, workers, staleness,
+            seed=0):
+    """Benchmarks one configuration; ``workers=0`` runs sequentially
+
+    Returns:
+        dict: configuration and measured metrics
+    """
+
+    rng = numpy.random.RandomState(seed)
+    kernel = samplers.SGLD(backend.get_backend('numpy', target), rng)
+    mean, std = linear_posterior(target, x)
+    theta = mean + std * rng.standard_normal((chains, target.dim))
+    delays = samplers.DelayStats()
+    start = time.perf_counter()
+    if workers == 0:
+        _, trace = samplers.run(kernel, theta, x, n_epoch, batchsize, eps)
+    else:
+        _, trace = samplers.run_async(kernel, theta, x, n_epoch, batchsize,
+                                      eps, workers, staleness, delays=delays)
+    elapsed = time.perf_counter() - start
+
+    samples = trace.data[:trace.n_stored].reshape(-1, target.dim)
+    result = {'workers': workers,
+              'staleness': staleness, 'time': elapsed,
+              'steps_per_sec': trace.n_seen / elapsed,
+              'mean_error': float(numpy.max(
+                  numpy.abs(samples.mean(axis=0) - mean) / std)),
+              'std_error': float(numpy.max(
+                  numpy.abs(samples.std(axis=0) / std - 1)))}
+    result.update(delays.summary())
+    return result
+
+
+def _ints(s):
+    return [int(v) for v in s.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='asynchronous SG-MCMC benchmark')
+    parser.add_argument('--workers', default=[1, 2, 4], type=_ints,
+                        help='comma-separated # of workers')
+    parser.add_argument('--staleness', default=2, type=int,
+                        help='maximum staleness of applied gradients')
+    parser.add_argument('--N', default=100000, type=int,
+                        help='data size')
+    parser.add_argument('--features', default=200, type=int,
+                        help='# of features')
+    parser.add_argument('--batchsize', default=1000, type=int,
+                        help='minibatch size')
+    parser.add_argument('--chains', default=4, type=int,
+                        help='# of chains')
+    parser.add_argument('--epoch', default=20, type=int, help='# of epochs')
+    parser.add_argument('--eps', default=0.01, type=float,
+                        help='step size relative to the inverse curvature '
+                        'N / noise_var of the posterior')
+    parser.add_argument('--seed', default=0, type=int, help='random seed')
+    parser.add_argument('--output', default=None, type=str,
+                        help='path to output JSON')
+    args = parser.parse_args()
+
+    target = model.LinearRegression(args.features)
+    x = target.generate(args.N, rng=numpy.random.RandomState(args.seed))
+    eps = stepsize.Constant(args.eps * target.noise_var / args.N)
+
+    results = []
+    header = ('workers', 'steps/s', 'mean delay', 'max delay', 'dropped',
+              'mean err', 'std err')
+    print('\t'.join(header))
+    for workers in [0] + args.workers:
+        r = run_one(target, x, args.epoch, args.batchsize, eps, args.chains,
+                    workers, args.staleness, args.seed)
+        results.append(r)
+        print('\t'.join([str(workers), '{:.0f}'.format(r['steps_per_sec']),
+                         '{:.2f}'.format(r['mean_delay']),
+                         str(r['max_delay']), str(r['dropped']),
+                         '{:.3f}'.format(r['mean_error']),
+                         '{:.3f}'.format(r['std_error'])]))
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': benchmark._environment(),
+                       'results': results}, f, indent=1, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
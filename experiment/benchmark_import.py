@@ -0,0 +1,92 @@
+"""Import-time benchmark of entry points
+
+Imports each entry point (``toy_*.py``, ``sweep``, ``runner``,
+``benchmark``) in a fresh interpreter and reports the import time (the
+minimum over ``--repeat`` runs). Heavy optional dependencies must be
+imported lazily, only when a run actually needs them; the benchmark
+exits with status 1 if one of them is imported eagerly, or if an import
+takes longer than ``--max-seconds``.
+
+Usage::
+
+    python benchmark_import.py
+    python benchmark_import.py --max-seconds 0.5
+"""
+
+from __future__ import print_function
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+
+
+# modules that must not be imported by merely importing an entry point
+LAZY_MODULES = ('chainer', 'matplotlib')
+
+_CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'time': elapsed,
+    'loaded': [m for m in {lazy!r} if m in sys.modules],
+}}))
+'''
+
+
+def entry_points(directory):
+    modules = sorted(os.path.splitext(os.path.basename(p))[0]
+                     for p in glob.glob(os.path.join(directory, 'toy_*.py')))
+    return modules + ['sweep', 'runner', 'benchmark']
+
+
+def measure(module, directory, repeat=5):
+    """Imports ``module`` in fresh interpreters
+
+    Returns:
+        dict: minimum import time in seconds and lazy modules loaded
+    """
+
+    best = None
+    for _ in range(repeat):
+        out = subprocess.check_output(
+            [sys.executable, '-c',
+             _CHILD.format(module=module, lazy=LAZY_MODULES)],
+            cwd=directory)
+        result = json.loads(out.decode('utf-8').splitlines()[-1])
+        if best is None or result['time'] < best['time']:
+            best = result
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='import-time benchmark')
+    parser.add_argument('modules', nargs='*',
+                        help='modules to import. Defaults to all entry '
+                        'points')
+    parser.add_argument('--repeat', default=5, type=int,
+                        help='# of runs per module')
+    parser.add_argument('--max-seconds', default=0.5, type=float,
+                        help='maximum tolerated import time')
+    args = parser.parse_args()
+
+    directory = os.path.dirname(os.path.abspath(__file__))
+    failed = False
+    for module in args.modules or entry_points(directory):
+        r = measure(module, directory, args.repeat)
+        status = 'ok'
+        if r['loaded']:
+            status = 'eager import of ' + ', '.join(r['loaded'])
+        elif r['time'] > args.max_seconds:
+            status = 'slow'
+        failed = failed or status != 'ok'
+        print('{}\t{:.3f}s\t{}'.format(module, r['time'], status))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
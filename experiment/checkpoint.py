@@ -0,0 +1,167 @@
+"""Checkpointing and resuming of sampling runs
+
+A checkpoint holds everything :func:`samplers.run` needs to continue a run
+bit-identically: the epoch index, the parameter, the sampler state
+(auxiliary variables, adaptation state and the state of the gradient
+backend, see :meth:`samplers.Sampler.get_state`), the state of the random
+number generator, the trace and the monitor.
+
+Checkpoints are taken at the end of every ``interval`` epochs. The state
+is copied on the sampling thread, then pickled and written by a
+background thread to a temporary file that atomically replaces the
+previous checkpoint, so an interrupted write never corrupts it. Samples
+already in a :class:`tracefile.ArrayTrace` are not copied: they are
+append-only, so the writer reads them while sampling goes on.
+
+Usage::
+
+    checkpointer = checkpoint.Checkpointer('run.ckpt', interval=100)
+    samplers.run(..., checkpointer=checkpointer)
+    # after preemption
+    samplers.run(..., checkpointer=checkpointer,
+                 resume=checkpoint.load('run.ckpt'))
+"""
+
+import copy
+import os
+import pickle
+import threading
+
+import numpy
+
+
+def get_rng_state(rng):
+    """Returns state of ``numpy.random``, a RandomState or a Generator"""
+
+    if rng is numpy.random:
+        return numpy.random.get_state()
+    if isinstance(rng, numpy.random.Generator):
+        return copy.deepcopy(rng.bit_generator.state)
+    return rng.get_state()
+
+
+def set_rng_state(rng, state):
+    """Restores state returned by :func:`get_rng_state`"""
+
+    if rng is numpy.random:
+        numpy.random.set_state(state)
+    elif isinstance(rng, numpy.random.Generator):
+        rng.bit_generator.state = state
+    else:
+        rng.set_state(state)
+
+
+def snapshot(epoch, theta, sampler, trace, monitor=None):
+    """Copies the state of a run
+
+    Args:
+        epoch(int): index of the next epoch
+        theta(numpy.ndarray): current parameter
+        sampler(samplers.Sampler): step kernel
+        trace: trace providing ``get_state``
+        monitor: monitor such as :class:`diagnostics.OnlineDiagnostics`,
+        copied as a whole
+    Returns:
+        dict: state unaffected by continuing the run
+    """
+
+    return {
+        'epoch': epoch,
+        'theta': numpy.array(theta),
+        'sampler': sampler.get_state(),
+        'rng': get_rng_state(sampler.rng),
+        'trace': trace.get_state(),
+        'monitor': copy.deepcopy(monitor),
+    }
+
+
+def restore(state, sampler, trace, monitor=None):
+    """Restores a run from state returned by :func:`snapshot`
+
+    ``sampler`` must already be reset with the training data.
+
+    Returns:
+        tuple: parameter and index of the next epoch
+    """
+
+    sampler.set_state(state['sampler'])
+    set_rng_state(sampler.rng, state['rng'])
+    trace.set_state(state['trace'])
+    if monitor is not None and state['monitor'] is not None:
+        monitor.__dict__.update(state['monitor'].__dict__)
+    return numpy.array(state['theta']), state['epoch']
+
+
+def save(path, state):
+    """Writes state to ``path`` atomically"""
+
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load(path):
+    """Reads state written by :func:`save`"""
+
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+class Checkpointer(object):
+    """Writes checkpoints of a run in a background thread
+
+    At most one write is in flight; if the previous write has not
+    finished when the next checkpoint is due, the sampling thread
+    waits for it.
+
+    Args:
+        path(str): checkpoint file
+        interval(int): # of epochs between checkpoints
+    """
+
+    def __init__(self, path, interval=100):
+        self.path = path
+        self.interval = interval
+        self._thread = None
+        self._error = None
+
+    def _write(self, state):
+        try:
+            save(self.path, state)
+        except Exception as e:  # NOQA
+            self._error = e
+
+    def wait(self):
+        """Waits for the pending write and reraises its error"""
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def end_epoch(self, epoch, theta, sampler, trace, monitor=None):
+        """Takes a checkpoint if ``epoch`` epochs are due
+
+        Args:
+            epoch(int): # of finished epochs
+        """
+
+        if epoch % self.interval == 0:
+            self.save(epoch, theta, sampler, trace, monitor)
+
+    def save(self, epoch, theta, sampler, trace, monitor=None):
+        """Takes a checkpoint, see :func:`snapshot`"""
+
+        state = snapshot(epoch, theta, sampler, trace, monitor)
+        self.wait()
+        self._thread = threading.Thread(target=self._write, args=(state,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def close(self):
+        self.wait()
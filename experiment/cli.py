@@ -0,0 +1,294 @@
+"""Command line plumbing shared by the ``toy_*.py`` scripts"""
+
+from __future__ import print_function
+import argparse
+import os
+
+import numpy
+
+import backend
+import checkpoint
+import dataset
+import diagnostics
+import model
+import samplers
+import stepsize
+import tracefile
+
+
+def make_parser(description, batchsize=10, epoch=1000,
+                visualize='visualize.png'):
+    """Creates argument parser with options common to all samplers
+
+    Sampler-specific options are added by the caller.
+    """
+
+    parser = argparse.ArgumentParser(description=description)
+    # model
+    parser.add_argument('--model', default='mixture', type=str,
+                        choices=sorted(model.MODELS),
+                        help='target model')
+    parser.add_argument('--features', default=10, type=int,
+                        help='# of features of regression models')
+    parser.add_argument('--hidden', default=10, type=int,
+                        help='# of hidden units of mlp')
+    # true parameter of mixture
+    parser.add_argument('--theta1', default=0, type=float,
+                        help='true paremter 1')
+    parser.add_argument('--theta2', default=1, type=float,
+                        help='true paremter 2')
+    # data
+    parser.add_argument('--N', default=100, type=int,
+                        help='training data size')
+    parser.add_argument('--batchsize', default=batchsize, type=int,
+                        help='batchsize')
+    parser.add_argument('--epoch', default=epoch, type=int,
+                        help='epoch num')
+    parser.add_argument('--sampling', default='shuffle', type=str,
+                        choices=samplers.minibatch.SAMPLING_METHODS,
+                        help='minibatch sampling method')
+    # others
+    parser.add_argument('--backend', default='numpy', type=str,
+                        choices=sorted(backend.BACKENDS),
+                        help='gradient backend')
+    parser.add_argument('--chunk-size', default=65536, type=int,
+                        help='# of data points per chunk of the sharded '
+                        'backend')
+    parser.add_argument('--threads', default=None, type=int,
+                        help='# of threads of the sharded backend. '
+                        'Defaults to the number of CPUs')
+    parser.add_argument('--control-variate', default=None, type=int,
+                        metavar='REFRESH',
+                        help='If given, reduce gradient variance with '
+                        'a control variate whose anchor is refreshed '
+                        'every REFRESH epochs')
+    parser.add_argument('--data', default=None, type=str,
+                        help='If given, training data is memory-mapped '
+                        'from this .npy file, generated first if it does '
+                        'not exist')
+    parser.add_argument('--prefetch', default=None, type=int,
+                        help='# of minibatches read ahead in a background '
+                        'thread. Defaults to 2 with --data, otherwise 0')
+    parser.add_argument('--workers', default=0, type=int,
+                        help='If positive, gradients are computed '
+                        'asynchronously by this many worker processes. '
+                        'The sampler must take one gradient per update')
+    parser.add_argument('--staleness', default=2, type=int,
+                        help='maximum staleness of gradients applied with '
+                        '--workers. Larger bounds keep more workers busy '
+                        'but need smaller step sizes')
+    parser.add_argument('--temperatures', default=1, type=int,
+                        help='If greater than 1, # of temperatures of '
+                        'replica exchange (parallel tempering)')
+    parser.add_argument('--max-temperature', default=10.0, type=float,
+                        help='initial highest temperature of replica '
+                        'exchange')
+    parser.add_argument('--swap-interval', default=1, type=int,
+                        help='# of updates between swap rounds')
+    parser.add_argument('--adapt-ladder', default=None, type=int,
+                        help='# of swap rounds adapting the temperatures. '
+                        'Defaults to all rounds with a decaying gain')
+    parser.add_argument('--chains', default=1, type=int,
+                        help='number of independent chains')
+    parser.add_argument('--seed', default=0, type=int, help='random seed')
+    parser.add_argument('--visualize', default=visualize, type=str,
+                        help='path to output file')
+    parser.add_argument('--no-plot', action='store_true',
+                        help='If true, skip visualization (and importing '
+                        'matplotlib)')
+    parser.add_argument('--trace', default=None, type=str,
+                        help='If given, samples are streamed to this file')
+    parser.add_argument('--thin', default=1, type=int,
+                        help='keep every thin-th sample')
+    parser.add_argument('--burnin', default=0, type=int,
+                        help='# of leading samples to discard')
+    parser.add_argument('--checkpoint', default=None, type=str,
+                        help='If given, sampler state is checkpointed to '
+                        'this file')
+    parser.add_argument('--checkpoint-interval', default=100, type=int,
+                        help='# of epochs between checkpoints')
+    parser.add_argument('--resume', action='store_true',
+                        help='If true, continue from --checkpoint if it '
+                        'exists. The other options must be those of the '
+                        'interrupted run')
+    parser.add_argument('--target-ess', default=None, type=float,
+                        help='If given, stop once ESS of every parameter '
+                        'reaches this value and split R-hat is below '
+                        '--max-rhat')
+    parser.add_argument('--max-rhat', default=1.1, type=float,
+                        help='R-hat threshold of early stop')
+    return parser
+
+
+def add_schedule_arguments(parser, eps_start, eps_end):
+    """Adds step size schedule options"""
+
+    parser.add_argument('--schedule', default='polynomial', type=str,
+                        choices=stepsize.SCHEDULES,
+                        help='step size schedule')
+    parser.add_argument('--eps-start', default=eps_start, type=float,
+                        help='start stepsize')
+    parser.add_argument('--eps-end', default=eps_end, type=float,
+                        help='end stepsize')
+    parser.add_argument('--cycles', default=4, type=int,
+                        help='# of cycles of cyclical and warm-restart '
+                        'schedules')
+
+
+def make_schedule(args):
+    """Creates step size schedule from options"""
+
+    if args.schedule == 'polynomial':
+        return stepsize.StepSizeGenerator(args.epoch, args.eps_start,
+                                          args.eps_end)
+    n_batch = (args.N + args.batchsize - 1) // args.batchsize
+    return stepsize.get_schedule(args.schedule, args.epoch * n_batch,
+                                 args.eps_start, args.eps_end, args.cycles)
+
+
+def make_model(args):
+    """Creates target model from options"""
+
+    if args.model == 'mixture':
+        return model.GaussianMixture()
+    elif args.model == 'mlp':
+        return model.MLP(args.features, args.hidden)
+    return model.get_model(args.model, n_features=args.features)
+
+
+def make_data(args, target):
+    """Generates training data, or memory-maps it with ``--data``"""
+
+    theta = None
+    if args.model == 'mixture':
+        theta = (args.theta1, args.theta2)
+    if args.data is None:
+        return target.generate(args.N, theta)
+    if os.path.exists(args.data):
+        x = dataset.load(args.data)
+        if len(x) != args.N:
+            raise ValueError('{} holds {} data points, but --N is {}'.format(
+                args.data, len(x), args.N))
+        return x
+    return dataset.generate(args.data, target, args.N, theta)
+
+
+def setup(args):
+    """Seeds the global random state and returns the gradient backend"""
+
+    numpy.random.seed(args.seed)
+    kwargs = {}
+    if args.backend == 'sharded':
+        kwargs = {'chunk_size': args.chunk_size, 'threads': args.threads}
+    grad_backend = backend.get_backend(args.backend, make_model(args),
+                                       **kwargs)
+    if args.control_variate is not None:
+        grad_backend = backend.ControlVariate(grad_backend,
+                                              args.control_variate)
+    return grad_backend
+
+
+def print_sample(epoch, i, theta):
+    if theta.shape[-1] == 2:
+        print(epoch, theta, theta[:, 0] * 2 + theta[:, 1])
+    else:
+        print(epoch, theta)
+
+
+def print_first_sample(epoch, i, theta):
+    if i == 0:
+        print_sample(epoch, i, theta)
+
+
+def main(args, sampler, schedule, callback=print_first_sample):
+    """Samples from the posterior and visualizes the trace
+
+    The first two parameters of the samples are visualized.
+
+    Args:
+        args(argparse.Namespace): options created by :func:`make_parser`
+        sampler(samplers.Sampler): step kernel, wrapped in
+        :class:`samplers.ReplicaExchange` with ``--temperatures``
+        schedule: step size schedule
+        callback(callable): called after each sample
+    Returns:
+        numpy.ndarray: samples of shape ``(# of samples, K, D)``
+    """
+
+    if args.temperatures > 1:
+        if args.workers > 0:
+            raise ValueError('--temperatures is not supported with '
+                             '--workers')
+        sampler = samplers.ReplicaExchange(
+            sampler, args.temperatures, args.max_temperature,
+            args.swap_interval, args.adapt_ladder, sampling=args.sampling)
+    target = make_model(args)
+    theta = target.sample_prior(args.chains)
+    x = make_data(args, target)
+    n_batch = (args.N + args.batchsize - 1) // args.batchsize
+    checkpointer, resume = None, None
+    if args.checkpoint is not None:
+        checkpointer = checkpoint.Checkpointer(args.checkpoint,
+                                               args.checkpoint_interval)
+        if args.resume and os.path.exists(args.checkpoint):
+            resume = checkpoint.load(args.checkpoint)
+    elif args.resume:
+        raise ValueError('--resume requires --checkpoint')
+    if checkpointer is not None and args.workers > 0:
+        raise ValueError('--checkpoint is not supported with --workers')
+    if args.trace is None:
+        trace = tracefile.ArrayTrace(args.epoch * n_batch, theta.shape,
+                                     thin=args.thin, burnin=args.burnin)
+    else:
+        metadata = dict(vars(args), sampler=sampler.name)
+        trace = tracefile.TraceWriter(args.trace, theta.shape,
+                                      thin=args.thin, burnin=args.burnin,
+                                      metadata=metadata,
+                                      resume=resume is not None)
+    monitor = diagnostics.OnlineDiagnostics(
+        theta.shape, target_ess=args.target_ess, max_rhat=args.max_rhat)
+    try:
+        with trace:
+            batches = samplers.MinibatchIterator(
+                x, args.batchsize, args.sampling, rng=sampler.rng,
+                prefetch=args.prefetch)
+            if args.workers > 0:
+                delays = samplers.DelayStats()
+                samplers.run_async(sampler, theta, x, args.epoch,
+                                   args.batchsize, schedule, args.workers,
+                                   args.staleness, callback, batches, trace,
+                                   monitor, delays)
+            else:
+                samplers.run(sampler, theta, x, args.epoch, args.batchsize,
+                             schedule, callback, batches, trace, monitor,
+                             checkpointer, resume)
+    finally:
+        backend.close(sampler.grad_backend)
+    summary = monitor.summary()
+    print('samples: {n}, mean: {mean}, ESS: {ess}, R-hat: {rhat}'.format(
+        **summary))
+    if args.temperatures > 1:
+        print('temperatures: {}, swap rates: {}'.format(
+            sampler.temperatures, sampler.swap_rates))
+    if args.workers > 0:
+        print('applied: {applied}, dropped: {dropped}, '
+              'mean delay: {mean_delay}, max delay: {max_delay}'.format(
+                  **delays.summary()))
+    if args.trace is None:
+        samples = trace.data
+    else:
+        samples = tracefile.open_trace(args.trace).data
+
+    if args.no_plot:
+        return samples
+
+    import plot
+
+    lim = (-4, 4) if args.model == 'mixture' else None
+    hist = plot.histogram_trace(samples, xlim=lim, ylim=lim,
+                                per_chain=args.chains > 1)
+    fig = plot.figure()
+    plot.draw_histogram(fig, fig.add_subplot(1, 1, 1), hist,
+                        xlabel='theta1', ylabel='theta2')
+    fig.savefig(args.visualize)
+    return samples
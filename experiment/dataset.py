@@ -0,0 +1,102 @@
+"""Memory-mapped data sets
+
+Training data are stored as ``.npy`` files and opened as read-only
+:class:`numpy.memmap`, so a data set does not have to fit in memory: the
+page cache holds the parts being read. Data sets are written chunk by
+chunk (:func:`write`, :func:`generate`) to a temporary file that
+atomically replaces ``path``.
+
+A memmap can be passed to :func:`samplers.run` in place of an array;
+:class:`samplers.MinibatchIterator` then gathers each minibatch by index
+and reads upcoming minibatches ahead in a background thread. Passes over
+the whole data (e.g. :class:`samplers.HMC`, :class:`backend.ControlVariate`)
+should use the ``sharded`` backend, which reads the data chunk by chunk.
+
+Usage::
+
+    x = dataset.generate('mixture.npy', model.GaussianMixture(), 10 ** 8,
+                         theta=(0, 1))
+    # later runs
+    x = dataset.load('mixture.npy')
+    samplers.run(sampler, theta, x, ...)
+"""
+
+import os
+
+import numpy
+from numpy.lib import format as npy_format
+import six
+
+
+def load(path):
+    """Opens data set written by :func:`write` as read-only memmap"""
+
+    return numpy.load(path, mmap_mode='r')
+
+
+def write(path, chunks, n, shape=(), dtype=numpy.float64):
+    """Writes data set chunk by chunk
+
+    Args:
+        path(str): destination ``.npy`` file
+        chunks: iterable of arrays of shape ``(n_i, ) + shape`` whose
+        ``n_i`` sum up to ``n``
+        n(int): # of data points
+        shape(tuple of ints): shape of a data point
+        dtype: data type of the file
+    Returns:
+        numpy.memmap: data set opened by :func:`load`
+    """
+
+    tmp = path + '.tmp'
+    out = npy_format.open_memmap(tmp, mode='w+', dtype=dtype,
+                                 shape=(n, ) + tuple(shape))
+    i = 0
+    for c in chunks:
+        if i + len(c) > n:
+            raise ValueError('more than {} data points'.format(n))
+        out[i: i + len(c)] = c
+        i += len(c)
+    if i != n:
+        raise ValueError('{} data points instead of {}'.format(i, n))
+    out.flush()
+    del out
+    os.replace(tmp, path)
+    return load(path)
+
+
+def save(path, x, chunk_size=65536):
+    """Writes array (or memmap) ``x`` as data set"""
+
+    chunks = (x[i: i + chunk_size]
+              for i in six.moves.range(0, len(x), chunk_size))
+    return write(path, chunks, len(x), x.shape[1:], x.dtype)
+
+
+def generate(path, target, N, theta=None, chunk_size=65536, rng=None):
+    """Generates data set from a model chunk by chunk
+
+    Args:
+        path(str): destination ``.npy`` file
+        target(model.Model): model generating data
+        N(int): # of data points
+        theta: parameter shared by all chunks. If ``None``, it is drawn
+        from the prior.
+        chunk_size(int): # of data points generated at once
+        rng: random number generator. If ``None``, the global
+        ``numpy.random`` is used.
+    Returns:
+        numpy.memmap: data set opened by :func:`load`
+    """
+
+    rng = numpy.random if rng is None else rng
+    if theta is None:
+        theta = target.sample_prior(rng=rng)
+    first = target.generate(min(N, chunk_size), theta, rng=rng)
+
+    def chunks():
+        yield first
+        for i in six.moves.range(len(first), N, chunk_size):
+            yield target.generate(min(chunk_size, N - i), theta, rng=rng)
+
+    return write(path, chunks(), N, first.shape[1:], first.dtype)
@@ -0,0 +1,226 @@
+"""Streaming convergence diagnostics
+
+All estimators consume one sample of shape ``(K, D)`` (``K`` chains,
+``D`` parameters) at a time in O(1) amortized time and bounded memory,
+so they can be updated from the sampling loop.
+
+* :class:`RunningMoments`: running mean and variance (Welford)
+* :class:`RollingAutocorrelation`: FFT-based autocorrelation of
+  the latest ``window`` samples
+* :class:`OnlineDiagnostics`: batch-means ESS and split R-hat, with
+  an optional early-stop criterion
+
+[Gelman+13] Bayesian Data Analysis, 3rd edition, section 11.4-11.5
+"""
+
+import numpy
+
+
+class RunningMoments(object):
+    """Running mean and variance by Welford's algorithm
+
+    Args:
+        shape(tuple of ints): shape of one sample
+    """
+
+    def __init__(self, shape):
+        self.n = 0
+        self.mean = numpy.zeros(shape)
+        self._m2 = numpy.zeros(shape)
+
+    def update(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (x - self.mean)
+
+    @property
+    def var(self):
+        """numpy.ndarray: unbiased variance estimate"""
+
+        if self.n < 2:
+            return numpy.full(self.mean.shape, numpy.nan)
+        return self._m2 / (self.n - 1)
+
+
+class RollingAutocorrelation(object):
+    """Autocorrelation over the latest ``window`` samples
+
+    Samples are kept in a ring buffer; the FFT is computed only
+    when :meth:`autocorrelation` is called.
+
+    Args:
+        shape(tuple of ints): shape of one sample
+        window(int): # of latest samples used
+    """
+
+    def __init__(self, shape, window=1024):
+        self.window = window
+        self._buffer = numpy.empty((window,) + tuple(shape))
+        self.n = 0
+
+    def update(self, x):
+        self._buffer[self.n % self.window] = x
+        self.n += 1
+
+    def autocorrelation(self, max_lag=None):
+        """Returns autocorrelation of the window
+
+        Args:
+            max_lag(int): largest lag. If ``None``, all lags
+            within the window are returned.
+        Returns:
+            numpy.ndarray: autocorrelation of shape
+            ``(max_lag + 1, ) + shape``, normalized to 1 at lag 0
+        """
+
+        n = min(self.n, self.window)
+        if self.n > self.window:
+            i = self.n % self.window
+            x = numpy.concatenate((self._buffer[i:], self._buffer[:i]))
+        else:
+            x = self._buffer[:n]
+        if max_lag is None:
+            max_lag = n - 1
+        x = x - x.mean(axis=0)
+        size = 1 << (2 * n - 1).bit_length()
+        f = numpy.fft.rfft(x, size, axis=0)
+        acov = numpy.fft.irfft(f * numpy.conj(f), size, axis=0)[:max_lag + 1]
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            return acov / acov[0]
+
+
+class OnlineDiagnostics(object):
+    """Batch-means ESS and split R-hat updated sample by sample
+
+    Samples are accumulated into batches whose sums and sums of squares
+    are kept. When the number of batches reaches ``2 * n_batches``,
+    adjacent batches are merged and the batch size doubles, so memory is
+    ``O(n_batches)`` and updates are O(1) amortized.
+
+    Args:
+        shape(tuple of ints): shape of one sample, ``(K, D)``
+        n_batches(int): minimum # of batches kept
+        window(int): window of :class:`RollingAutocorrelation`
+        target_ess(float): If given, :meth:`should_stop` requires total
+        ESS of every parameter to reach this value
+        max_rhat(float): :meth:`should_stop` requires split R-hat of
+        every parameter to be below this value
+    """
+
+    def __init__(self, shape, n_batches=32, window=1024, target_ess=None,
+                 max_rhat=1.1):
+        self.shape = tuple(shape)
+        self.n_batches = n_batches
+        self.target_ess = target_ess
+        self.max_rhat = max_rhat
+        self.moments = RunningMoments(self.shape)
+        self.acf = RollingAutocorrelation(self.shape, window)
+        self.batchsize = 1
+        self._sums = numpy.zeros((2 * n_batches,) + self.shape)
+        self._sumsqs = numpy.zeros((2 * n_batches,) + self.shape)
+        self._n_full = 0
+        self._n_current = 0
+        self._shift = None
+
+    @property
+    def n(self):
+        return self.moments.n
+
+    def update(self, theta):
+        theta = numpy.asarray(theta, dtype=numpy.float64)
+        self.moments.update(theta)
+        self.acf.update(theta)
+        if self._shift is None:
+            # sums are taken around the first sample to avoid cancellation
+            self._shift = theta.copy()
+        x = theta - self._shift
+        self._sums[self._n_full] += x
+        self._sumsqs[self._n_full] += x * x
+        self._n_current += 1
+        if self._n_current == self.batchsize:
+            self._n_full += 1
+            self._n_current = 0
+            if self._n_full == len(self._sums):
+                self._merge()
+
+    def _merge(self):
+        half = self.n_batches
+        for a in (self._sums, self._sumsqs):
+            a[:half] = a[0::2] + a[1::2]
+            a[half:] = 0
+        self._n_full = half
+        self.batchsize *= 2
+
+    def ess(self):
+        """Returns batch-means effective sample size
+
+        Returns:
+            numpy.ndarray: ESS of each chain and parameter of
+            shape ``(K, D)``. ``nan`` until 2 batches are complete.
+        """
+
+        B, b = self._n_full, self.batchsize
+        if B < 2:
+            return numpy.full(self.shape, numpy.nan)
+        means = self._sums[:B] / b
+        var_batch = numpy.var(means, axis=0, ddof=1)
+        var = self.moments.var
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            return B * var / var_batch
+
+    def total_ess(self):
+        """Returns ESS summed over chains, of shape ``(D, )``"""
+
+        return numpy.sum(self.ess(), axis=0)
+
+    def rhat(self):
+        """Returns split R-hat of each parameter
+
+        Each chain is split into halves of complete batches.
+
+        Returns:
+            numpy.ndarray: R-hat of shape ``(D, )``. ``nan`` until
+            4 batches are complete.
+        """
+
+        B, b = self._n_full, self.batchsize
+        if B < 4:
+            return numpy.full(self.shape[1:], numpy.nan)
+        h = B // 2
+        sums = numpy.concatenate((self._sums[:h].sum(axis=0),
+                                  self._sums[B - h:B].sum(axis=0)))
+        sumsqs = numpy.concatenate((self._sumsqs[:h].sum(axis=0),
+                                    self._sumsqs[B - h:B].sum(axis=0)))
+        m = h * b
+        means = sums / m
+        variances = (sumsqs - sums * means) / (m - 1)
+        # sums are shifted by the first sample of each chain
+        means += numpy.concatenate((self._shift, self._shift))
+        W = numpy.mean(variances, axis=0)
+        between = m * numpy.var(means, axis=0, ddof=1)
+        var_hat = (m - 1) / m * W + between / m
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            return numpy.sqrt(var_hat / W)
+
+    def should_stop(self):
+        """Returns whether the early-stop criterion is met"""
+
+        if self.target_ess is None:
+            return False
+        ess = self.total_ess()
+        if not numpy.all(ess >= self.target_ess):
+            return False
+        if self.max_rhat is not None:
+            return bool(numpy.all(self.rhat() < self.max_rhat))
+        return True
+
+    def summary(self):
+        """Returns dict of current mean, ESS and R-hat per parameter"""
+
+        return {
+            'n': self.n,
+            'mean': numpy.mean(self.moments.mean, axis=0),
+            'ess': self.total_ess(),
+            'rhat': self.rhat(),
+        }
@@ -1,11 +1,106 @@
-import chainer
-from chainer import functions as F
+"""Gaussian densities
+
+Chainer is imported only when a :class:`chainer.Variable` is passed in,
+so NumPy users do not pay its import time.
+"""
+
+import sys
+
 import numpy
 
 
+_log_normalizers = {}
+
+
+def log_normalizer(var):
+    """Returns ``log(2 * pi * var) / 2``
+
+    Values are cached per (scalar) variance.
+    """
+
+    try:
+        return _log_normalizers[var]
+    except TypeError:
+        return numpy.log(2 * numpy.pi * numpy.asarray(var)) / 2
+    except KeyError:
+        c = float(numpy.log(2 * numpy.pi * var) / 2)
+        _log_normalizers[var] = c
+        return c
+
+
+def _is_variable(x):
+    # a Variable can only exist if chainer has been imported
+    chainer = sys.modules.get('chainer')
+    return chainer is not None and isinstance(x, chainer.Variable)
+
+
+def _as_variable(x):
+    import chainer
+
+    if isinstance(x, chainer.Variable):
+        return x
+    x = numpy.asarray(x)
+    if x.dtype != numpy.float32:
+        x = x.astype(numpy.float32)
+    return chainer.Variable(x)
+
+
+def gaussian_log_likelihood(x, mu, var, out=None):
+    """Returns log density of ``x``, or ``log N(x; mu, var)``
+
+    The density is evaluated in log space, so points far from the mean
+    give finite values instead of underflowing to ``-inf``.
+    ``x`` and ``mu`` are broadcast against each other, e.g. means of
+    ``K`` chains of shape ``(K, 1)`` against data of shape ``(1, B)``
+    or ``(B, )`` give log densities of shape ``(K, B)``.
+
+    If neither ``x`` nor ``mu`` is a :class:`chainer.Variable`, the result
+    is computed with NumPy and, if ``out`` is given, written into ``out``
+    without allocating temporaries. Otherwise a Variable is returned and
+    ``out`` must be ``None``.
+
+    Args:
+        x(float, numpy.ndarray or chainer.Variable): sample data
+        mu(float, numpy.ndarray or chainer.Variable): mean of Gaussian
+        var(float): variance of Gaussian
+        out(numpy.ndarray): output buffer of the broadcast shape
+    Returns:
+        numpy.ndarray or chainer.Variable: log density whose shape is
+        the broadcast shape of ``x`` and ``mu``
+    """
+
+    c = log_normalizer(var)
+    if _is_variable(x) or _is_variable(mu):
+        from chainer import functions as F
+
+        if out is not None:
+            raise ValueError('out is not supported for chainer.Variable')
+        if numpy.isscalar(mu):
+            d = _as_variable(x) - mu
+        elif numpy.isscalar(x):
+            d = x - _as_variable(mu)
+        else:
+            x, mu = F.broadcast(_as_variable(x), _as_variable(mu))
+            d = x - mu
+        return d * d * (-0.5 / var) - c
+
+    scalar = False
+    if out is None:
+        # a float64 buffer also serves scalar and integer inputs
+        out = numpy.empty(numpy.broadcast(x, mu).shape)
+        scalar = out.ndim == 0
+    numpy.subtract(x, mu, out=out)
+    numpy.square(out, out=out)
+    out *= -0.5 / var
+    out -= c
+    return out[()] if scalar else out
+
+
 def gaussian_likelihood(x, mu, var):
     """Returns likelihood of ``x``, or ``N(x; mu, var)``
 
+    Prefer :func:`gaussian_log_likelihood`, which does not underflow.
+
     Args:
         x(float, numpy.ndarray or chainer.Variable): sample data
         mu(float or chainer.Variable): mean of Gaussian
@@ -15,15 +110,7 @@ def gaussian_likelihood(x, mu, var):
         whose shape is same as that of ``x``
     """
 
-    if numpy.isscalar(x):
-        x = numpy.array(x)
-    if isinstance(x, numpy.ndarray):
-        x = chainer.Variable(x.astype(numpy.float32))
-
-    if numpy.isscalar(mu):
-        mu = numpy.array(mu)
-    if isinstance(mu, numpy.ndarray):
-        mu = chainer.Variable(mu.astype(numpy.float32))
+    from chainer import functions as F
 
-    x, mu = F.broadcast(x, mu)
-    return F.exp(-(x - mu) ** 2 / var / 2) / numpy.sqrt(2 * numpy.pi * var)
+    x = _as_variable(x)
+    return F.exp(gaussian_log_likelihood(x, mu, var))
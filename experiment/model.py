@@ -1,5 +1,3 @@
-import chainer
-from chainer import functions as F
 import numpy
 
 import gaussian
@@ -22,11 +20,26 @@ Model
 """
 
 
-def sample_from_prior():
-    return numpy.random.randn(2) * [numpy.sqrt(VAR1), numpy.sqrt(VAR2)]
+def sample_from_prior(size=None, rng=None):
+    """Draws parameters from the prior
+
+    Args:
+        size(int): number of chains. If ``None``, a single parameter
+        of shape ``(2, )`` is drawn, otherwise parameters of shape
+        ``(size, 2)``
+        rng: random number generator. If ``None``, the global
+        ``numpy.random`` is used.
+    Returns:
+        numpy.ndarray: parameters drawn from ``p(theta)``
+    """
+
+    rng = numpy.random if rng is None else rng
+    shape = (2,) if size is None else (size, 2)
+    return (rng.standard_normal(shape)
+            * [numpy.sqrt(VAR1), numpy.sqrt(VAR2)])
 
 
-def generate(N, theta1=THETA1, theta2=THETA2, var_x=VAR_X):
+def generate(N, theta1=THETA1, theta2=THETA2, var_x=VAR_X, rng=None):
     """Generates sample data from gaussian mixture
 
     Args:
@@ -34,14 +47,17 @@ def generate(N, theta1=THETA1, theta2=THETA2, var_x=VAR_X):
         theta1(float): mean of one Gaussian
         theta2(float): mean of the other Gaussian
         var_x(float): variance of two Gaussians
+        rng: random number generator. If ``None``, the global
+        ``numpy.random`` is used.
     Returns:
         numpy.ndarray: sample data of shape ``(N, )``
         drawn i.i.d. from p(x | theta)
     """
 
-    a = numpy.sqrt(var_x) * numpy.random.randn(N, ) + theta1
-    b = numpy.sqrt(var_x) * numpy.random.randn(N, ) + theta1 + theta2
-    select = numpy.random.random_integers(0, 1, (N, ))
+    rng = numpy.random if rng is None else rng
+    a = numpy.sqrt(var_x) * rng.standard_normal((N, )) + theta1
+    b = numpy.sqrt(var_x) * rng.standard_normal((N, )) + theta1 + theta2
+    select = rng.uniform(size=(N, )) < 0.5
     return a * select + b * (1 - select)
 
 
@@ -49,20 +65,27 @@ def calc_log_posterior(theta, x, n=None):
     """Calculate unnormalized log posterior, ``log p(theta | x) + C``
 
     Args:
-        theta(chainer.Variable): model parameters
+        theta(chainer.Variable): model parameters of shape ``(2, )``,
+        or ``(K, 2)`` for ``K`` independent chains
         x(numpy.ndarray): sample data
         n(int): total data size
     Returns:
         chainer.Variable: Variable that holding unnormalized log posterior,
-        ``log p(theta | x) + C`` of shape ``()``
+        ``log p(theta | x) + C`` of shape ``theta.shape[:-1]``
     """
 
-    theta1, theta2 = F.split_axis(theta, 2, 0)
-    log_prior1 = F.sum(F.log(gaussian.gaussian_likelihood(theta1, 0, VAR1)))
-    log_prior2 = F.sum(F.log(gaussian.gaussian_likelihood(theta2, 0, VAR2)))
-    prob1 = gaussian.gaussian_likelihood(x, theta1, VAR_X)
-    prob2 = gaussian.gaussian_likelihood(x, theta1 + theta2, VAR_X)
-    log_likelihood = F.sum(F.log(prob1 / 2 + prob2 / 2))
+    from chainer import functions as F
+
+    theta1, theta2 = F.split_axis(theta, 2, theta.ndim - 1)
+    log_prior1 = F.sum(gaussian.gaussian_log_likelihood(theta1, 0, VAR1),
+                       axis=-1)
+    log_prior2 = F.sum(gaussian.gaussian_log_likelihood(theta2, 0, VAR2),
+                       axis=-1)
+    log_prob1 = gaussian.gaussian_log_likelihood(x, theta1, VAR_X)
+    log_prob2 = gaussian.gaussian_log_likelihood(x, theta1 + theta2, VAR_X)
+    # log(prob1 / 2 + prob2 / 2) without leaving log space
+    log_prob = F.logsumexp(F.stack((log_prob1, log_prob2)), axis=0)
+    log_likelihood = F.sum(log_prob, axis=-1) - len(x) * numpy.log(2)
     if n is not None:
         log_likelihood *= n / len(x)
     return log_prior1 + log_prior2 + log_likelihood
@@ -72,13 +95,547 @@ def calc_grad(theta, x, n=None):
     """Computes gradient of log posterior w.r.t. parameter
 
     Args:
-        theta(numpy.ndarray): model parameters
+        theta(numpy.ndarray): model parameters of shape ``(2, )``,
+        or ``(K, 2)`` for ``K`` independent chains
         x(numpy.ndarray): sample data
     Returns:
-        numpy.ndarray: ``dp(theta | x) / dtheta``
+        numpy.ndarray: ``dp(theta | x) / dtheta`` whose shape is
+        same as that of ``theta``
     """
+    import chainer
+    from chainer import functions as F
+
     theta = chainer.Variable(numpy.array(theta, dtype=numpy.float32))
-    log_posterior = calc_log_posterior(theta, x, n)
+    # chains are independent, so the gradient of the sum over chains
+    # is the per-chain gradient
+    log_posterior = F.sum(calc_log_posterior(theta, x, n))
     theta.zerograd()
     log_posterior.backward()
     return theta.grad
+
+
+def calc_log_posterior_and_grad(theta, x, n=None):
+    """Computes log posterior and its gradient with one forward pass
+
+    Args:
+        theta(numpy.ndarray): model parameters of shape ``(2, )``,
+        or ``(K, 2)`` for ``K`` independent chains
+        x(numpy.ndarray): sample data
+        n(int): total data size
+    Returns:
+        pair of numpy.ndarray: log posterior of shape ``theta.shape[:-1]``
+        and its gradient whose shape is same as that of ``theta``
+    """
+    import chainer
+    from chainer import functions as F
+
+    theta = chainer.Variable(numpy.array(theta, dtype=numpy.float32))
+    log_posterior = calc_log_posterior(theta, x, n)
+    theta.zerograd()
+    F.sum(log_posterior).backward()
+    return log_posterior.data, theta.grad
+
+
+def calc_log_posterior_numpy(theta, x, n=None):
+    """Closed-form NumPy counterpart of :func:`calc_log_posterior`
+
+    The mixture likelihood is evaluated in log space with log-sum-exp,
+    so points far from both components do not underflow.
+
+    Args:
+        theta(numpy.ndarray): model parameters of shape ``(..., 2)``
+        x(numpy.ndarray): sample data of shape ``(B, )``
+        n(int): total data size
+    Returns:
+        numpy.ndarray: unnormalized log posterior,
+        ``log p(theta | x) + C`` of shape ``theta.shape[:-1]``
+    """
+
+    theta = numpy.asarray(theta)
+    theta1 = theta[..., 0:1]
+    theta2 = theta[..., 1:2]
+    log_prior = (-(theta1[..., 0] ** 2) / VAR1 / 2
+                 - (theta2[..., 0] ** 2) / VAR2 / 2
+                 - gaussian.log_normalizer(VAR1)
+                 - gaussian.log_normalizer(VAR2))
+    d1 = x - theta1
+    d2 = d1 - theta2
+    log_prob = numpy.logaddexp(-d1 ** 2 / VAR_X / 2, -d2 ** 2 / VAR_X / 2)
+    log_likelihood = (numpy.sum(log_prob, axis=-1)
+                      - len(x) * (numpy.log(2)
+                                  + gaussian.log_normalizer(VAR_X)))
+    if n is not None:
+        log_likelihood *= n / len(x)
+    return log_prior + log_likelihood
+
+
+def calc_grad_numpy(theta, x, n=None):
+    """Closed-form NumPy counterpart of :func:`calc_grad`
+
+    Args:
+        theta(numpy.ndarray): model parameters of shape ``(..., 2)``
+        x(numpy.ndarray): sample data of shape ``(B, )``
+        n(int): total data size
+    Returns:
+        numpy.ndarray: ``dp(theta | x) / dtheta`` whose shape is
+        same as that of ``theta``
+    """
+
+    theta = numpy.asarray(theta)
+    theta1 = theta[..., 0:1]
+    theta2 = theta[..., 1:2]
+    d1 = x - theta1
+    d2 = d1 - theta2
+    log_prob1 = -d1 ** 2 / VAR_X / 2
+    log_prob2 = -d2 ** 2 / VAR_X / 2
+    # responsibility of the second component, N(theta1 + theta2, VAR_X)
+    w = numpy.exp(log_prob2 - numpy.logaddexp(log_prob1, log_prob2))
+    scale = 1.0 if n is None else n / len(x)
+    grad = numpy.empty(theta.shape, dtype=numpy.result_type(theta, x, 1.0))
+    grad[..., 0] = (scale * numpy.sum(d1 - w * theta2, axis=-1) / VAR_X
+                    - theta1[..., 0] / VAR1)
+    grad[..., 1] = (scale * numpy.sum(w * d2, axis=-1) / VAR_X
+                    - theta2[..., 0] / VAR2)
+    return grad
+
+
+def calc_log_posterior_and_grad_numpy(theta, x, n=None):
+    """Computes log posterior and its gradient in one pass
+
+    Args:
+        theta(numpy.ndarray): model parameters of shape ``(..., 2)``
+        x(numpy.ndarray): sample data of shape ``(B, )``
+        n(int): total data size
+    Returns:
+        pair of numpy.ndarray: results of :func:`calc_log_posterior_numpy`
+        and :func:`calc_grad_numpy`
+    """
+
+    theta = numpy.asarray(theta)
+    theta1 = theta[..., 0:1]
+    theta2 = theta[..., 1:2]
+    d1 = x - theta1
+    d2 = d1 - theta2
+    log_prob1 = -d1 ** 2 / VAR_X / 2
+    log_prob2 = -d2 ** 2 / VAR_X / 2
+    log_prob = numpy.logaddexp(log_prob1, log_prob2)
+    w = numpy.exp(log_prob2 - log_prob)
+    scale = 1.0 if n is None else n / len(x)
+
+    log_prior = (-(theta1[..., 0] ** 2) / VAR1 / 2
+                 - (theta2[..., 0] ** 2) / VAR2 / 2
+                 - gaussian.log_normalizer(VAR1)
+                 - gaussian.log_normalizer(VAR2))
+    log_likelihood = (numpy.sum(log_prob, axis=-1)
+                      - len(x) * (numpy.log(2)
+                                  + gaussian.log_normalizer(VAR_X)))
+    log_posterior = log_prior + scale * log_likelihood
+
+    grad = numpy.empty(theta.shape, dtype=numpy.result_type(theta, x, 1.0))
+    grad[..., 0] = (scale * numpy.sum(d1 - w * theta2, axis=-1) / VAR_X
+                    - theta1[..., 0] / VAR1)
+    grad[..., 1] = (scale * numpy.sum(w * d2, axis=-1) / VAR_X
+                    - theta2[..., 0] / VAR2)
+    return log_posterior, grad
+
+
+class Model(object):
+    """Interface of models sampled by the samplers
+
+    Parameters are flat vectors of shape ``(dim, )``, or ``(..., dim)``
+    for independent chains, which are all evaluated in one call.
+    Subclasses implement the log prior, the per-datum log likelihood and
+    the gradient of the log likelihood summed over a minibatch; the log
+    posterior and its gradient, with the likelihood rescaled to the total
+    data size, are derived from them and have the signatures expected
+    from gradient backends (see :mod:`backend`).
+
+    Attributes:
+        dim(int): # of parameters
+    """
+
+    dim = None
+
+    def log_prior(self, theta):
+        """Returns ``log p(theta)`` of shape ``theta.shape[:-1]``"""
+
+        raise NotImplementedError
+
+    def grad_log_prior(self, theta):
+        """Returns ``d log p(theta) / dtheta``"""
+
+        raise NotImplementedError
+
+    def log_likelihood(self, theta, x):
+        """Returns per-datum log likelihood
+
+        Args:
+            theta(numpy.ndarray): parameters of shape ``(..., dim)``
+            x(numpy.ndarray): minibatch of ``B`` data points
+        Returns:
+            numpy.ndarray: ``log p(x_i | theta)`` of shape
+            ``theta.shape[:-1] + (B, )``
+        """
+
+        raise NotImplementedError
+
+    def grad_log_likelihood(self, theta, x):
+        """Returns gradient of log likelihood summed over minibatch"""
+
+        raise NotImplementedError
+
+    def value_and_grad_log_likelihood(self, theta, x):
+        """Returns log likelihood summed over minibatch and its gradient"""
+
+        return (numpy.sum(self.log_likelihood(theta, x), axis=-1),
+                self.grad_log_likelihood(theta, x))
+
+    def log_posterior(self, theta, x, n=None):
+        """Returns unnormalized log posterior
+
+        Args:
+            theta(numpy.ndarray): parameters of shape ``(..., dim)``
+            x(numpy.ndarray): minibatch
+            n(int): total data size. If given, the log likelihood is
+            rescaled by ``n / len(x)``
+        Returns:
+            numpy.ndarray: log posterior of shape ``theta.shape[:-1]``
+        """
+
+        theta = numpy.asarray(theta)
+        scale = 1.0 if n is None else n / len(x)
+        return (self.log_prior(theta)
+                + scale * numpy.sum(self.log_likelihood(theta, x), axis=-1))
+
+    def grad(self, theta, x, n=None):
+        """Returns gradient of :meth:`log_posterior`"""
+
+        theta = numpy.asarray(theta)
+        scale = 1.0 if n is None else n / len(x)
+        grad = self.grad_log_likelihood(theta, x)
+        grad *= scale
+        grad += self.grad_log_prior(theta)
+        return grad
+
+    def value_and_grad(self, theta, x, n=None):
+        """Returns :meth:`log_posterior` and :meth:`grad` in one pass"""
+
+        theta = numpy.asarray(theta)
+        scale = 1.0 if n is None else n / len(x)
+        value, grad = self.value_and_grad_log_likelihood(theta, x)
+        grad *= scale
+        grad += self.grad_log_prior(theta)
+        return self.log_prior(theta) + scale * value, grad
+
+    def sample_prior(self, size=None, rng=None):
+        """Draws parameters from the prior
+
+        Args:
+            size(int): # of chains. If ``None``, a single parameter of
+            shape ``(dim, )`` is drawn, otherwise parameters of shape
+            ``(size, dim)``
+            rng: random number generator. If ``None``, the global
+            ``numpy.random`` is used.
+        """
+
+        raise NotImplementedError
+
+    def generate(self, N, theta=None, rng=None):
+        """Generates data set of size ``N`` from parameter ``theta``
+
+        If ``theta`` is ``None``, it is drawn from the prior.
+        """
+
+        raise NotImplementedError
+
+
+class GaussianMixture(Model):
+    """The toy Gaussian mixture with ``theta = (theta1, theta2)``
+
+    Log posterior and gradients are the closed-form NumPy functions of
+    this module.
+    """
+
+    dim = 2
+
+    def log_prior(self, theta):
+        theta = numpy.asarray(theta)
+        return (-(theta[..., 0] ** 2) / VAR1 / 2
+                - (theta[..., 1] ** 2) / VAR2 / 2
+                - gaussian.log_normalizer(VAR1)
+                - gaussian.log_normalizer(VAR2))
+
+    def grad_log_prior(self, theta):
+        return -numpy.asarray(theta) / [VAR1, VAR2]
+
+    def log_likelihood(self, theta, x):
+        theta = numpy.asarray(theta)
+        log_prob1 = gaussian.gaussian_log_likelihood(
+            x, theta[..., 0:1], VAR_X)
+        log_prob2 = gaussian.gaussian_log_likelihood(
+            x, theta[..., 0:1] + theta[..., 1:2], VAR_X)
+        log_prob = numpy.logaddexp(log_prob1, log_prob2, out=log_prob1)
+        log_prob -= numpy.log(2)
+        return log_prob
+
+    def grad_log_likelihood(self, theta, x):
+        return calc_grad_numpy(theta, x) - self.grad_log_prior(theta)
+
+    def value_and_grad_log_likelihood(self, theta, x):
+        value, grad = calc_log_posterior_and_grad_numpy(theta, x)
+        grad -= self.grad_log_prior(theta)
+        return value - self.log_prior(theta), grad
+
+    def log_posterior(self, theta, x, n=None):
+        return calc_log_posterior_numpy(theta, x, n)
+
+    def grad(self, theta, x, n=None):
+        return calc_grad_numpy(theta, x, n)
+
+    def value_and_grad(self, theta, x, n=None):
+        return calc_log_posterior_and_grad_numpy(theta, x, n)
+
+    def sample_prior(self, size=None, rng=None):
+        return sample_from_prior(size, rng)
+
+    def generate(self, N, theta=None, rng=None):
+        if theta is None:
+            theta = (THETA1, THETA2)
+        return generate(N, theta[0], theta[1], rng=rng)
+
+
+class _GaussianPriorModel(Model):
+    """Model with isotropic Gaussian prior ``N(0, prior_var)``"""
+
+    def __init__(self, dim, prior_var):
+        self.dim = dim
+        self.prior_var = prior_var
+
+    def log_prior(self, theta):
+        theta = numpy.asarray(theta)
+        return (-numpy.sum(theta ** 2, axis=-1) / self.prior_var / 2
+                - self.dim * gaussian.log_normalizer(self.prior_var))
+
+    def grad_log_prior(self, theta):
+        return -numpy.asarray(theta) / self.prior_var
+
+    def sample_prior(self, size=None, rng=None):
+        rng = numpy.random if rng is None else rng
+        shape = (self.dim,) if size is None else (size, self.dim)
+        return rng.standard_normal(shape) * numpy.sqrt(self.prior_var)
+
+
+class _GeneralizedLinearModel(_GaussianPriorModel):
+    """Model whose likelihood depends on ``z = w^T f + b``
+
+    Data points are rows ``(f_1, ..., f_n_features, y)`` and parameters
+    are ``(w_1, ..., w_n_features, b)``. Subclasses define the
+    log likelihood of ``y`` given ``z`` and its derivative w.r.t. ``z``.
+    """
+
+    def __init__(self, n_features, prior_var):
+        super(_GeneralizedLinearModel, self).__init__(n_features + 1,
+                                                      prior_var)
+        self.n_features = n_features
+
+    def predict(self, theta, features):
+        """Returns ``z = w^T f + b`` of shape ``theta.shape[:-1] + (B, )``"""
+
+        theta = numpy.asarray(theta)
+        return (numpy.matmul(theta[..., None, :-1], features.T)[..., 0, :]
+                + theta[..., -1:])
+
+    def _log_likelihood(self, z, y):
+        raise NotImplementedError
+
+    def _dz(self, z, y):
+        raise NotImplementedError
+
+    def log_likelihood(self, theta, x):
+        return self._log_likelihood(self.predict(theta, x[:, :-1]), x[:, -1])
+
+    def _grad(self, dz, features):
+        # chain rule through z = w^T f + b
+        return numpy.concatenate(
+            (numpy.matmul(dz[..., None, :], features)[..., 0, :],
+             numpy.sum(dz, axis=-1)[..., None]), axis=-1)
+
+    def grad_log_likelihood(self, theta, x):
+        features, y = x[:, :-1], x[:, -1]
+        return self._grad(self._dz(self.predict(theta, features), y),
+                          features)
+
+    def value_and_grad_log_likelihood(self, theta, x):
+        features, y = x[:, :-1], x[:, -1]
+        z = self.predict(theta, features)
+        return (numpy.sum(self._log_likelihood(z, y), axis=-1),
+                self._grad(self._dz(z, y), features))
+
+    def _sample_y(self, z, rng):
+        raise NotImplementedError
+
+    def generate(self, N, theta=None, rng=None):
+        rng = numpy.random if rng is None else rng
+        if theta is None:
+            theta = self.sample_prior(rng=rng)
+        features = rng.standard_normal((N, self.n_features))
+        y = self._sample_y(self.predict(theta, features), rng)
+        return numpy.column_stack((features, y))
+
+
+class LinearRegression(_GeneralizedLinearModel):
+    """Bayesian linear regression ``y ~ N(w^T f + b, noise_var)``
+
+    Args:
+        n_features(int): # of features
+        noise_var(float): variance of observation noise
+        prior_var(float): variance of the prior of weights and bias
+    """
+
+    def __init__(self, n_features, noise_var=1.0, prior_var=1.0):
+        super(LinearRegression, self).__init__(n_features, prior_var)
+        self.noise_var = noise_var
+
+    def _log_likelihood(self, z, y):
+        return gaussian.gaussian_log_likelihood(y, z, self.noise_var)
+
+    def _dz(self, z, y):
+        return (y - z) / self.noise_var
+
+    def _sample_y(self, z, rng):
+        return z + numpy.sqrt(self.noise_var) * rng.standard_normal(z.shape)
+
+
+class LogisticRegression(_GeneralizedLinearModel):
+    """Bayesian logistic regression ``y ~ Bernoulli(sigmoid(w^T f + b))``
+
+    Labels ``y`` are 0 or 1.
+
+    Args:
+        n_features(int): # of features
+        prior_var(float): variance of the prior of weights and bias
+    """
+
+    def __init__(self, n_features, prior_var=1.0):
+        super(LogisticRegression, self).__init__(n_features, prior_var)
+
+    def _log_likelihood(self, z, y):
+        # log sigmoid(z) if y == 1, log sigmoid(-z) if y == 0
+        return y * z - numpy.logaddexp(0, z)
+
+    def _dz(self, z, y):
+        return y - 1 / (1 + numpy.exp(-z))
+
+    def _sample_y(self, z, rng):
+        return (rng.uniform(size=z.shape) < 1 / (1 + numpy.exp(-z))).astype(
+            numpy.float64)
+
+
+class MLP(_GaussianPriorModel):
+    """Bayesian regression with a one-hidden-layer ``tanh`` network
+
+    ``y ~ N(w2^T tanh(W1^T f + b1) + b2, noise_var)``. Parameters are
+    the flattened ``(W1, b1, w2, b2)`` of sizes ``n_features * n_hidden``,
+    ``n_hidden``, ``n_hidden`` and 1. Data points are rows
+    ``(f_1, ..., f_n_features, y)``.
+
+    Args:
+        n_features(int): # of features
+        n_hidden(int): # of hidden units
+        noise_var(float): variance of observation noise
+        prior_var(float): variance of the prior of weights and biases
+    """
+
+    def __init__(self, n_features, n_hidden=10, noise_var=1.0,
+                 prior_var=1.0):
+        dim = (n_features + 2) * n_hidden + 1
+        super(MLP, self).__init__(dim, prior_var)
+        self.n_features = n_features
+        self.n_hidden = n_hidden
+        self.noise_var = noise_var
+        self._log_normalizer = gaussian.log_normalizer(noise_var)
+
+    def unpack(self, theta):
+        """Returns views ``(W1, b1, w2, b2)`` of flat parameters"""
+
+        theta = numpy.asarray(theta)
+        f, h = self.n_features, self.n_hidden
+        batch = theta.shape[:-1]
+        W1 = theta[..., :f * h].reshape(batch + (f, h))
+        b1 = theta[..., f * h: (f + 1) * h]
+        w2 = theta[..., (f + 1) * h: (f + 2) * h]
+        b2 = theta[..., -1]
+        return W1, b1, w2, b2
+
+    def _forward(self, theta, features):
+        W1, b1, w2, b2 = self.unpack(theta)
+        hidden = numpy.tanh(numpy.matmul(features, W1) + b1[..., None, :])
+        out = numpy.matmul(hidden, w2[..., :, None])[..., 0] + b2[..., None]
+        return hidden, out
+
+    def predict(self, theta, features):
+        """Returns network output of shape ``theta.shape[:-1] + (B, )``"""
+
+        return self._forward(theta, features)[1]
+
+    def log_likelihood(self, theta, x):
+        return gaussian.gaussian_log_likelihood(
+            x[:, -1], self.predict(theta, x[:, :-1]), self.noise_var)
+
+    def _backward(self, theta, features, hidden, r):
+        _, _, w2, _ = self.unpack(theta)
+        # r is the derivative w.r.t. the output
+        d_hidden = r[..., :, None] * w2[..., None, :]
+        d_hidden *= 1 - hidden ** 2
+        grads = (numpy.matmul(features.T, d_hidden),
+                 numpy.sum(d_hidden, axis=-2),
+                 numpy.matmul(r[..., None, :], hidden)[..., 0, :],
+                 numpy.sum(r, axis=-1)[..., None])
+        batch = r.shape[:-1]
+        return numpy.concatenate(
+            [g.reshape(batch + (-1,)) for g in grads], axis=-1)
+
+    def grad_log_likelihood(self, theta, x):
+        return self.value_and_grad_log_likelihood(theta, x)[1]
+
+    def value_and_grad_log_likelihood(self, theta, x):
+        features = x[:, :-1]
+        hidden, out = self._forward(theta, features)
+        r = x[:, -1] - out
+        value = (-numpy.sum(r ** 2, axis=-1) / self.noise_var / 2
+                 - len(x) * self._log_normalizer)
+        r /= self.noise_var
+        return value, self._backward(theta, features, hidden, r)
+
+    def generate(self, N, theta=None, rng=None):
+        rng = numpy.random if rng is None else rng
+        if theta is None:
+            theta = self.sample_prior(rng=rng)
+        features = rng.standard_normal((N, self.n_features))
+        y = (self.predict(theta, features)
+             + numpy.sqrt(self.noise_var) * rng.standard_normal(N))
+        return numpy.column_stack((features, y))
+
+
+MODELS = {
+    'mixture': GaussianMixture,
+    'linear': LinearRegression,
+    'logistic': LogisticRegression,
+    'mlp': MLP,
+}
+
+
+def get_model(name, **kwargs):
+    """Creates model by name
+
+    Args:
+        name(str): one of ``MODELS``
+        kwargs: passed to the constructor of the model
+    Returns:
+        Model: model
+    """
+
+    if name not in MODELS:
+        raise ValueError('unknown model: {} (choose from {})'.format(
+            name, ', '.join(sorted(MODELS))))
+    return MODELS[name](**kwargs)
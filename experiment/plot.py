@@ -1,24 +1,199 @@
-from matplotlib import pyplot
+"""2-D density plots of samples
+
+Samples are binned into a fixed grid chunk by chunk
+(:class:`Histogram2D`), so traces larger than memory can be plotted from
+a :class:`tracefile.TraceReader` without materializing them. The density
+is drawn once as a raster image; per-chain densities can be overlaid as
+contour lines. :func:`figure` creates a figure on the Agg canvas without
+going through ``pyplot``, for fast PNG output on headless machines.
+"""
+
+from matplotlib import figure as mpl_figure
+from matplotlib.backends import backend_agg
 import numpy
+import six
 
 
-def visualize2D(fig, ax, xs, ys, bins=200,
-                xlabel='x', ylabel='y',
-                xlim=None, ylim=None):
-    H, xedges, yedges = numpy.histogram2d(xs, ys, bins)
-    H = numpy.rot90(H)
-    H = numpy.flipud(H)
-    Hmasked = numpy.ma.masked_where(H == 0, H)
+class Histogram2D(object):
+    """2-D histogram accumulated over chunks of samples
+
+    Args:
+        bins(int): # of bins along each axis
+        xlim(pair of floats): range of x
+        ylim(pair of floats): range of y
+        n_hist(int): # of histograms accumulated side by side
+        (e.g. one per chain)
+    """
+
+    def __init__(self, bins, xlim, ylim, n_hist=1):
+        self.bins = bins
+        self.xedges = numpy.linspace(xlim[0], xlim[1], bins + 1)
+        self.yedges = numpy.linspace(ylim[0], ylim[1], bins + 1)
+        self.counts = numpy.zeros((n_hist, bins, bins), dtype=numpy.int64)
+        self._lo = numpy.array([xlim[0], ylim[0]], dtype=numpy.float64)
+        self._scale = bins / numpy.array(
+            [xlim[1] - xlim[0], ylim[1] - ylim[0]], dtype=numpy.float64)
+
+    def update(self, xs, ys, i=0):
+        """Adds samples to the ``i``-th histogram
+
+        Samples outside the range are ignored.
+        """
+
+        xs = numpy.asarray(xs, dtype=numpy.float64).ravel()
+        ys = numpy.asarray(ys, dtype=numpy.float64).ravel()
+        # uniform bins: index arithmetic instead of searching edges
+        ix = numpy.floor((xs - self._lo[0]) * self._scale[0])
+        iy = numpy.floor((ys - self._lo[1]) * self._scale[1])
+        # the upper edge belongs to the last bin as in numpy.histogram2d
+        ix[xs == self.xedges[-1]] = self.bins - 1
+        iy[ys == self.yedges[-1]] = self.bins - 1
+        inside = (ix >= 0) & (ix < self.bins) & (iy >= 0) & (iy < self.bins)
+        flat = (ix[inside] * self.bins + iy[inside]).astype(numpy.int64)
+        self.counts[i] += numpy.bincount(
+            flat, minlength=self.bins * self.bins).reshape(self.bins,
+                                                           self.bins)
+
+    @property
+    def total(self):
+        """numpy.ndarray: counts summed over histograms"""
+
+        return self.counts.sum(axis=0)
+
+
+def data_range(chunks, margin=0.0):
+    """Returns ranges of x and y over chunks of samples
+
+    Args:
+        chunks: iterable of ``(xs, ys)`` pairs of arrays
+        margin(float): relative margin added to both ends
+    Returns:
+        pair of tuples: ``(xmin, xmax), (ymin, ymax)``
+    """
 
-    ax.pcolormesh(xedges, yedges, Hmasked)
+    lo = numpy.full(2, numpy.inf)
+    hi = numpy.full(2, -numpy.inf)
+    for xs, ys in chunks:
+        if numpy.size(xs) == 0:
+            continue
+        lo = numpy.minimum(lo, (numpy.min(xs), numpy.min(ys)))
+        hi = numpy.maximum(hi, (numpy.max(xs), numpy.max(ys)))
+    if not numpy.all(numpy.isfinite(lo)):
+        return (0.0, 1.0), (0.0, 1.0)
+    width = hi - lo
+    # constant data gets a unit-width range
+    pad = numpy.where(width > 0, margin * width, 0.5)
+    lo, hi = lo - pad, hi + pad
+    return (lo[0], hi[0]), (lo[1], hi[1])
 
+
+def histogram_trace(samples, bins=200, xlim=None, ylim=None, dims=(0, 1),
+                    per_chain=False, chunk_size=65536):
+    """Bins samples of a trace chunk by chunk
+
+    Args:
+        samples: array of shape ``(n, K, D)`` (e.g. a memmap) or
+        :class:`tracefile.TraceReader`
+        bins(int): # of bins along each axis
+        xlim(pair of floats): range of x. If ``None``, the range of the
+        samples, found by an extra pass over the chunks.
+        ylim(pair of floats): range of y, as ``xlim``
+        dims(pair of ints): parameters plotted along x and y
+        per_chain(bool): If true, a histogram per chain is kept
+        chunk_size(int): # of samples per chunk
+    Returns:
+        Histogram2D: accumulated histogram
+    """
+
+    if hasattr(samples, 'iter_chunks'):
+        def chunks():
+            return samples.iter_chunks(chunk_size)
+        shape = samples.shape
+    else:
+        def chunks():
+            for i in six.moves.range(0, len(samples), chunk_size):
+                yield samples[i: i + chunk_size]
+        shape = samples.shape[1:]
+    dx, dy = dims
+    if xlim is None or ylim is None:
+        x_range, y_range = data_range(
+            (c[..., dx], c[..., dy]) for c in chunks())
+        xlim = x_range if xlim is None else xlim
+        ylim = y_range if ylim is None else ylim
+    n_chains = shape[0] if per_chain and len(shape) > 1 else 1
+    hist = Histogram2D(bins, xlim, ylim, n_chains)
+    for c in chunks():
+        if n_chains == 1:
+            hist.update(c[..., dx], c[..., dy])
+        else:
+            for k in six.moves.range(n_chains):
+                hist.update(c[:, k, dx], c[:, k, dy], k)
+    return hist
+
+
+def figure(**kwargs):
+    """Creates figure on the Agg canvas, independent of ``pyplot``
+
+    The figure is rendered only when saved, e.g. ``fig.savefig(path)``.
+    """
+
+    fig = mpl_figure.Figure(**kwargs)
+    backend_agg.FigureCanvasAgg(fig)
+    return fig
+
+
+def draw_histogram(fig, ax, hist, xlabel='x', ylabel='y', overlay=None,
+                   contour_bins=40):
+    """Draws accumulated histogram as a raster image with a colorbar
+
+    Args:
+        fig(matplotlib.figure.Figure): figure holding ``ax``
+        ax(matplotlib.axes.Axes): axes to draw on
+        hist(Histogram2D): histogram
+        xlabel(str): label of x axis
+        ylabel(str): label of y axis
+        overlay(bool): If true, the histogram of each chain is drawn
+        as contour lines over the total density. If ``None``, chains are
+        overlaid when there is more than one histogram.
+        contour_bins(int): approximate # of bins along each axis of
+        the grid contours are drawn on
+    """
+
+    total = hist.total
+    extent = (hist.xedges[0], hist.xedges[-1],
+              hist.yedges[0], hist.yedges[-1])
+    image = ax.imshow(numpy.ma.masked_equal(total.T, 0), origin='lower',
+                      extent=extent, aspect='auto', interpolation='nearest')
+    fig.colorbar(image, ax=ax)
+    if overlay is None:
+        overlay = len(hist.counts) > 1
+    if overlay:
+        # contours of raw counts are noisy; merge bins into a coarse grid
+        f = max(1, hist.bins // contour_bins)
+        n = hist.bins // f
+        xc = hist.xedges[:n * f + 1:f]
+        yc = hist.yedges[:n * f + 1:f]
+        xc, yc = (xc[:-1] + xc[1:]) / 2, (yc[:-1] + yc[1:]) / 2
+        for k, counts in enumerate(hist.counts):
+            coarse = counts[:n * f, :n * f].reshape(n, f, n, f).sum(
+                axis=(1, 3))
+            if coarse.max() > 0:
+                ax.contour(xc, yc, coarse.T,
+                           levels=coarse.max() * numpy.array([0.1, 0.5]),
+                           colors='C{}'.format(k % 10), linewidths=1)
     ax.set_xlabel(xlabel)
     ax.set_ylabel(ylabel)
+    ax.set_xlim(extent[0], extent[1])
+    ax.set_ylim(extent[2], extent[3])
+
 
-    if xlim is None:
-        xlim = (min(xs), max(xs))
-    if ylim is None:
-        ylim = (min(ys), max(ys))
-    ax.set_xlim(*xlim)
-    ax.set_ylim(*ylim)
-    fig.colorbar(pyplot.contourf(Hmasked))
+def visualize2D(fig, ax, xs, ys, bins=200,
+                xlabel='x', ylabel='y',
+                xlim=None, ylim=None):
+    if xlim is None or ylim is None:
+        x_range, y_range = data_range([(xs, ys)])
+        xlim = x_range if xlim is None else xlim
+        ylim = y_range if ylim is None else ylim
+    hist = Histogram2D(bins, xlim, ylim)
+    hist.update(xs, ys)
+    draw_histogram(fig, ax, hist, xlabel, ylabel)
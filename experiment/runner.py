@@ -0,0 +1,208 @@
+"""Runs independent chains in parallel over a process pool
+
+Every chain gets its own ``numpy.random.Generator`` spawned from one
+``numpy.random.SeedSequence``, so results depend only on the seed and
+the chain index, not on the number of processes or scheduling order.
+
+Usage::
+
+    python runner.py sghmc --chains 32 --processes 8 --param F=10 --param D=1
+    python runner.py sgld --model logistic --features 20
+"""
+
+from __future__ import print_function
+import argparse
+import ast
+import multiprocessing
+import os
+
+import numpy
+
+import backend
+import cli
+import model
+import samplers
+import stepsize
+import tracefile
+
+
+# training data shared by the chains of a worker process
+_x = None
+
+
+def _init_worker(x):
+    global _x
+    _x = x
+
+
+def _run_chain(task):
+    index, seed_seq, spec = task
+    rng = numpy.random.default_rng(seed_seq)
+    grad_backend = backend.get_backend(spec['backend'], spec['model'])
+    sampler = samplers.get_sampler(spec['sampler'],
+                                   grad_backend=grad_backend, rng=rng,
+                                   **spec['params'])
+    theta = spec['model'].sample_prior(1, rng=rng)
+    n_batch = (len(_x) + spec['batchsize'] - 1) // spec['batchsize']
+    if spec['trace_dir'] is None:
+        trace = tracefile.ArrayTrace(
+            spec['epoch'] * n_batch, theta.shape,
+            thin=spec['thin'], burnin=spec['burnin'])
+    else:
+        path = os.path.join(spec['trace_dir'], 'chain_{}.trace'.format(index))
+        metadata = dict(spec, model=type(spec['model']).__name__,
+                        chain=index)
+        trace = tracefile.TraceWriter(
+            path, theta.shape, thin=spec['thin'], burnin=spec['burnin'],
+            metadata=metadata)
+    try:
+        with trace:
+            samplers.run(sampler, theta, _x, spec['epoch'],
+                         spec['batchsize'], spec['stepsize'],
+                         sampling=spec['sampling'], trace=trace)
+    finally:
+        backend.close(grad_backend)
+    if spec['trace_dir'] is None:
+        return trace.data
+    return path
+
+
+def run_chains(sampler, x, n_chains, n_epoch, batchsize, eps, params=None,
+               seed=0, processes=None, grad_backend='numpy',
+               sampling='shuffle', trace_dir=None, thin=1, burnin=0,
+               target=None):
+    """Runs independent chains in a process pool
+
+    Args:
+        sampler(str): sampler name (see ``samplers.SAMPLERS``)
+        x(numpy.ndarray): training data, sent once to each worker
+        n_chains(int): # of chains
+        n_epoch(int): # of epoch
+        batchsize(int): minibatch size
+        eps: step size schedule, a picklable callable mapping epoch index
+        to step size (e.g. :class:`stepsize.StepSizeGenerator`) or
+        a constant float
+        params(dict): hyperparameters passed to the sampler
+        seed(int): root seed of the ``SeedSequence``
+        processes(int): # of worker processes. If ``None``,
+        the number of CPUs is used.
+        grad_backend(str): gradient backend name
+        sampling(str): minibatch sampling method
+        trace_dir(str): If given, each chain streams its samples to
+        ``trace_dir/chain_<i>.trace``
+        thin(int): thinning interval
+        burnin(int): # of leading samples to discard
+        target(model.Model): model to sample. If ``None``, the Gaussian
+        mixture is used.
+    Returns:
+        list: samples of each chain of shape ``(n, 1, D)``. If
+        ``trace_dir`` is given, they are memory-mapped from trace files.
+    """
+
+    if not callable(eps):
+        eps = stepsize.Constant(eps)
+    if trace_dir is not None and not os.path.exists(trace_dir):
+        os.makedirs(trace_dir)
+    spec = {
+        'sampler': sampler,
+        'model': model.GaussianMixture() if target is None else target,
+        'params': dict(params or {}),
+        'backend': grad_backend,
+        'epoch': n_epoch,
+        'batchsize': batchsize,
+        'stepsize': eps,
+        'sampling': sampling,
+        'trace_dir': trace_dir,
+        'thin': thin,
+        'burnin': burnin,
+    }
+    seeds = numpy.random.SeedSequence(seed).spawn(n_chains)
+    tasks = [(i, s, spec) for i, s in enumerate(seeds)]
+    pool = multiprocessing.Pool(processes, _init_worker, (x,))
+    try:
+        results = pool.map(_run_chain, tasks, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+    if trace_dir is None:
+        return results
+    return [tracefile.open_trace(path).data for path in results]
+
+
+def _parse_param(s):
+    key, value = s.split('=', 1)
+    try:
+        value = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        pass
+    return key, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description='parallel chain runner')
+    parser.add_argument('sampler', choices=sorted(samplers.SAMPLERS))
+    parser.add_argument('--param', action='append', default=[],
+                        type=_parse_param,
+                        help='sampler hyperparameter as KEY=VALUE')
+    # model
+    parser.add_argument('--model', default='mixture', type=str,
+                        choices=sorted(model.MODELS),
+                        help='target model')
+    parser.add_argument('--features', default=10, type=int,
+                        help='# of features of regression models')
+    parser.add_argument('--hidden', default=10, type=int,
+                        help='# of hidden units of mlp')
+    # true parameter
+    parser.add_argument('--theta1', default=0, type=float,
+                        help='true paremter 1')
+    parser.add_argument('--theta2', default=1, type=float,
+                        help='true paremter 2')
+    # data
+    parser.add_argument('--N', default=100, type=int,
+                        help='training data size')
+    parser.add_argument('--batchsize', default=10, type=int,
+                        help='batchsize')
+    parser.add_argument('--epoch', default=1000, type=int,
+                        help='epoch num')
+    parser.add_argument('--eps-start', default=0.01, type=float,
+                        help='start stepsize')
+    parser.add_argument('--eps-end', default=None, type=float,
+                        help='end stepsize. If omitted, stepsize is '
+                        'kept constant')
+    # others
+    parser.add_argument('--chains', default=4, type=int,
+                        help='number of independent chains')
+    parser.add_argument('--processes', default=None, type=int,
+                        help='number of worker processes')
+    parser.add_argument('--backend', default='numpy', type=str,
+                        choices=sorted(backend.BACKENDS),
+                        help='gradient backend')
+    parser.add_argument('--seed', default=0, type=int, help='random seed')
+    parser.add_argument('--trace-dir', default=None, type=str,
+                        help='If given, chains stream samples to this '
+                        'directory')
+    args = parser.parse_args()
+
+    if args.eps_end is None:
+        eps = stepsize.Constant(args.eps_start)
+    else:
+        eps = stepsize.StepSizeGenerator(args.epoch, args.eps_start,
+                                         args.eps_end)
+    target = cli.make_model(args)
+    theta = None
+    if args.model == 'mixture':
+        theta = (args.theta1, args.theta2)
+    data_seed = numpy.random.SeedSequence([args.seed, 0xda7a])
+    x = target.generate(args.N, theta,
+                        rng=numpy.random.default_rng(data_seed))
+    chains = run_chains(args.sampler, x, args.chains, args.epoch,
+                        args.batchsize, eps, dict(args.param),
+                        seed=args.seed, processes=args.processes,
+                        grad_backend=args.backend,
+                        trace_dir=args.trace_dir, target=target)
+    for i, samples in enumerate(chains):
+        print(i, samples[-1, 0], numpy.mean(samples[:, 0], axis=0))
+
+
+if __name__ == '__main__':
+    main()
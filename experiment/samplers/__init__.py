@@ -0,0 +1,45 @@
+"""SG-MCMC samplers sharing one driver loop
+
+Each sampler is a step kernel implementing :class:`Sampler`;
+:func:`run` owns the hot loop (shuffling, minibatch slicing,
+step-size schedule and trace bookkeeping); :func:`run_async` applies
+gradients computed by worker processes.
+"""
+
+from samplers.asynchronous import DelayStats  # NOQA
+from samplers.asynchronous import run_async  # NOQA
+from samplers.base import Sampler  # NOQA
+from samplers.driver import run  # NOQA
+from samplers.hmc import HMC  # NOQA
+from samplers.minibatch import MinibatchIterator  # NOQA
+from samplers.msgnht import MSGNHT  # NOQA
+from samplers.msgnht import SymmetricMSGNHT  # NOQA
+from samplers.nuts import NUTS  # NOQA
+from samplers.preconditioned import PSGHMC  # NOQA
+from samplers.preconditioned import PSGLD  # NOQA
+from samplers.santa import Santa  # NOQA
+from samplers.sghmc import SGHMC  # NOQA
+from samplers.sghmc import SymmetricSGHMC  # NOQA
+from samplers.sgld import SGLD  # NOQA
+from samplers.tempering import ReplicaExchange  # NOQA
+
+
+SAMPLERS = dict((cls.name, cls) for cls in
+                (SGLD, SGHMC, MSGNHT, HMC, PSGLD, PSGHMC, SymmetricSGHMC,
+                 SymmetricMSGNHT, Santa, NUTS))
+
+
+def get_sampler(name, **kwargs):
+    """Creates sampler by name
+
+    Args:
+        name(str): one of ``SAMPLERS``
+        kwargs: passed to the constructor of the sampler
+    Returns:
+        samplers.Sampler: step kernel
+    """
+
+    if name not in SAMPLERS:
+        raise ValueError('unknown sampler: {} (choose from {})'.format(
+            name, ', '.join(sorted(SAMPLERS))))
+    return SAMPLERS[name](**kwargs)
@@ -0,0 +1,266 @@
+"""Asynchronous SG-MCMC with a local parameter server
+
+Worker processes compute minibatch gradients against a copy of ``theta``
+read from shared memory and push them to the updater (the calling
+process), which applies them with the step kernel of any sampler taking
+one gradient per update (:class:`samplers.SGLD`, or SGHMC / mSGNHT /
+Santa with ``L=1``). The kernel sees the pushed gradient in place of its
+gradient backend.
+
+A gradient computed at version ``v`` of ``theta`` and applied at version
+``t`` has staleness (delay) ``t - v``. Gradients staler than
+``staleness`` (2 by default) are dropped and their minibatch is
+recomputed, so every applied gradient is at most ``staleness`` updates
+old. A gradient of staleness ``d`` is applied with the step size divided
+by ``1 + d`` [Sra+16], which keeps the updates stable at step sizes that
+are stable for the sequential driver; fresh gradients get the full step.
+
+[Sra+16] [AdaDelay: Delay Adaptive Distributed Stochastic Optimization]
+(http://proceedings.mlr.press/v51/sra16.html)
+
+Workers inherit the training data when they are started and receive only
+minibatch indices, which are drawn by the updater.
+"""
+
+import itertools
+import multiprocessing
+
+import numpy
+import six
+
+import backend
+from samplers import minibatch
+import stepsize
+import tracefile
+
+
+_ONE_GRADIENT = ('run_async supports samplers taking one gradient and no '
+                 'log posterior per update (e.g. SGHMC with L=1)')
+
+
+class DelayStats(object):
+    """Staleness of the gradients applied by :func:`run_async`
+
+    Attributes:
+        counts(numpy.ndarray): # of applied gradients per staleness
+        dropped(int): # of gradients dropped for exceeding the bound
+    """
+
+    def __init__(self):
+        self.counts = numpy.zeros(0, dtype=numpy.int64)
+        self.dropped = 0
+
+    def update(self, delay):
+        if delay >= len(self.counts):
+            self.counts = numpy.concatenate(
+                (self.counts,
+                 numpy.zeros(delay + 1 - len(self.counts), numpy.int64)))
+        self.counts[delay] += 1
+
+    def drop(self):
+        self.dropped += 1
+
+    @property
+    def applied(self):
+        return int(self.counts.sum())
+
+    @property
+    def mean(self):
+        if self.applied == 0:
+            return float('nan')
+        return float(numpy.dot(numpy.arange(len(self.counts)), self.counts)
+                     / self.applied)
+
+    @property
+    def max(self):
+        nonzero = numpy.flatnonzero(self.counts)
+        return int(nonzero[-1]) if len(nonzero) else 0
+
+    def summary(self):
+        return {'applied': self.applied, 'dropped': self.dropped,
+                'mean_delay': self.mean, 'max_delay': self.max}
+
+
+class _PushedGradient(object):
+    """Gradient backend of the updater returning the pushed gradient"""
+
+    name = 'pushed'
+
+    def __init__(self):
+        self._grad = None
+
+    def push(self, grad):
+        self._grad = grad
+
+    @property
+    def pending(self):
+        return self._grad is not None
+
+    def grad(self, theta, x, n=None):
+        if self._grad is None:
+            raise ValueError(_ONE_GRADIENT)
+        grad, self._grad = self._grad, None
+        return grad
+
+    def log_posterior(self, theta, x, n=None):
+        raise ValueError(_ONE_GRADIENT)
+
+    def value_and_grad(self, theta, x, n=None):
+        raise ValueError(_ONE_GRADIENT)
+
+
+def _worker(grad_backend, x, N, shape, shared, version, lock, tasks,
+            results):
+    view = numpy.frombuffer(shared, dtype=numpy.float64).reshape(shape)
+    theta = numpy.empty(shape)
+    while True:
+        task = tasks.get()
+        if task is None:
+            backend.close(grad_backend)
+            return
+        task_id, idx = task
+        with lock:
+            theta[...] = view
+            v = version.value
+        try:
+            grad = grad_backend.grad(theta, numpy.asarray(x[idx]), N)
+        except Exception as e:  # NOQA
+            results.put((task_id, v, None, e))
+        else:
+            results.put((task_id, v, grad, None))
+
+
+def _get_result(results, workers):
+    while True:
+        try:
+            return results.get(timeout=1)
+        except six.moves.queue.Empty:
+            if not all(w.is_alive() for w in workers):
+                raise RuntimeError('a worker process exited unexpectedly')
+
+
+def _tasks(batches, n_epoch):
+    for _ in six.moves.range(n_epoch):
+        for idx in batches.indices():
+            yield idx
+
+
+def run_async(sampler, theta, x, n_epoch, batchsize, schedule,
+              n_workers=2, staleness=2, callback=None, sampling='shuffle',
+              trace=None, monitor=None, delays=None):
+    """Runs sampler with gradients computed by worker processes
+
+    Arguments are those of :func:`samplers.run`. Minibatches are
+    dispatched in the order of ``sampling``, but applied in the order
+    their gradients arrive; ``callback(epoch, i, theta)`` receives the
+    index ``i`` of the update in the epoch.
+
+    Args:
+        n_workers(int): # of worker processes
+        staleness(int): maximum staleness of applied gradients. If
+        ``None``, gradients are never dropped.
+        delays(DelayStats): If given, updated with the staleness of each
+        gradient
+    Returns:
+        tuple: last parameter and the trace. The trace is not closed.
+    """
+
+    if hasattr(sampler.grad_backend, 'begin_epoch'):
+        raise ValueError('run_async does not support backends with '
+                         'per-epoch state such as control variates')
+    if isinstance(sampling, minibatch.MinibatchIterator):
+        batches = sampling
+    else:
+        batches = minibatch.MinibatchIterator(x, batchsize, sampling,
+                                              rng=sampler.rng)
+    n_batch = len(batches)
+    n_step = n_epoch * n_batch
+    theta = numpy.array(theta, dtype=numpy.float64)
+    if trace is None:
+        trace = tracefile.ArrayTrace(n_step, theta.shape)
+    if delays is None:
+        delays = DelayStats()
+    eps = stepsize.expand(schedule, n_epoch, n_batch)
+    keep = stepsize.sampling_stage(schedule, n_epoch, n_batch)
+    sampler.reset(theta, x)
+
+    shared = multiprocessing.RawArray('d', theta.size)
+    view = numpy.frombuffer(shared, dtype=numpy.float64).reshape(theta.shape)
+    view[...] = theta
+    version = multiprocessing.RawValue('q', 0)
+    lock = multiprocessing.Lock()
+    task_queue = multiprocessing.Queue()
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(
+        target=_worker,
+        args=(sampler.grad_backend, x, len(x), theta.shape, shared, version,
+              lock, task_queue, results))
+        for _ in six.moves.range(n_workers)]
+    for w in workers:
+        w.daemon = True
+        w.start()
+
+    grad_backend = sampler.grad_backend
+    pushed = _PushedGradient()
+    sampler.grad_backend = pushed
+    tasks = _tasks(batches, n_epoch)
+    task_ids = itertools.count()
+    retry = []
+    in_flight = {}
+    # a task queued behind each busy worker hides the latency of the
+    # queue; with a staleness bound, extra tasks would mostly be dropped
+    max_in_flight = 2 * n_workers
+    if staleness is not None:
+        max_in_flight = max(1, min(max_in_flight, staleness + 1))
+    step = 0
+    try:
+        while step < n_step:
+            while len(in_flight) < max_in_flight:
+                idx = retry.pop() if retry else next(tasks, None)
+                if idx is None:
+                    break
+                task_id = next(task_ids)
+                in_flight[task_id] = idx
+                task_queue.put((task_id, idx))
+            task_id, v, grad, error = _get_result(results, workers)
+            idx = in_flight.pop(task_id)
+            if error is not None:
+                raise error
+            delay = step - v
+            if staleness is not None and delay > staleness:
+                delays.drop()
+                retry.append(idx)
+                continue
+            delays.update(delay)
+            pushed.push(grad)
+            # stale gradients take proportionally shorter steps
+            theta = sampler.update(theta, None, eps[step] / (1 + delay))
+            if pushed.pending:
+                raise ValueError(_ONE_GRADIENT)
+            with lock:
+                view[...] = theta
+                version.value = step + 1
+            if keep[step]:
+                trace.append(theta)
+                if monitor is not None:
+                    monitor.update(theta)
+            epoch, i = divmod(step, n_batch)
+            if callback is not None:
+                callback(epoch, i, theta)
+            step += 1
+            if (step % n_batch == 0 and monitor is not None
+                    and monitor.should_stop()):
+                break
+    finally:
+        sampler.grad_backend = grad_backend
+        for _ in workers:
+            task_queue.put(None)
+        # workers flush their results before they can exit
+        while any(w.is_alive() for w in workers):
+            try:
+                results.get(timeout=0.01)
+            except six.moves.queue.Empty:
+                pass
+        for w in workers:
+            w.join()
+    return theta, trace
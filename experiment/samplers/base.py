@@ -0,0 +1,98 @@
+import copy
+
+import numpy
+
+import backend
+
+
+class Sampler(object):
+    """Base class of step kernels
+
+    A sampler draws one sample per call of :meth:`update`.
+    Auxiliary variables (momentum, thermostat, ...) are held
+    as attributes and initialized by :meth:`reset`.
+
+    Args:
+        grad_backend: gradient backend (see :mod:`backend`).
+        If ``None``, the ``numpy`` backend is used.
+        rng: random number generator that provides
+        ``standard_normal``, ``uniform`` and ``permutation``
+        (e.g. ``numpy.random.RandomState``).
+        If ``None``, the global ``numpy.random`` is used.
+    """
+
+    name = None
+
+    def __init__(self, grad_backend=None, rng=None):
+        if grad_backend is None:
+            grad_backend = backend.get_backend('numpy')
+        self.grad_backend = grad_backend
+        self.rng = numpy.random if rng is None else rng
+        self.x = None
+        self.N = None
+
+    def reset(self, theta, x):
+        """Initializes sampler state before sampling
+
+        Args:
+            theta(numpy.ndarray): initial parameter of shape ``(K, D)``
+            x(numpy.ndarray): whole training data
+        """
+
+        self.x = x
+        self.N = len(x)
+
+    def get_state(self):
+        """Returns copy of the sampler state for checkpointing
+
+        The state holds all attributes except the gradient backend, the
+        random number generator and the training data, plus the state of
+        the gradient backend if it provides ``get_state``.
+        """
+
+        state = dict((k, copy.deepcopy(v)) for k, v in vars(self).items()
+                     if k not in ('grad_backend', 'rng', 'x'))
+        get_backend_state = getattr(self.grad_backend, 'get_state', None)
+        if get_backend_state is not None:
+            state['grad_backend'] = get_backend_state()
+        return state
+
+    def set_state(self, state):
+        """Restores state returned by :meth:`get_state`"""
+
+        state = copy.deepcopy(state)
+        backend_state = state.pop('grad_backend', None)
+        if backend_state is not None:
+            self.grad_backend.set_state(backend_state)
+        self.__dict__.update(state)
+
+    def begin_epoch(self, theta, epoch):
+        """Called by :func:`samplers.run` at the beginning of each epoch
+
+        Forwards to ``begin_epoch`` of the gradient backend if it has one
+        (e.g. :class:`backend.ControlVariate`).
+        """
+
+        hook = getattr(self.grad_backend, 'begin_epoch', None)
+        if hook is not None:
+            hook(theta, self.x, self.N, epoch)
+
+    def grad(self, theta, x):
+        return self.grad_backend.grad(theta, x, self.N)
+
+    def value_and_grad(self, theta, x):
+        return self.grad_backend.value_and_grad(theta, x, self.N)
+
+    def update(self, theta, x, eps):
+        """Draws next sample
+
+        Args:
+            theta(numpy.ndarray): current parameter
+            x(numpy.ndarray): minibatch
+            eps(float): step size
+        Returns:
+            numpy.ndarray: next parameter whose shape is same as ``theta``.
+            Samplers may update ``theta`` in place and return it.
+        """
+
+        raise NotImplementedError
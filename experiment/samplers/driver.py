@@ -0,0 +1,83 @@
+import numpy
+import six
+
+import checkpoint
+from samplers import minibatch
+import stepsize
+import tracefile
+
+
+def run(sampler, theta, x, n_epoch, batchsize, schedule, callback=None,
+        sampling='shuffle', trace=None, monitor=None, checkpointer=None,
+        resume=None):
+    """Runs sampler over minibatches
+
+    Args:
+        sampler(samplers.Sampler): step kernel
+        theta(numpy.ndarray): initial parameter of shape ``(K, D)``
+        x(numpy.ndarray): training data, possibly a memmap opened by
+        :func:`dataset.load`
+        n_epoch(int): # of epoch
+        batchsize(int): minibatch size
+        schedule: step size schedule (see :mod:`stepsize`), or any
+        callable mapping epoch index to step size. It is precomputed
+        for all iterations before sampling. Samples of the exploration
+        stage of a :class:`stepsize.Cyclical` schedule are passed to
+        ``callback``, but not to ``trace`` and ``monitor``.
+        callback(callable): If not ``None``, called as
+        ``callback(epoch, i, theta)`` after each sample, where ``i``
+        is the index of the minibatch in the epoch
+        sampling(str or samplers.MinibatchIterator): minibatch sampling
+        method, or iterator over minibatches of ``x`` to use as is
+        trace: destination of samples providing ``append(theta)``, e.g.
+        :class:`tracefile.TraceWriter`. If ``None``, samples are kept
+        in memory in a :class:`tracefile.ArrayTrace`.
+        monitor: If given, ``monitor.update(theta)`` is called after each
+        sample and sampling stops at the end of the first epoch where
+        ``monitor.should_stop()`` holds
+        (see :class:`diagnostics.OnlineDiagnostics`)
+        checkpointer(checkpoint.Checkpointer): If given, checkpoints are
+        taken at the end of epochs
+        resume(dict): If given, state loaded by :func:`checkpoint.load`
+        from which the run continues. ``theta`` is then ignored and
+        ``trace`` must be the one of the interrupted run (e.g. a
+        :class:`tracefile.TraceWriter` opened with ``resume=True``).
+    Returns:
+        tuple: last parameter and the trace. The trace is not closed.
+    """
+
+    if isinstance(sampling, minibatch.MinibatchIterator):
+        batches = sampling
+    else:
+        batches = minibatch.MinibatchIterator(x, batchsize, sampling,
+                                              rng=sampler.rng)
+    n_batch = len(batches)
+    # samplers may update theta in place
+    theta = numpy.array(theta, dtype=numpy.float64)
+    if trace is None:
+        trace = tracefile.ArrayTrace(n_epoch * n_batch, theta.shape)
+    eps = stepsize.expand(schedule, n_epoch, n_batch)
+    keep = stepsize.sampling_stage(schedule, n_epoch, n_batch)
+    sampler.reset(theta, x)
+    start = 0
+    if resume is not None:
+        theta, start = checkpoint.restore(resume, sampler, trace, monitor)
+    for epoch in six.moves.range(start, n_epoch):
+        sampler.begin_epoch(theta, epoch)
+        for i, x_batch in enumerate(batches.epoch()):
+            t = epoch * n_batch + i
+            theta = sampler.update(theta, x_batch, eps[t])
+            if keep[t]:
+                trace.append(theta)
+                if monitor is not None:
+                    monitor.update(theta)
+            if callback is not None:
+                callback(epoch, i, theta)
+        if checkpointer is not None:
+            checkpointer.end_epoch(epoch + 1, theta, sampler, trace,
+                                   monitor)
+        if monitor is not None and monitor.should_stop():
+            break
+    if checkpointer is not None:
+        checkpointer.close()
+    return theta, trace
@@ -0,0 +1,143 @@
+"""Hamiltonian Monte Carlo (HMC)[Neal10]
+
+[Neal10] [MCMC using Hamiltonian dynamics]
+(http://www.cs.utoronto.ca/~radford/ftp/ham-mcmc.pdf)
+"""
+
+import numpy
+import six
+
+from samplers import base
+
+
+class HMC(base.Sampler):
+    """HMC with ``L`` leapfrog steps per sample
+
+    Momentum is resampled for every proposal. In rejection sampling mode
+    the potential energy of the current state is cached, and that of
+    the proposal is taken from the last gradient evaluation of the
+    leapfrog when the minibatch is the training data itself (see
+    :meth:`samplers.MinibatchIterator.epoch`), so a proposal costs at
+    most one extra forward pass.
+
+    Args:
+        L(int): number of leapfrog steps
+        rejection_sampling(bool): If true, rejection phase is introduced
+    """
+
+    name = 'hmc'
+
+    def __init__(self, L=10, rejection_sampling=False,
+                 grad_backend=None, rng=None):
+        if L < 1:
+            raise ValueError('L must be at least 1')
+        super(HMC, self).__init__(grad_backend, rng)
+        self.L = L
+        self.rejection_sampling = rejection_sampling
+        self._theta = None
+        self._U = None
+
+    def reset(self, theta, x):
+        super(HMC, self).reset(theta, x)
+        self.clear_cache()
+
+    def clear_cache(self):
+        """Discards the cached potential energy
+
+        Called when the target changes, e.g. when
+        :class:`samplers.ReplicaExchange` moves its temperatures.
+        """
+
+        self._theta = None
+        self._U = None
+
+    def leapfrog(self, p, q, x, eps):
+        """Runs ``L`` leapfrog steps in place
+
+        The closing half step of momentum of each leapfrog step is
+        merged with the opening half step of the next one, so ``L``
+        steps cost ``L + 1`` gradient evaluations.
+
+        Args:
+            p(numpy.ndarray): generalized momuntum
+            q(numpy.ndarray): generalized coordinate
+            x(numpy.ndarray): sample data
+            eps(float): step size
+        Returns:
+            tuple of numpy.ndarray: updated momentum and coordinate,
+            and log posterior at the updated coordinate estimated
+            from ``x``
+        """
+
+        buf = numpy.empty_like(q)
+        d_q = self.grad(q, x)
+        d_q *= eps / 2
+        p += d_q
+        for l in six.moves.range(self.L):
+            numpy.multiply(p, eps, out=buf)
+            q += buf
+            if l < self.L - 1:
+                d_q = self.grad(q, x)
+                d_q *= eps
+            else:
+                log_posterior, d_q = self.value_and_grad(q, x)
+                d_q *= eps / 2
+            p += d_q
+        return p, q, log_posterior
+
+    def potential(self, q):
+        """Calculates potential energy of each chain over the whole data
+
+        The value at the current state is cached.
+
+        Args:
+            q(numpy.ndarray): generalized coordinate
+        Returns:
+            numpy.ndarray: potential energy ``U(q)``
+        """
+
+        if self._theta is None or not numpy.array_equal(q, self._theta):
+            self._theta = q.copy()
+            self._U = -self.grad_backend.log_posterior(q, self.x)
+        return self._U
+
+    def accept(self, H_prev, H_propose):
+        """Test to accept proposal parameter
+
+        Because of the conservation law of energy,
+        we can expect H is almost preserved (except numerical and/or
+        discretization error) and hence acc_ratio nearly equals to 1.0.
+        So, this acceptance step has almost no effect.
+
+        Args:
+            H_prev(numpy.ndarray): Hamiltonian of current state
+            H_propose(numpy.ndarray): Hamiltonian of proposal
+        Returns:
+            numpy.ndarray: boolean mask of accepted chains
+        """
+
+        with numpy.errstate(over='ignore'):
+            acc_ratio = numpy.minimum(1.0, numpy.exp(H_prev - H_propose))
+        return self.rng.uniform(size=acc_ratio.shape) < acc_ratio
+
+    def update(self, theta, x, eps):
+        p = self.rng.standard_normal(theta.shape)
+        p_propose, theta_propose, log_posterior = self.leapfrog(
+            p.copy(), theta.copy(), x, eps)
+        if not self.rejection_sampling:
+            return theta_propose
+
+        U = self.potential(theta)
+        if x is self.x:
+            # the minibatch is the whole data
+            U_propose = -log_posterior
+        else:
+            U_propose = -self.grad_backend.log_posterior(theta_propose,
+                                                         self.x)
+        H_prev = U + numpy.sum(p ** 2, axis=-1) / 2
+        H_propose = U_propose + numpy.sum(p_propose ** 2, axis=-1) / 2
+        accepted = self.accept(H_prev, H_propose)
+        theta = numpy.where(accepted[:, None], theta_propose, theta)
+        self._theta = theta.copy()
+        self._U = numpy.where(accepted, U_propose, U)
+        return theta
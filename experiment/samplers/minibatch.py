@@ -0,0 +1,195 @@
+import threading
+
+import numpy
+import six
+
+
+_END = object()
+# # of data points of a memmap read at once
+_CHUNK_SIZE = 65536
+
+
+SAMPLING_METHODS = ('shuffle', 'replacement', 'stratified')
+
+
+def _key(x):
+    return x[:, -1] if x.ndim == 2 else x
+
+
+def _chunked_strata(x, n_strata, chunk_size=_CHUNK_SIZE):
+    """Splits data into strata by quantile, reading it chunk by chunk
+
+    Quantiles are those of every ``len(x) // chunk_size``-th point.
+    """
+
+    step = max(1, len(x) // chunk_size)
+    edges = numpy.quantile(numpy.asarray(_key(x[::step])),
+                           numpy.arange(1, n_strata) / float(n_strata))
+    strata = numpy.empty(len(x), dtype=numpy.int64)
+    for i in six.moves.range(0, len(x), chunk_size):
+        key = numpy.asarray(_key(x[i: i + chunk_size]))
+        strata[i: i + chunk_size] = numpy.searchsorted(edges, key,
+                                                       side='right')
+    return strata
+
+
+class MinibatchIterator(object):
+    """Iterates over minibatches of training data
+
+    Per-minibatch cost scales with ``batchsize``, not with the data size.
+
+    * ``shuffle``: data is permuted once per epoch and minibatches are
+      contiguous views of the permuted copy.
+    * ``replacement``: each minibatch is drawn uniformly
+      with replacement.
+    * ``stratified``: data is permuted once per epoch so that
+      every stratum is spread evenly over the epoch, hence each
+      minibatch holds (approximately) proportional numbers of points
+      from each stratum.
+
+    If ``x`` is a :class:`numpy.memmap` (see :mod:`dataset`) or
+    ``prefetch`` is positive, each minibatch is gathered by index instead
+    of permuting a copy of the data, and ``prefetch`` minibatches are read
+    ahead in a background thread. Indices are drawn on the calling
+    thread; with read-ahead, those of ``replacement`` are drawn for the
+    whole epoch at its beginning.
+
+    Args:
+        x(numpy.ndarray): training data
+        batchsize(int): minibatch size
+        method(str): one of ``SAMPLING_METHODS``
+        strata(numpy.ndarray): stratum label of each data point of
+        shape ``(len(x), )``, used by ``stratified``. If ``None``,
+        data is split into ``batchsize`` strata by quantile of ``x``,
+        or of its last column (the target of regression data) if ``x``
+        is 2-dimensional. For a memmap, quantiles are estimated from a
+        regular subsample and points are assigned chunk by chunk, so
+        the data are not read into memory at once.
+        rng: random number generator (see :class:`samplers.Sampler`)
+        prefetch(int): # of minibatches read ahead. If ``None``, 2 for a
+        memmap and 0 otherwise.
+    """
+
+    def __init__(self, x, batchsize, method='shuffle', strata=None,
+                 rng=None, prefetch=None):
+        if method not in SAMPLING_METHODS:
+            raise ValueError('unknown sampling method: {}'.format(method))
+        self.x = x
+        self.batchsize = batchsize
+        self.method = method
+        self.rng = numpy.random if rng is None else rng
+        if prefetch is None:
+            prefetch = 2 if isinstance(x, numpy.memmap) else 0
+        self.prefetch = prefetch
+        self._gather = isinstance(x, numpy.memmap) or prefetch > 0
+        if method == 'stratified':
+            if strata is None and isinstance(x, numpy.memmap):
+                strata = _chunked_strata(x, batchsize)
+            elif strata is None:
+                key = _key(x)
+                rank = numpy.empty(len(x), dtype=numpy.int64)
+                rank[numpy.argsort(key, kind='mergesort')] = numpy.arange(
+                    len(x))
+                strata = rank * batchsize // len(x)
+            _, self._strata, self._count = numpy.unique(
+                strata, return_inverse=True, return_counts=True)
+
+    def __len__(self):
+        return (len(self.x) + self.batchsize - 1) // self.batchsize
+
+    def _stratified_permutation(self):
+        N = len(self.x)
+        perm = self.rng.permutation(N)
+        strata = self._strata[perm]
+        # rank of each point within its stratum after permutation
+        order = numpy.argsort(strata, kind='mergesort')
+        start = numpy.concatenate(([0], numpy.cumsum(self._count)[:-1]))
+        rank = numpy.empty(N, dtype=numpy.float64)
+        rank[order] = numpy.arange(N) - numpy.repeat(start, self._count)
+        # place points of each stratum at evenly spaced positions
+        position = (rank + self.rng.uniform(size=N)) / self._count[strata]
+        return perm[numpy.argsort(position, kind='mergesort')]
+
+    def _read_ahead(self, indices):
+        """Yields ``x[idx]`` for ``idx`` in ``indices``, gathered ahead"""
+
+        queue = six.moves.queue.Queue(self.prefetch)
+        stop = threading.Event()
+
+        def gather():
+            try:
+                for idx in indices:
+                    if stop.is_set():
+                        return
+                    queue.put((numpy.asarray(self.x[idx]), None))
+                queue.put((_END, None))
+            except Exception as e:  # NOQA
+                queue.put((_END, e))
+
+        thread = threading.Thread(target=gather)
+        thread.daemon = True
+        thread.start()
+        try:
+            while True:
+                batch, error = queue.get()
+                if error is not None:
+                    raise error
+                if batch is _END:
+                    return
+                yield batch
+        finally:
+            stop.set()
+            # unblock a pending put if the epoch was abandoned
+            while thread.is_alive():
+                try:
+                    queue.get(timeout=0.01)
+                except six.moves.queue.Empty:
+                    pass
+            thread.join()
+
+    def _permutation(self):
+        if self.method == 'shuffle':
+            return self.rng.permutation(len(self.x))
+        return self._stratified_permutation()
+
+    def indices(self):
+        """Yields index arrays of the minibatches of one epoch
+
+        Without read-ahead, minibatches of :meth:`epoch` are ``x[idx]``
+        for the same draws of the random number generator.
+        """
+
+        N, batchsize = len(self.x), self.batchsize
+        if self.method == 'replacement':
+            for i in six.moves.range(len(self)):
+                yield self.rng.choice(N, batchsize)
+            return
+        perm = self._permutation()
+        for i in six.moves.range(0, N, batchsize):
+            yield perm[i: i + batchsize]
+
+    def epoch(self):
+        """Yields minibatches of one epoch
+
+        If one minibatch covers the data without replacement, ``x`` itself
+        is yielded, so samplers can tell the whole data by identity.
+        """
+
+        if self.method != 'replacement' and self.batchsize >= len(self.x):
+            yield self.x
+        elif self.prefetch > 0:
+            if self.method == 'replacement':
+                indices = self.rng.choice(len(self.x),
+                                          (len(self), self.batchsize))
+            else:
+                # permute on this thread, which owns the rng
+                indices = list(self.indices())
+            for batch in self._read_ahead(indices):
+                yield batch
+        elif self._gather or self.method == 'replacement':
+            for idx in self.indices():
+                yield numpy.asarray(self.x[idx])
+        else:
+            x = self.x[self._permutation()]
+            for i in six.moves.range(0, len(x), self.batchsize):
+                yield x[i: i + self.batchsize]
@@ -0,0 +1,115 @@
+"""multivariate Stochastic Gradient Nose-Hoover Thermostat (mSGNHT)"""
+
+import math
+
+import numpy
+import six
+
+from samplers import base
+
+
+class MSGNHT(base.Sampler):
+    """mSGNHT with ``L`` inner updates per sample
+
+    The ``L`` inner updates are fused: their noise is drawn with one
+    RNG call and ``p``, ``theta`` and ``xi`` are updated in place.
+
+    Args:
+        D(float): diffusion parameter
+        L(int): sampling interval
+        initialize_auxiliary(bool): If true, initialize auxiliary
+        parameters for each sample
+    """
+
+    name = 'msgnht'
+
+    def __init__(self, D=10, L=10, initialize_auxiliary=False,
+                 grad_backend=None, rng=None):
+        super(MSGNHT, self).__init__(grad_backend, rng)
+        self.D = D
+        self.L = L
+        self.initialize_auxiliary = initialize_auxiliary
+        self.p = None
+        self.xi = None
+
+    def _init_auxiliary(self, theta):
+        self.p = self.rng.standard_normal(theta.shape)
+        self.xi = numpy.full(theta.shape, self.D, dtype=theta.dtype)
+
+    def reset(self, theta, x):
+        super(MSGNHT, self).reset(theta, x)
+        self._init_auxiliary(theta)
+
+    def update(self, theta, x, eps):
+        if self.initialize_auxiliary:
+            self._init_auxiliary(theta)
+        p, xi = self.p, self.xi
+        buf = numpy.empty_like(theta)
+        # noise of all L inner steps is drawn at once
+        noise = self.rng.standard_normal((self.L,) + theta.shape)
+        noise *= math.sqrt(2 * self.D * eps)
+        for l in six.moves.range(self.L):
+            d_theta = self.grad(theta, x)
+            d_theta *= eps
+            # p <- (1 - xi * eps) * p + d_theta * eps + noise
+            numpy.multiply(xi, -eps, out=buf)
+            buf += 1
+            p *= buf
+            p += d_theta
+            p += noise[l]
+            # theta <- theta + p * eps
+            numpy.multiply(p, eps, out=buf)
+            theta += buf
+            # xi <- xi + (p * p - 1) * eps
+            numpy.multiply(p, p, out=buf)
+            buf -= 1
+            buf *= eps
+            xi += buf
+        return theta
+
+
+class SymmetricMSGNHT(MSGNHT):
+    """mSGNHT with the symmetric splitting integrator [Chen+15b]
+
+    Each inner step is split as ``A(h/2) B(h/2) O(h) B(h/2) A(h/2)``,
+    where ``A`` moves ``theta`` and ``xi``, ``B`` solves the thermostat
+    friction exactly and ``O`` applies the stochastic gradient and noise.
+
+    [Chen+15b] [High-Order Stochastic Gradient Thermostats for Bayesian
+    Learning of Deep Models](https://arxiv.org/abs/1512.07662)
+    """
+
+    name = 'msgnht-ss'
+
+    def _half_step_a(self, theta, eps, buf):
+        # theta <- theta + p * eps / 2, xi <- xi + (p * p - 1) * eps / 2
+        p = self.p
+        numpy.multiply(p, eps / 2, out=buf)
+        theta += buf
+        numpy.multiply(p, p, out=buf)
+        buf -= 1
+        buf *= eps / 2
+        self.xi += buf
+
+    def _half_step_b(self, eps, buf):
+        # p <- exp(-xi * eps / 2) * p
+        numpy.multiply(self.xi, -eps / 2, out=buf)
+        numpy.exp(buf, out=buf)
+        self.p *= buf
+
+    def update(self, theta, x, eps):
+        if self.initialize_auxiliary:
+            self._init_auxiliary(theta)
+        buf = numpy.empty_like(theta)
+        noise = self.rng.standard_normal((self.L,) + theta.shape)
+        noise *= math.sqrt(2 * self.D * eps)
+        for l in six.moves.range(self.L):
+            self._half_step_a(theta, eps, buf)
+            self._half_step_b(eps, buf)
+            d_theta = self.grad(theta, x)
+            d_theta *= eps
+            self.p += d_theta
+            self.p += noise[l]
+            self._half_step_b(eps, buf)
+            self._half_step_a(theta, eps, buf)
+        return theta
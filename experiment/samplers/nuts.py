@@ -0,0 +1,400 @@
+"""No-U-Turn Sampler (NUTS) with warmup adaptation [Hoffman+14]
+
+Trajectories are built by repeated doubling until the generalized
+No-U-Turn criterion holds [Betancourt17], and the next state is drawn
+from the trajectory by multinomial sampling, biased towards the last
+doubling as in Stan. During ``warmup`` updates
+
+* the step size is tuned by dual averaging towards ``target_accept``
+  mean acceptance probability [Hoffman+14], and
+* a diagonal inverse mass matrix is estimated from the samples of
+  windows doubling in length, as in Stan, after each of which the step
+  size is re-initialized and its adaptation restarted.
+
+Each chain has its own step size and mass matrix and builds its own
+trajectory; gradients are evaluated by the gradient backend on one chain
+at a time. The energy is estimated from the minibatch passed to
+:meth:`NUTS.update`, so NUTS is exact only when it is the whole data.
+
+Per-update tree depths, gradient evaluations, acceptance statistics and
+divergences of each chain are in :attr:`NUTS.stats`; totals are kept for
+cost accounting.
+
+[Hoffman+14] [The No-U-Turn Sampler: Adaptively Setting Path Lengths in
+Hamiltonian Monte Carlo](http://jmlr.org/papers/v15/hoffman14a.html)
+[Betancourt17] [A Conceptual Introduction to Hamiltonian Monte Carlo]
+(https://arxiv.org/abs/1701.02434)
+"""
+
+import math
+
+import numpy
+import six
+
+from samplers import base
+
+
+# energy error beyond which a trajectory is considered divergent
+MAX_ENERGY_ERROR = 1000.0
+
+
+class _Tree(object):
+    """Subtree of a trajectory
+
+    Ends are states ``(q, p, grad, log_posterior)`` ordered by time.
+    """
+
+    def __init__(self, left, right, sample, log_weight, rho, valid,
+                 n_leapfrog, sum_accept, divergent):
+        self.left = left
+        self.right = right
+        self.sample = sample
+        self.log_weight = log_weight
+        self.rho = rho
+        self.valid = valid
+        self.n_leapfrog = n_leapfrog
+        self.sum_accept = sum_accept
+        self.divergent = divergent
+
+
+class _Welford(object):
+    """Running mean and variance of samples"""
+
+    def __init__(self, shape):
+        self.n = 0
+        self.mean = numpy.zeros(shape)
+        self.m2 = numpy.zeros(shape)
+
+    def update(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def variance(self):
+        return self.m2 / (self.n - 1)
+
+
+def adaptation_windows(warmup, init_buffer=75, term_buffer=50,
+                       base_window=25):
+    """Returns windows of warmup estimating the mass matrix
+
+    Windows follow an initial buffer and double in length; the last one
+    is stretched to the terminal buffer. Short warmups are split 15% /
+    75% / 10% as in Stan.
+
+    Args:
+        warmup(int): # of warmup updates
+    Returns:
+        list of tuples: ``(start, end)`` of each window, a window holding
+        the samples of updates ``start + 1, ..., end``
+    """
+
+    if warmup < 20:
+        return []
+    if init_buffer + base_window + term_buffer > warmup:
+        init_buffer = int(0.15 * warmup)
+        term_buffer = int(0.1 * warmup)
+        base_window = warmup - init_buffer - term_buffer
+    windows = []
+    start, size = init_buffer, base_window
+    last = warmup - term_buffer
+    while start < last:
+        end = start + size
+        if end + 2 * size > last:
+            end = last
+        windows.append((start, end))
+        start, size = end, 2 * size
+    return windows
+
+
+class NUTS(base.Sampler):
+    """NUTS with dual averaging and diagonal mass matrix adaptation
+
+    The step size ``eps`` given to the first update is the initial step
+    size. After warmup the adapted step size is used and ``eps`` is
+    ignored; with ``warmup=0`` nothing is adapted and ``eps`` of every
+    update is used with a unit mass matrix.
+
+    Args:
+        warmup(int): # of adaptation updates
+        target_accept(float): target mean acceptance probability
+        max_depth(int): maximum tree depth; a trajectory has at most
+        ``2 ** max_depth`` leapfrog steps
+        gamma(float): regularization scale of dual averaging
+        t0(float): offset stabilizing early dual averaging
+        kappa(float): decay exponent of the averaged step size
+    """
+
+    name = 'nuts'
+
+    def __init__(self, warmup=1000, target_accept=0.8, max_depth=10,
+                 gamma=0.05, t0=10.0, kappa=0.75, grad_backend=None,
+                 rng=None):
+        super(NUTS, self).__init__(grad_backend, rng)
+        self.warmup = warmup
+        self.target_accept = target_accept
+        self.max_depth = max_depth
+        self.gamma = gamma
+        self.t0 = t0
+        self.kappa = kappa
+        self._windows = adaptation_windows(warmup)
+        self._clear()
+
+    def _clear(self):
+        self.t = 0
+        self.inv_metric = None
+        self.step_size = None
+        self.stats = None
+        self.n_grad_total = 0
+        self.n_divergent = 0
+        self.depth_counts = numpy.zeros(self.max_depth + 1, numpy.int64)
+        self._log_eps_bar = None
+        self._h_bar = None
+        self._mu = None
+        self._m = None
+        self._welford = None
+        self._theta = None
+        self._log_posterior = None
+        self._grad = None
+
+    def reset(self, theta, x):
+        super(NUTS, self).reset(theta, x)
+        self._clear()
+
+    def _value_and_grad(self, q, x):
+        value, grad = self.value_and_grad(q[None], x)
+        return float(value[0]), numpy.asarray(grad[0], dtype=numpy.float64)
+
+    def _leapfrog(self, state, eps, inv_metric, x):
+        q, p, grad, _ = state
+        p = p + eps / 2 * grad
+        q = q + eps * inv_metric * p
+        log_posterior, grad = self._value_and_grad(q, x)
+        p += eps / 2 * grad
+        return q, p, grad, log_posterior
+
+    @staticmethod
+    def _hamiltonian(state, inv_metric):
+        _, p, _, log_posterior = state
+        H = -log_posterior + numpy.dot(p * inv_metric, p) / 2
+        return H if numpy.isfinite(H) else numpy.inf
+
+    def _draw_momentum(self, inv_metric):
+        return self.rng.standard_normal(inv_metric.shape) / numpy.sqrt(
+            inv_metric)
+
+    def _build_tree(self, state, direction, depth, eps, inv_metric, H0, x):
+        if depth == 0:
+            new = self._leapfrog(state, direction * eps, inv_metric, x)
+            log_weight = H0 - self._hamiltonian(new, inv_metric)
+            divergent = -log_weight > MAX_ENERGY_ERROR
+            accept = min(1.0, math.exp(log_weight)) if log_weight < 0 else 1.0
+            return _Tree(new, new, new, log_weight, new[1].copy(),
+                         not divergent, 1, accept, divergent)
+
+        inner = self._build_tree(state, direction, depth - 1, eps,
+                                 inv_metric, H0, x)
+        if not inner.valid:
+            return inner
+        start = inner.right if direction > 0 else inner.left
+        outer = self._build_tree(start, direction, depth - 1, eps,
+                                 inv_metric, H0, x)
+        n_leapfrog = inner.n_leapfrog + outer.n_leapfrog
+        sum_accept = inner.sum_accept + outer.sum_accept
+        if not outer.valid:
+            outer.n_leapfrog, outer.sum_accept = n_leapfrog, sum_accept
+            return outer
+        log_weight = numpy.logaddexp(inner.log_weight, outer.log_weight)
+        if numpy.log(self.rng.uniform()) < outer.log_weight - log_weight:
+            sample = outer.sample
+        else:
+            sample = inner.sample
+        if direction > 0:
+            left, right = inner.left, outer.right
+        else:
+            left, right = outer.left, inner.right
+        rho = inner.rho + outer.rho
+        valid = not self._u_turn(rho, left, right, inv_metric)
+        return _Tree(left, right, sample, log_weight, rho, valid,
+                     n_leapfrog, sum_accept, False)
+
+    @staticmethod
+    def _u_turn(rho, left, right, inv_metric):
+        return (numpy.dot(inv_metric * right[1], rho) <= 0
+                or numpy.dot(inv_metric * left[1], rho) <= 0)
+
+    def _transition(self, state, eps, inv_metric, x):
+        """Draws next state of one chain
+
+        Returns:
+            tuple: next state, tree depth, # of leapfrog steps, mean
+            acceptance probability and whether the trajectory diverged
+        """
+
+        q, _, grad, log_posterior = state
+        state = (q, self._draw_momentum(inv_metric), grad, log_posterior)
+        H0 = self._hamiltonian(state, inv_metric)
+        left = right = sample = state
+        rho = state[1].copy()
+        log_weight = 0.0
+        n_leapfrog, sum_accept, divergent = 0, 0.0, False
+        depth = 0
+        while depth < self.max_depth:
+            direction = 1 if self.rng.uniform() < 0.5 else -1
+            start = right if direction > 0 else left
+            tree = self._build_tree(start, direction, depth, eps, inv_metric,
+                                    H0, x)
+            n_leapfrog += tree.n_leapfrog
+            sum_accept += tree.sum_accept
+            depth += 1
+            if not tree.valid:
+                divergent = tree.divergent
+                break
+            # biased progressive sampling favours the new subtree
+            if numpy.log(self.rng.uniform()) < tree.log_weight - log_weight:
+                sample = tree.sample
+            log_weight = numpy.logaddexp(log_weight, tree.log_weight)
+            if direction > 0:
+                right = tree.right
+            else:
+                left = tree.left
+            rho = rho + tree.rho
+            if self._u_turn(rho, left, right, inv_metric):
+                break
+        return (sample, depth, n_leapfrog, sum_accept / max(n_leapfrog, 1),
+                divergent)
+
+    def _initial_step_size(self, state, eps, inv_metric, x):
+        """Doubles or halves ``eps`` until acceptance crosses 0.8
+
+        Returns:
+            tuple: step size and # of gradient evaluations
+        """
+
+        q, _, grad, log_posterior = state
+        state = (q, self._draw_momentum(inv_metric), grad, log_posterior)
+        H0 = self._hamiltonian(state, inv_metric)
+        n_grad = 0
+        direction = 0
+        for _ in six.moves.range(100):
+            new = self._leapfrog(state, eps, inv_metric, x)
+            n_grad += 1
+            delta = H0 - self._hamiltonian(new, inv_metric)
+            up = delta > math.log(0.8)
+            if direction == 0:
+                direction = 1 if up else -1
+            elif (direction > 0) != up:
+                break
+            eps *= 2.0 ** direction
+        return eps, n_grad
+
+    def _restart_dual_averaging(self, k):
+        self._mu[k] = math.log(10 * self.step_size[k])
+        self._log_eps_bar[k] = 0.0
+        self._h_bar[k] = 0.0
+        self._m[k] = 0
+
+    def _dual_averaging(self, k, accept):
+        self._m[k] += 1
+        m = self._m[k]
+        w = 1.0 / (m + self.t0)
+        self._h_bar[k] = ((1 - w) * self._h_bar[k]
+                          + w * (self.target_accept - accept))
+        log_eps = self._mu[k] - math.sqrt(m) / self.gamma * self._h_bar[k]
+        eta = m ** -self.kappa
+        self._log_eps_bar[k] = (eta * log_eps
+                                + (1 - eta) * self._log_eps_bar[k])
+        self.step_size[k] = math.exp(log_eps)
+
+    def _init_state(self, theta, x):
+        K = len(theta)
+        if self._theta is not None and numpy.array_equal(theta, self._theta):
+            return numpy.zeros(K, numpy.int64)
+        log_posterior, grad = self.value_and_grad(theta, x)
+        self._log_posterior = numpy.array(log_posterior, dtype=numpy.float64)
+        self._grad = numpy.array(grad, dtype=numpy.float64)
+        self._theta = theta.copy()
+        return numpy.ones(K, numpy.int64)
+
+    def update(self, theta, x, eps):
+        K, D = theta.shape
+        n_grad = self._init_state(theta, x)
+        if self.step_size is None:
+            self.inv_metric = numpy.ones((K, D))
+            self.step_size = numpy.full(K, float(eps))
+            if self.warmup > 0:
+                self._log_eps_bar = numpy.zeros(K)
+                self._h_bar = numpy.zeros(K)
+                self._mu = numpy.zeros(K)
+                self._m = numpy.zeros(K, numpy.int64)
+                self._welford = _Welford((K, D))
+                for k in six.moves.range(K):
+                    self.step_size[k], n = self._initial_step_size(
+                        self._state(k), self.step_size[k],
+                        self.inv_metric[k], x)
+                    n_grad[k] += n
+                    self._restart_dual_averaging(k)
+        adapting = self.t < self.warmup
+        if not adapting and self.warmup == 0:
+            self.step_size[:] = eps
+
+        depth = numpy.zeros(K, numpy.int64)
+        accept = numpy.zeros(K)
+        divergent = numpy.zeros(K, bool)
+        step_size = self.step_size.copy()
+        for k in six.moves.range(K):
+            (q, _, grad, log_posterior), depth[k], n, accept[k], \
+                divergent[k] = self._transition(
+                    self._state(k), self.step_size[k], self.inv_metric[k], x)
+            n_grad[k] += n
+            theta[k] = q
+            self._grad[k] = grad
+            self._log_posterior[k] = log_posterior
+            if adapting:
+                self._dual_averaging(k, accept[k])
+        self._theta = theta.copy()
+        self.t += 1
+
+        if adapting:
+            n_grad += self._adapt_metric(theta, x)
+            if self.t == self.warmup:
+                self.step_size = numpy.exp(self._log_eps_bar)
+
+        self.stats = {'tree_depth': depth, 'n_grad': n_grad,
+                      'accept_stat': accept, 'step_size': step_size,
+                      'divergent': divergent}
+        self.n_grad_total += int(n_grad.sum())
+        self.n_divergent += int(divergent.sum())
+        self.depth_counts += numpy.bincount(depth,
+                                            minlength=self.max_depth + 1)
+        return theta
+
+    def _state(self, k):
+        return (self._theta[k], None, self._grad[k], self._log_posterior[k])
+
+    def _adapt_metric(self, theta, x):
+        """Accumulates samples of mass matrix windows
+
+        Returns:
+            numpy.ndarray: # of gradient evaluations of each chain spent
+            on re-initializing step sizes
+        """
+
+        n_grad = numpy.zeros(len(theta), numpy.int64)
+        window = [w for w in self._windows if w[0] < self.t <= w[1]]
+        if not window:
+            return n_grad
+        self._welford.update(theta)
+        if self.t != window[0][1]:
+            return n_grad
+        n = self._welford.n
+        # shrink towards a small unit metric as in Stan
+        self.inv_metric = ((n / (n + 5.0)) * self._welford.variance()
+                           + 1e-3 * (5.0 / (n + 5.0)))
+        self._welford = _Welford(theta.shape)
+        for k in six.moves.range(len(theta)):
+            self.step_size[k], n_grad[k] = self._initial_step_size(
+                self._state(k), self.step_size[k], self.inv_metric[k], x)
+            self._restart_dual_averaging(k)
+        return n_grad
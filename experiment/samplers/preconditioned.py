@@ -0,0 +1,206 @@
+"""Preconditioned SGLD (pSGLD) [Li+16] and preconditioned SGHMC
+
+Both samplers scale updates by an RMSprop-style diagonal metric
+``G = 1 / (damping + sqrt(V))``, where ``V`` is a running average of
+squared stochastic gradients kept per chain and updated in place.
+
+The correction term ``Gamma_i = dG_i / dtheta_i`` [Ma+15] is ignored by
+default, as in [Li+16]. If ``correction`` is true, it is computed with
+the diagonal of the Hessian estimated by finite differences, which costs
+one extra gradient evaluation per parameter.
+
+[Li+16] [Preconditioned Stochastic Gradient Langevin Dynamics for Deep
+Neural Networks](https://arxiv.org/abs/1512.07666)
+[Ma+15] [A Complete Recipe for Stochastic Gradient MCMC]
+(https://arxiv.org/abs/1506.04696)
+"""
+
+import math
+
+import numpy
+import six
+
+from samplers import base
+
+
+class _RMSprop(object):
+    """Diagonal metric from running average of squared gradients
+
+    Args:
+        alpha(float): decay rate of the running average
+        damping(float): added to ``sqrt(V)`` before inversion
+    """
+
+    def __init__(self, alpha, damping):
+        self.alpha = alpha
+        self.damping = damping
+        self.V = None
+        self.G = None
+        self._buf = None
+
+    def reset(self):
+        self.V = None
+
+    def update(self, g):
+        """Updates ``V`` and ``G`` in place with gradient ``g``"""
+
+        if self.V is None:
+            self.V = g * g
+            self.G = numpy.empty_like(g)
+            self._buf = numpy.empty_like(g)
+        else:
+            numpy.multiply(g, g, out=self._buf)
+            self.V *= self.alpha
+            self._buf *= 1 - self.alpha
+            self.V += self._buf
+        numpy.sqrt(self.V, out=self.G)
+        self.G += self.damping
+        numpy.reciprocal(self.G, out=self.G)
+        return self.G
+
+    def gamma(self, g, h):
+        """Returns ``dG_i / dtheta_i``
+
+        Args:
+            g(numpy.ndarray): gradient used in the last :meth:`update`
+            h(numpy.ndarray): diagonal of the Hessian of log posterior
+        """
+
+        # dV/dtheta = 2 (1 - alpha) g h, dG/dV = -G^2 / (2 sqrt(V))
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            gamma = -(1 - self.alpha) * self.G * self.G * g * h
+            gamma /= numpy.sqrt(self.V)
+        gamma[~numpy.isfinite(gamma)] = 0
+        return gamma
+
+
+class _Preconditioned(base.Sampler):
+
+    def __init__(self, alpha, damping, correction, grad_backend, rng):
+        super(_Preconditioned, self).__init__(grad_backend, rng)
+        self.alpha = alpha
+        self.damping = damping
+        self.correction = correction
+        self.metric = _RMSprop(alpha, damping)
+
+    def reset(self, theta, x):
+        super(_Preconditioned, self).reset(theta, x)
+        self.metric.reset()
+
+    def hessian_diagonal(self, theta, x, g):
+        """Estimates diagonal of the Hessian by forward differences
+
+        All chains are perturbed at once, since they are independent.
+
+        Args:
+            theta(numpy.ndarray): parameter of shape ``(K, D)``
+            x(numpy.ndarray): minibatch
+            g(numpy.ndarray): gradient at ``theta``
+        Returns:
+            numpy.ndarray: diagonal of shape ``(K, D)``
+        """
+
+        h = numpy.empty_like(theta)
+        shifted = theta.copy()
+        for i in six.moves.range(theta.shape[-1]):
+            delta = math.sqrt(numpy.finfo(theta.dtype).eps) * numpy.maximum(
+                1, numpy.abs(theta[..., i]))
+            shifted[..., i] += delta
+            h[..., i] = (self.grad(shifted, x)[..., i] - g[..., i]) / delta
+            shifted[..., i] = theta[..., i]
+        return h
+
+    def precondition(self, theta, x):
+        """Returns gradient, metric ``G`` and correction term
+
+        The correction term is ``None`` unless ``correction`` is true.
+        """
+
+        g = self.grad(theta, x)
+        G = self.metric.update(g)
+        if not self.correction:
+            return g, G, None
+        return g, G, self.metric.gamma(g, self.hessian_diagonal(theta, x, g))
+
+
+class PSGLD(_Preconditioned):
+    """Preconditioned SGLD
+
+    Args:
+        alpha(float): decay rate of the squared gradient average
+        damping(float): damping of the preconditioner
+        correction(bool): If true, add the ``Gamma`` correction term
+    """
+
+    name = 'psgld'
+
+    def __init__(self, alpha=0.99, damping=1e-5, correction=False,
+                 grad_backend=None, rng=None):
+        super(PSGLD, self).__init__(alpha, damping, correction,
+                                    grad_backend, rng)
+
+    def update(self, theta, x, eps):
+        g, G, gamma = self.precondition(theta, x)
+        eta = self.rng.standard_normal(theta.shape)
+        eta *= numpy.sqrt(eps * G)
+        g *= G
+        if gamma is not None:
+            g += gamma
+        g *= eps / 2
+        theta += g
+        theta += eta
+        return theta
+
+
+class PSGHMC(_Preconditioned):
+    """Preconditioned SGHMC with ``L`` inner updates per sample
+
+    Friction and noise are scaled by ``G`` so that the dynamics
+    remains a valid instance of [Ma+15] with ``Q = [[0, -G], [G, 0]]``.
+
+    Args:
+        F(float): friction parameter
+        D(float): diffusion parameter
+        L(int): sampling interval
+        alpha(float): decay rate of the squared gradient average
+        damping(float): damping of the preconditioner
+        correction(bool): If true, add the ``Gamma`` correction term
+    """
+
+    name = 'psghmc'
+
+    def __init__(self, F=30, D=10, L=10, alpha=0.99, damping=1e-5,
+                 correction=False, grad_backend=None, rng=None):
+        super(PSGHMC, self).__init__(alpha, damping, correction,
+                                     grad_backend, rng)
+        self.F = F
+        self.D = D
+        self.L = L
+        self.p = None
+
+    def reset(self, theta, x):
+        super(PSGHMC, self).reset(theta, x)
+        self.p = self.rng.standard_normal(theta.shape)
+
+    def update(self, theta, x, eps):
+        p = self.p
+        buf = numpy.empty_like(theta)
+        noise = self.rng.standard_normal((self.L,) + theta.shape)
+        noise *= math.sqrt(2 * self.D * eps)
+        for l in six.moves.range(self.L):
+            g, G, gamma = self.precondition(theta, x)
+            # p += eps * (G * (g - F * p) + gamma) + sqrt(2 D eps G) * noise
+            numpy.multiply(p, self.F, out=buf)
+            g -= buf
+            g *= G
+            if gamma is not None:
+                g += gamma
+            g *= eps
+            p += g
+            numpy.sqrt(G, out=buf)
+            buf *= noise[l]
+            p += buf
+            numpy.multiply(G, p, out=buf)
+            buf *= eps
+            theta += buf
+        return theta
@@ -0,0 +1,110 @@
+"""Stochastic AnNealing Thermostats with Adaptive momentum (Santa) [Chen+15c]
+
+Santa is mSGNHT with an RMSprop-style diagonal preconditioner
+(see :mod:`samplers.preconditioned`), integrated by symmetric splitting.
+The inverse temperature ``beta_t = t ** anneal`` increases during the
+exploration stage; after ``burnin`` updates the noise and the thermostat
+update are dropped and the sampler turns into an optimizer (refinement
+stage). With ``anneal=0`` and ``burnin=None`` it samples the posterior
+at temperature 1.
+
+Terms involving the derivative of the preconditioner are ignored, as
+for :class:`samplers.PSGLD`.
+
+[Chen+15c] [Bridging the Gap between Stochastic Gradient MCMC and
+Stochastic Optimization](https://arxiv.org/abs/1512.07962)
+"""
+
+import math
+
+import numpy
+
+from samplers import base
+from samplers import preconditioned
+
+
+class Santa(base.Sampler):
+    """Santa with the symmetric splitting integrator (Santa-SSS)
+
+    Step size ``eps`` is the learning rate ``eta`` of [Chen+15c].
+
+    Args:
+        sigma(float): decay rate of the squared gradient average
+        damping(float): damping of the preconditioner
+        C(float): initial thermostat is ``sqrt(eps) * C``
+        anneal(float): exponent of the inverse temperature schedule
+        burnin(int): # of updates in the exploration stage. If ``None``,
+        the refinement stage is never entered.
+    """
+
+    name = 'santa'
+
+    def __init__(self, sigma=0.999, damping=1e-8, C=5, anneal=0.0,
+                 burnin=None, grad_backend=None, rng=None):
+        super(Santa, self).__init__(grad_backend, rng)
+        self.sigma = sigma
+        self.damping = damping
+        self.C = C
+        self.anneal = anneal
+        self.burnin = burnin
+        self.metric = preconditioned._RMSprop(sigma, damping)
+        self.t = 0
+        self.u = None
+        self.alpha = None
+        self._g = None
+
+    def reset(self, theta, x):
+        super(Santa, self).reset(theta, x)
+        self.metric.reset()
+        self.t = 0
+        self.u = None
+        self.alpha = None
+        self._g = None
+
+    def _init_auxiliary(self, theta, eps):
+        self.u = self.rng.standard_normal(theta.shape) * math.sqrt(eps)
+        self.alpha = numpy.full(theta.shape, math.sqrt(eps) * self.C)
+
+    def _update_alpha(self, eps, beta, buf):
+        # alpha <- alpha + (u * u - eps / beta) / 2
+        numpy.multiply(self.u, self.u, out=buf)
+        buf -= eps / beta
+        buf /= 2
+        self.alpha += buf
+
+    def update(self, theta, x, eps):
+        if self.u is None:
+            self._init_auxiliary(theta, eps)
+        self.t += 1
+        u = self.u
+        buf = numpy.empty_like(theta)
+        # f is the gradient of the potential U = -log posterior
+        f = self.grad(theta, x)
+        f *= -1
+        g = numpy.sqrt(self.metric.update(f / self.N))
+        g_prev = g if self._g is None else self._g
+        exploration = self.burnin is None or self.t <= self.burnin
+
+        numpy.multiply(g, u, out=buf)
+        buf /= 2
+        theta += buf
+        if exploration:
+            beta = self.t ** self.anneal
+            noise = self.rng.standard_normal(theta.shape)
+            noise *= numpy.sqrt(2 * eps / beta * g_prev)
+            self._update_alpha(eps, beta, buf)
+        decay = numpy.exp(-self.alpha / 2)
+        u *= decay
+        f *= g
+        f *= eps
+        u -= f
+        if exploration:
+            u += noise
+        u *= decay
+        if exploration:
+            self._update_alpha(eps, beta, buf)
+        numpy.multiply(g, u, out=buf)
+        buf /= 2
+        theta += buf
+        self._g = g
+        return theta
@@ -0,0 +1,98 @@
+"""Stochastic Gradient Hamiltonian Monte Carlo (SGHMC)"""
+
+import math
+
+import numpy
+import six
+
+from samplers import base
+
+
+class SGHMC(base.Sampler):
+    """SGHMC with ``L`` inner updates per sample
+
+    The ``L`` inner updates are fused: their noise is drawn with one
+    RNG call and ``p`` and ``theta`` are updated in place.
+
+    Args:
+        F(float): friction parameter
+        D(float): diffusion parameter
+        L(int): sampling interval
+        initialize_moment(bool): If true, initialize moment
+        in each sample
+    """
+
+    name = 'sghmc'
+
+    def __init__(self, F=30, D=10, L=10, initialize_moment=False,
+                 grad_backend=None, rng=None):
+        super(SGHMC, self).__init__(grad_backend, rng)
+        self.F = F
+        self.D = D
+        self.L = L
+        self.initialize_moment = initialize_moment
+        self.p = None
+
+    def reset(self, theta, x):
+        super(SGHMC, self).reset(theta, x)
+        self.p = self.rng.standard_normal(theta.shape)
+
+    def update(self, theta, x, eps):
+        if self.initialize_moment:
+            self.p = self.rng.standard_normal(theta.shape)
+        p = self.p
+        buf = numpy.empty_like(theta)
+        # noise of all L inner steps is drawn at once
+        noise = self.rng.standard_normal((self.L,) + theta.shape)
+        noise *= math.sqrt(2 * self.D * eps)
+        for l in six.moves.range(self.L):
+            d_theta = self.grad(theta, x)
+            d_theta *= eps
+            p *= 1 - self.F * eps
+            p += d_theta
+            p += noise[l]
+            numpy.multiply(p, eps, out=buf)
+            theta += buf
+        return theta
+
+
+class SymmetricSGHMC(SGHMC):
+    """SGHMC with the symmetric splitting integrator [Chen+15a]
+
+    Each inner step is split as ``A(h/2) B(h/2) O(h) B(h/2) A(h/2)``:
+    ``A`` moves ``theta``, ``B`` solves the friction exactly and ``O``
+    applies the stochastic gradient and noise, which is evaluated once
+    at the midpoint. The local error is of higher order than that of the
+    Euler scheme of :class:`SGHMC` at the same cost.
+
+    [Chen+15a] [On the Convergence of Stochastic Gradient MCMC Algorithms
+    with High-Order Integrators](https://arxiv.org/abs/1610.06665)
+    """
+
+    name = 'sghmc-ss'
+
+    def update(self, theta, x, eps):
+        if self.initialize_moment:
+            self.p = self.rng.standard_normal(theta.shape)
+        p = self.p
+        buf = numpy.empty_like(theta)
+        noise = self.rng.standard_normal((self.L,) + theta.shape)
+        noise *= math.sqrt(2 * self.D * eps)
+        decay = math.exp(-self.F * eps / 2)
+        for l in six.moves.range(self.L):
+            # A(h/2)
+            numpy.multiply(p, eps / 2, out=buf)
+            theta += buf
+            # B(h/2)
+            p *= decay
+            # O(h)
+            d_theta = self.grad(theta, x)
+            d_theta *= eps
+            p += d_theta
+            p += noise[l]
+            # B(h/2)
+            p *= decay
+            # A(h/2)
+            numpy.multiply(p, eps / 2, out=buf)
+            theta += buf
+        return theta
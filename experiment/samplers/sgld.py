@@ -0,0 +1,19 @@
+"""Stochastic Gradient Langevin Dynamics (SGLD) [Welling+11]
+
+[Welling+11] [Bayesian Learning via Stochastic Gradient Langevin Dynamics]
+(http://www.icml-2011.org/papers/398_icmlpaper.pdf)
+"""
+
+import numpy
+
+from samplers import base
+
+
+class SGLD(base.Sampler):
+
+    name = 'sgld'
+
+    def update(self, theta, x, eps):
+        d_theta = self.grad(theta, x)
+        eta = self.rng.standard_normal(theta.shape) * numpy.sqrt(eps)
+        return theta + d_theta * eps / 2 + eta
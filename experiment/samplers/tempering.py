@@ -0,0 +1,275 @@
+"""Replica exchange (parallel tempering) over batched chains
+
+:class:`ReplicaExchange` wraps a step kernel. Besides the chains passed
+by the driver (temperature 1), it keeps replicas at higher temperatures
+``T`` which sample ``p(theta | x) ** (1 / T)``. All replicas are updated
+by one batched call of the wrapped kernel, whose gradient backend scales
+the log posterior of each replica by its inverse temperature. The driver,
+trace and monitor only see the chains at temperature 1.
+
+Every ``interval`` updates, states of adjacent temperatures are swapped
+with probability ``min(1, exp((b_i - b_j) (l_j - l_i)))``, where ``b``
+is the inverse temperature and ``l`` the log posterior. Even and odd
+pairs of the ladder are proposed alternately. On a minibatch, ``l`` is
+estimated and the estimate of ``l_j - l_i`` has variance ``s2``; the
+exponent is then reduced by ``(b_i - b_j) ** 2 * s2 / 2`` so that the
+acceptance ratio is unbiased for Gaussian noise [Deng+20]. ``s2``
+includes the finite population correction ``1 - B / N`` only if
+minibatches are drawn without replacement. On the whole
+data, the log posterior cached from the last gradient evaluation of the
+kernel (e.g. by :class:`samplers.HMC`) is reused.
+
+The ladder starts geometric between 1 and ``max_temperature`` and is
+adapted so that swap rates of all pairs become equal [Vousden+16], with
+a gain decaying over swap rounds.
+
+[Deng+20] [Non-convex Learning via Replica Exchange Stochastic Gradient
+MCMC](https://arxiv.org/abs/2008.05367)
+[Vousden+16] [Dynamic temperature selection for parallel tempering in
+Markov chain Monte Carlo simulations](https://arxiv.org/abs/1501.05823)
+"""
+
+import copy
+
+import numpy
+
+import backend
+from samplers import base
+from samplers import minibatch
+from samplers import nuts
+
+
+def _model(grad_backend):
+    """Returns model evaluated by backend, looking through wrappers
+
+    Wrappers such as :class:`backend.ControlVariate` keep the wrapped
+    backend as ``grad_backend``.
+    """
+
+    while (not hasattr(grad_backend, 'model')
+           and hasattr(grad_backend, 'grad_backend')):
+        grad_backend = grad_backend.grad_backend
+    return getattr(grad_backend, 'model', None)
+
+
+class _Tempered(object):
+    """Gradient backend scaling each chain by its inverse temperature
+
+    The untempered log posterior evaluated with the last gradient is
+    cached for swap moves.
+    """
+
+    def __init__(self, grad_backend, betas):
+        self.grad_backend = grad_backend
+        self.name = grad_backend.name + '+tempered'
+        self.betas = betas
+        self._cache = None
+
+    def cached_log_posterior(self, theta):
+        """Returns cached log posterior at ``theta``, or ``None``"""
+
+        if self._cache is None or not numpy.array_equal(self._cache[0],
+                                                        theta):
+            return None
+        return self._cache[1]
+
+    def begin_epoch(self, theta, x, n, epoch):
+        hook = getattr(self.grad_backend, 'begin_epoch', None)
+        if hook is not None:
+            hook(theta, x, n, epoch)
+
+    def get_state(self):
+        get_state = getattr(self.grad_backend, 'get_state', None)
+        return None if get_state is None else get_state()
+
+    def set_state(self, state):
+        self.grad_backend.set_state(state)
+
+    def close(self):
+        backend.close(self.grad_backend)
+
+    def log_posterior(self, theta, x, n=None):
+        return self.betas * self.grad_backend.log_posterior(theta, x, n)
+
+    def grad(self, theta, x, n=None):
+        g = numpy.array(self.grad_backend.grad(theta, x, n),
+                        dtype=numpy.float64)
+        g *= self.betas[:, None]
+        return g
+
+    def value_and_grad(self, theta, x, n=None):
+        value, g = self.grad_backend.value_and_grad(theta, x, n)
+        value = numpy.array(value, dtype=numpy.float64)
+        self._cache = (numpy.array(theta), value)
+        g = numpy.array(g, dtype=numpy.float64)
+        g *= self.betas[:, None]
+        return self.betas * value, g
+
+
+class ReplicaExchange(base.Sampler):
+    """Parallel tempering of a step kernel
+
+    Args:
+        sampler(samplers.Sampler): kernel updating all replicas. Its
+        gradient backend is wrapped to temper the replicas.
+        n_temperatures(int): # of temperatures including 1
+        max_temperature(float): initial highest temperature
+        interval(int): # of updates between swap rounds
+        adapt(int): # of swap rounds adapting the ladder. If ``None``,
+        the ladder is adapted throughout with a decaying gain.
+        kappa(float): initial gain of the adaptation
+        tau(float): # of swap rounds over which the gain halves
+        sampling(str): minibatch sampling method of the run (see
+        :class:`samplers.MinibatchIterator`)
+    """
+
+    def __init__(self, sampler, n_temperatures=4, max_temperature=10.0,
+                 interval=1, adapt=None, kappa=0.5, tau=1000,
+                 sampling='shuffle'):
+        if n_temperatures < 2:
+            raise ValueError('n_temperatures must be at least 2')
+        if sampling not in minibatch.SAMPLING_METHODS:
+            raise ValueError('unknown sampling method: {}'.format(sampling))
+        if isinstance(sampler, nuts.NUTS):
+            raise ValueError('NUTS evaluates chains one by one and cannot '
+                             'be tempered')
+        if _model(sampler.grad_backend) is None:
+            # swaps on minibatches need per-point log likelihoods
+            raise ValueError('replica exchange needs a backend evaluating '
+                             'a model.Model')
+        self._tempered = _Tempered(sampler.grad_backend, None)
+        sampler.grad_backend = self._tempered
+        super(ReplicaExchange, self).__init__(self._tempered, sampler.rng)
+        self.sampler = sampler
+        self.name = sampler.name + '+pt'
+        self.n_temperatures = n_temperatures
+        self.max_temperature = max_temperature
+        self.interval = interval
+        self.adapt = adapt
+        self.kappa = kappa
+        self.tau = tau
+        self.sampling = sampling
+        self.temperatures = None
+        self.hot = None
+        self.t = 0
+        self.rounds = 0
+        self.n_proposed = None
+        self.n_accepted = None
+        self._rates = None
+
+    @property
+    def swap_rates(self):
+        """numpy.ndarray: acceptance rate of swaps of each adjacent pair"""
+
+        with numpy.errstate(invalid='ignore'):
+            return self.n_accepted / self.n_proposed
+
+    def _set_betas(self):
+        n_chains = len(self.hot) // (self.n_temperatures - 1)
+        self._tempered.betas = numpy.repeat(1 / self.temperatures, n_chains)
+
+    def reset(self, theta, x):
+        super(ReplicaExchange, self).reset(theta, x)
+        n = self.n_temperatures
+        self.temperatures = numpy.geomspace(1, self.max_temperature, n)
+        # replicas start from the states of the chains at temperature 1
+        self.hot = numpy.tile(theta, (n - 1, 1))
+        self._set_betas()
+        self.t = 0
+        self.rounds = 0
+        self.n_proposed = numpy.zeros(n - 1, dtype=numpy.int64)
+        self.n_accepted = numpy.zeros(n - 1, dtype=numpy.int64)
+        self._rates = numpy.full(n - 1, numpy.nan)
+        self.sampler.reset(numpy.concatenate((theta, self.hot)), x)
+
+    def get_state(self):
+        state = dict((k, copy.deepcopy(v)) for k, v in vars(self).items()
+                     if k not in ('grad_backend', 'rng', 'x', 'sampler',
+                                  '_tempered'))
+        state['sampler'] = self.sampler.get_state()
+        return state
+
+    def set_state(self, state):
+        state = dict(state)
+        self.sampler.set_state(state.pop('sampler'))
+        self.__dict__.update(copy.deepcopy(state))
+        self._set_betas()
+
+    def begin_epoch(self, theta, epoch):
+        self.sampler.begin_epoch(numpy.concatenate((theta, self.hot)),
+                                 epoch)
+
+    def _log_posterior_difference(self, theta, i, j, x):
+        """Estimates ``l_j - l_i`` and the variance of the estimate"""
+
+        if x is self.x:
+            value = self._tempered.cached_log_posterior(theta)
+            if value is None:
+                value = self._tempered.grad_backend.log_posterior(theta, x)
+            return value[j] - value[i], 0.0
+        target = _model(self._tempered.grad_backend)
+        d = target.log_likelihood(theta[j], x)
+        d -= target.log_likelihood(theta[i], x)
+        B = len(x)
+        diff = (target.log_prior(theta[j]) - target.log_prior(theta[i])
+                + self.N * numpy.mean(d, axis=-1))
+        var = 0.0
+        if B > 1:
+            var = self.N ** 2 * numpy.var(d, axis=-1, ddof=1) / B
+            if self.sampling != 'replacement':
+                # finite population correction
+                var *= 1 - B / self.N
+        return diff, var
+
+    def _swap(self, theta, x):
+        n_chains = len(theta) // self.n_temperatures
+        pairs = numpy.arange(self.rounds % 2, self.n_temperatures - 1, 2)
+        if len(pairs) == 0:
+            return
+        chains = numpy.arange(n_chains)
+        i = (pairs[:, None] * n_chains + chains).ravel()
+        j = i + n_chains
+        diff, var = self._log_posterior_difference(theta, i, j, x)
+        d_beta = numpy.repeat(1 / self.temperatures[pairs]
+                              - 1 / self.temperatures[pairs + 1], n_chains)
+        log_ratio = d_beta * diff - d_beta ** 2 * var / 2
+        with numpy.errstate(over='ignore'):
+            prob = numpy.minimum(1.0, numpy.exp(log_ratio))
+        accepted = self.rng.uniform(size=prob.shape) < prob
+        theta[numpy.concatenate((i[accepted], j[accepted]))] = theta[
+            numpy.concatenate((j[accepted], i[accepted]))]
+        self.n_proposed[pairs] += n_chains
+        self.n_accepted[pairs] += accepted.reshape(
+            len(pairs), n_chains).sum(axis=1)
+        self._rates[pairs] = prob.reshape(len(pairs), n_chains).mean(axis=1)
+
+    def _adapt_ladder(self):
+        if self.n_temperatures < 3 or numpy.any(numpy.isnan(self._rates)):
+            return
+        gain = self.kappa * self.tau / (self.rounds + self.tau)
+        # widen gaps with high swap rates and narrow those with low ones
+        log_gap = numpy.log(numpy.diff(numpy.log(self.temperatures)))
+        log_gap += gain * (self._rates - self._rates.mean())
+        gap = numpy.exp(log_gap)
+        gap *= numpy.log(self.temperatures[-1]) / gap.sum()
+        self.temperatures = numpy.exp(numpy.concatenate(([0],
+                                                         numpy.cumsum(gap))))
+        self._set_betas()
+        # energies cached by the kernel were tempered with the old ladder
+        clear_cache = getattr(self.sampler, 'clear_cache', None)
+        if clear_cache is not None:
+            clear_cache()
+
+    def update(self, theta, x, eps):
+        n_chains = len(theta)
+        replicas = self.sampler.update(numpy.concatenate((theta, self.hot)),
+                                       x, eps)
+        self.t += 1
+        if self.t % self.interval == 0:
+            self._swap(replicas, x)
+            if self.adapt is None or self.rounds < self.adapt:
+                self._adapt_ladder()
+            self.rounds += 1
+        theta[...] = replicas[:n_chains]
+        self.hot = replicas[n_chains:].copy()
+        return theta
@@ -1,11 +1,84 @@
+"""Step size schedules
 
-class StepSizeGenerator(object):
+A schedule maps iteration indices to step sizes. ``values`` evaluates it
+for an array of indices at once, so the whole schedule of a run can be
+precomputed (:func:`expand`) and the sampling loop only indexes an array.
 
-    def __init__(self, max_epoch, eps_start=0.01, eps_end=0.0001, gamma=0.55):
-        self.a, self.b = self.__calc_ab(eps_start, eps_end, gamma, max_epoch)
+Schedules are defined per iteration, except :class:`StepSizeGenerator`,
+which keeps its per-epoch definition (``unit = 'epoch'``).
+
+[Zhang+20] [Cyclical Stochastic Gradient MCMC for Bayesian Deep Learning]
+(https://arxiv.org/abs/1902.03932)
+[Loshchilov+17] [SGDR: Stochastic Gradient Descent with Warm Restarts]
+(https://arxiv.org/abs/1608.03983)
+"""
+
+import numpy
+
+
+class Schedule(object):
+
+    unit = 'iteration'
+
+    def values(self, t):
+        """Returns step sizes at indices ``t``
+
+        Args:
+            t(numpy.ndarray): iteration (or epoch) indices
+        Returns:
+            numpy.ndarray: step sizes whose shape is same as ``t``
+        """
+
+        raise NotImplementedError
+
+    def precompute(self, n):
+        """Returns step sizes at indices ``0, ..., n - 1``"""
+
+        return self.values(numpy.arange(n, dtype=numpy.float64))
+
+    def __call__(self, t):
+        return float(self.values(numpy.asarray(t, dtype=numpy.float64)))
+
+    def __repr__(self):
+        params = ', '.join('{}={!r}'.format(k, v)
+                           for k, v in sorted(vars(self).items()))
+        return '{}({})'.format(type(self).__name__, params)
+
+
+class Constant(Schedule):
+
+    def __init__(self, eps):
+        self.eps = eps
+
+    def values(self, t):
+        return numpy.full(numpy.shape(t), self.eps, dtype=numpy.float64)
+
+
+class Polynomial(Schedule):
+    """Polynomial decay ``a / (b + t) ** gamma`` [Welling+11]
+
+    Args:
+        n(int): # of iterations
+        eps_start(float): step size at ``t = 0``
+        eps_end(float): step size at ``t = n``
+        gamma(float): decay rate
+    """
+
+    def __init__(self, n, eps_start=0.01, eps_end=0.0001, gamma=0.55):
+        if not 0 < eps_end < eps_start:
+            raise ValueError(
+                'polynomial decay requires 0 < eps_end < eps_start, got '
+                'eps_start={!r} and eps_end={!r}'.format(eps_start, eps_end))
+        if not gamma > 0:
+            raise ValueError('polynomial decay requires gamma > 0, got '
+                             'gamma={!r}'.format(gamma))
+        if not n > 0:
+            raise ValueError('polynomial decay requires n > 0, got '
+                             'n={!r}'.format(n))
+        self.a, self.b = self._calc_ab(eps_start, eps_end, gamma, n)
         self.gamma = gamma
 
-    def __calc_ab(self, eps_start, eps_end, gamma, epoch):
+    def _calc_ab(self, eps_start, eps_end, gamma, epoch):
         """Returns coefficients that characterize step size
 
         Args:
@@ -26,5 +99,151 @@ class StepSizeGenerator(object):
         assert abs(eps_end - eps_end_actual) < 1e-4
         return A, B
 
-    def __call__(self, epoch):
-        return self.a / (self.b + epoch) ** self.gamma
+    def values(self, t):
+        return self.a / (self.b + t) ** self.gamma
+
+
+class WarmRestart(Schedule):
+    """Cosine annealing with warm restarts [Loshchilov+17]
+
+    Args:
+        period(int): # of iterations of the first cycle
+        eps_max(float): step size at the beginning of each cycle
+        eps_min(float): step size approached at the end of each cycle
+        mult(float): ratio of lengths of consecutive cycles
+    """
+
+    def __init__(self, period, eps_max, eps_min=0.0, mult=1):
+        self.period = period
+        self.eps_max = eps_max
+        self.eps_min = eps_min
+        self.mult = mult
+
+    def phase(self, t):
+        """Returns position in the current cycle in ``[0, 1)``"""
+
+        t = numpy.asarray(t, dtype=numpy.float64)
+        if self.mult == 1:
+            return numpy.mod(t, self.period) / self.period
+        cycle = numpy.floor(numpy.log1p(t * (self.mult - 1) / self.period)
+                            / numpy.log(self.mult))
+        start = self.period * (self.mult ** cycle - 1) / (self.mult - 1)
+        length = self.period * self.mult ** cycle
+        return numpy.clip((t - start) / length, 0, 1)
+
+    def values(self, t):
+        cos = numpy.cos(numpy.pi * self.phase(t))
+        return self.eps_min + (self.eps_max - self.eps_min) * (cos + 1) / 2
+
+
+class Cyclical(WarmRestart):
+    """Cyclical step size of cSG-MCMC [Zhang+20]
+
+    ``n`` iterations are split into ``n_cycles`` cosine cycles decaying
+    from ``eps0`` to 0. Samples are collected in the sampling stage,
+    the last ``1 - beta`` of each cycle; :func:`samplers.run` discards
+    those of the exploration stage (see :func:`sampling_stage`).
+
+    Args:
+        n(int): # of iterations
+        eps0(float): initial step size of each cycle
+        n_cycles(int): # of cycles
+        beta(float): fraction of each cycle spent in exploration
+    """
+
+    def __init__(self, n, eps0, n_cycles=4, beta=0.8):
+        period = int(numpy.ceil(n / float(n_cycles)))
+        super(Cyclical, self).__init__(period, eps0)
+        self.beta = beta
+
+    def is_sampling(self, t):
+        """Returns whether iterations ``t`` are in the sampling stage"""
+
+        return self.phase(t) >= self.beta
+
+
+class StepSizeGenerator(Polynomial):
+    """Polynomial decay defined per epoch
+
+    Args:
+        max_epoch(int): # of epoch
+    """
+
+    unit = 'epoch'
+
+    def __init__(self, max_epoch, eps_start=0.01, eps_end=0.0001, gamma=0.55):
+        super(StepSizeGenerator, self).__init__(
+            max_epoch, eps_start, eps_end, gamma)
+
+
+SCHEDULES = ('constant', 'polynomial', 'cyclical', 'warm-restart')
+
+
+def get_schedule(name, n, eps_start, eps_end=None, n_cycles=4):
+    """Creates per-iteration schedule by name
+
+    Args:
+        name(str): one of ``SCHEDULES``
+        n(int): # of iterations
+        eps_start(float): (initial) step size
+        eps_end(float): final step size of ``polynomial``, or minimum
+        step size of ``warm-restart``
+        n_cycles(int): # of cycles of ``cyclical`` and ``warm-restart``
+    Returns:
+        Schedule: step size schedule
+    """
+
+    if name == 'constant':
+        return Constant(eps_start)
+    elif name == 'polynomial':
+        return Polynomial(n, eps_start, eps_end)
+    elif name == 'cyclical':
+        return Cyclical(n, eps_start, n_cycles)
+    elif name == 'warm-restart':
+        period = int(numpy.ceil(n / float(n_cycles)))
+        return WarmRestart(period, eps_start, eps_end or 0.0)
+    raise ValueError('unknown schedule: {}'.format(name))
+
+
+def sampling_stage(schedule, n_epoch, n_batch):
+    """Returns which iterations yield samples to keep
+
+    Schedules with an exploration stage (:class:`Cyclical`) provide
+    ``is_sampling``; all samples of other schedules are kept.
+
+    Args:
+        schedule: step size schedule as given to :func:`expand`
+        n_epoch(int): # of epoch
+        n_batch(int): # of iterations per epoch
+    Returns:
+        numpy.ndarray: boolean mask of shape ``(n_epoch * n_batch, )``
+    """
+
+    n = n_epoch * n_batch
+    is_sampling = getattr(schedule, 'is_sampling', None)
+    if is_sampling is None:
+        return numpy.ones(n, dtype=bool)
+    return numpy.asarray(is_sampling(numpy.arange(n)), dtype=bool)
+
+
+def expand(schedule, n_epoch, n_batch):
+    """Precomputes step size of every iteration
+
+    Args:
+        schedule: :class:`Schedule`, or any callable mapping epoch index
+        to step size
+        n_epoch(int): # of epoch
+        n_batch(int): # of iterations per epoch
+    Returns:
+        numpy.ndarray: step sizes of shape ``(n_epoch * n_batch, )``
+    """
+
+    if getattr(schedule, 'unit', None) == 'iteration':
+        return schedule.precompute(n_epoch * n_batch)
+    if isinstance(schedule, Schedule):
+        per_epoch = schedule.precompute(n_epoch)
+    else:
+        per_epoch = numpy.array([schedule(epoch)
+                                 for epoch in range(n_epoch)],
+                                dtype=numpy.float64)
+    return numpy.repeat(per_epoch, n_batch)
@@ -0,0 +1,389 @@
+"""Hyperparameter sweeps over samplers
+
+A sweep is a list of parameter spaces. Each space maps parameter names to
+lists of candidate values and is expanded either as a full grid or by
+random search. Every resulting configuration is run in a local process
+pool and its summary is cached in ``<cache_dir>/<hash>.json``, where
+``<hash>`` is computed from the configuration, so rerunning a sweep
+skips configurations that are already finished.
+
+Parameters listed in ``RUN_DEFAULTS`` control the run (model, data,
+schedule, seed, ...); all other parameters are passed to the sampler.
+``theta1`` and ``theta2`` are the true parameters of the Gaussian mixture;
+the other models generate data from a parameter drawn from the prior.
+
+Usage::
+
+    python sweep.py                       # experiments in DEFAULT_SWEEP
+    python sweep.py sweep.json            # list of spaces in a JSON file
+    python sweep.py --sampler sghmc --param F=1,10,30 --param D=1,10
+    python sweep.py --sampler sgld --param eps_start=0.01,0.05,0.1 \\
+        --random 5
+    python sweep.py --sampler sgld --param eps_start=log:1e-2:1e-1 \\
+        --param eps_end=log:1e-4:1e-3 --random 20
+
+With ``--random``, a parameter can also be drawn log-uniformly from a
+range, given as ``KEY=log:LOW:HIGH`` on the command line or as
+``{"log": [LOW, HIGH]}`` in JSON.
+
+A configuration that fails (e.g. a schedule with ``eps_start <=
+eps_end``) does not stop the sweep: its result holds the ``error``
+instead of summary statistics and is not cached, so it is retried by the
+next run.
+"""
+
+from __future__ import print_function
+import argparse
+import ast
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import time
+
+import numpy
+
+import backend
+import cli
+import samplers
+import stepsize
+import tracefile
+
+
+RUN_DEFAULTS = {
+    'N': 100,
+    'batchsize': 10,
+    'epoch': 1000,
+    'eps': None,
+    'eps_start': 0.01,
+    'eps_end': 0.005,
+    'schedule': 'polynomial',
+    'cycles': 4,
+    'chains': 1,
+    'seed': 0,
+    'model': 'mixture',
+    'features': 10,
+    'hidden': 10,
+    'theta1': 0,
+    'theta2': 1,
+    'backend': 'numpy',
+    'control_variate': None,
+    'sampling': 'shuffle',
+}
+
+# experiments formerly driven by waf
+DEFAULT_SWEEP = [
+    {'sampler': ['hmc'], 'batchsize': [100], 'epoch': [10000],
+     'eps': [0.01]},
+    {'sampler': ['sgld'], 'eps_start': [0.05], 'eps_end': [0.01]},
+    {'sampler': ['sghmc'], 'F': [1.0, 10.0], 'D': [1.0]},
+    {'sampler': ['msgnht'], 'D': [1.0, 10]},
+]
+
+
+def grid(space):
+    """Expands parameter space into all combinations
+
+    Args:
+        space(dict): maps parameter name to list of values
+    Returns:
+        list of dict: configurations
+    """
+
+    keys = sorted(space)
+    for k in keys:
+        if isinstance(space[k], dict):
+            raise ValueError('range of {} requires random search '
+                             '(--random)'.format(k))
+    return [dict(zip(keys, values))
+            for values in itertools.product(*[space[k] for k in keys])]
+
+
+def random_search(space, n, seed=0):
+    """Draws configurations from parameter space at random
+
+    Args:
+        space(dict): maps parameter name to list of values, or to
+        ``{'log': [low, high]}`` for a log-uniform range
+        n(int): # of configurations
+        seed(int): random seed
+    Returns:
+        list of dict: configurations
+    """
+
+    rng = numpy.random.default_rng(seed)
+    configs = []
+    for _ in range(n):
+        config = {}
+        for key in sorted(space):
+            values = space[key]
+            if isinstance(values, dict):
+                low, high = numpy.log(values['log'])
+                config[key] = float(numpy.exp(rng.uniform(low, high)))
+            else:
+                config[key] = values[rng.integers(len(values))]
+        configs.append(config)
+    return configs
+
+
+def complete(config):
+    """Fills run parameters missing in configuration with defaults"""
+
+    full = dict(RUN_DEFAULTS)
+    full.update(config)
+    return full
+
+
+def config_hash(config):
+    """Returns hash identifying configuration"""
+
+    s = json.dumps(complete(config), sort_keys=True)
+    return hashlib.sha1(s.encode('utf-8')).hexdigest()[:16]
+
+
+def make_stepsize(config):
+    if config['eps'] is not None:
+        return stepsize.Constant(config['eps'])
+    if config['schedule'] == 'polynomial':
+        return stepsize.StepSizeGenerator(config['epoch'],
+                                          config['eps_start'],
+                                          config['eps_end'])
+    n_batch = (config['N'] + config['batchsize'] - 1) // config['batchsize']
+    return stepsize.get_schedule(config['schedule'], config['epoch'] * n_batch,
+                                 config['eps_start'], config['eps_end'],
+                                 config['cycles'])
+
+
+def run_config(config, trace_path=None):
+    """Runs one configuration and summarizes its samples
+
+    Args:
+        config(dict): configuration
+        trace_path(str): If given, samples are streamed to this file
+    Returns:
+        dict: configuration with summary statistics. ``mean`` and ``std``
+        list the posterior mean and standard deviation of each parameter.
+    """
+
+    config = complete(config)
+    params = dict((k, v) for k, v in config.items()
+                  if k not in RUN_DEFAULTS and k != 'sampler')
+    # configurations hold the model options of the command line
+    target = cli.make_model(argparse.Namespace(**config))
+    theta = None
+    if config['model'] == 'mixture':
+        theta = (config['theta1'], config['theta2'])
+    data_seed = numpy.random.SeedSequence([config['seed'], 0xda7a])
+    x = target.generate(config['N'], theta,
+                        rng=numpy.random.default_rng(data_seed))
+    rng = numpy.random.default_rng(config['seed'])
+    grad_backend = backend.get_backend(config['backend'], target)
+    if config['control_variate'] is not None:
+        grad_backend = backend.ControlVariate(grad_backend,
+                                              config['control_variate'])
+    sampler = samplers.get_sampler(config['sampler'],
+                                   grad_backend=grad_backend, rng=rng,
+                                   **params)
+    theta = target.sample_prior(config['chains'], rng=rng)
+    n_batch = (config['N'] + config['batchsize'] - 1) // config['batchsize']
+    if trace_path is None:
+        trace = tracefile.ArrayTrace(config['epoch'] * n_batch, theta.shape)
+    else:
+        trace = tracefile.TraceWriter(trace_path, theta.shape,
+                                      metadata=config)
+    start = time.time()
+    try:
+        with trace:
+            samplers.run(sampler, theta, x, config['epoch'],
+                         config['batchsize'], make_stepsize(config),
+                         sampling=config['sampling'], trace=trace)
+    finally:
+        backend.close(grad_backend)
+    elapsed = time.time() - start
+    if trace_path is None:
+        samples = trace.data
+    else:
+        samples = tracefile.open_trace(trace_path).data
+
+    result = dict(config)
+    result.update({
+        'time': elapsed,
+        'samples_per_sec': len(samples) * config['chains'] / elapsed,
+        'mean': numpy.mean(samples, axis=(0, 1)).tolist(),
+        'std': numpy.std(samples, axis=(0, 1)).tolist(),
+    })
+    return result
+
+
+def _run_job(job):
+    h, config, result_path, trace_path = job
+    try:
+        result = run_config(config, trace_path)
+    except Exception as e:  # NOQA
+        result = dict(complete(config))
+        result['error'] = '{}: {}'.format(type(e).__name__, e)
+        return h, result
+    tmp = result_path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(result, f, sort_keys=True)
+    os.rename(tmp, result_path)
+    return h, result
+
+
+def sweep(configs, cache_dir='sweep', processes=None, save_trace=False,
+          verbose=True):
+    """Runs configurations that are not cached yet
+
+    Args:
+        configs(list of dict): configurations
+        cache_dir(str): directory of cached results
+        processes(int): # of worker processes. If ``None``,
+        the number of CPUs is used.
+        save_trace(bool): If true, samples are kept in
+        ``<cache_dir>/<hash>.trace``
+        verbose(bool): If true, reports progress
+    Returns:
+        list of dict: results in the order of ``configs``. Results of
+        failed configurations hold the error message as ``error``.
+    """
+
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+    results = {}
+    jobs = []
+    for config in configs:
+        h = config_hash(config)
+        result_path = os.path.join(cache_dir, h + '.json')
+        if os.path.exists(result_path):
+            with open(result_path) as f:
+                results[h] = json.load(f)
+        elif h not in [job[0] for job in jobs]:
+            trace_path = (os.path.join(cache_dir, h + '.trace')
+                          if save_trace else None)
+            jobs.append((h, config, result_path, trace_path))
+    if verbose:
+        print('{} configurations, {} cached, {} to run'.format(
+            len(configs), len(configs) - len(jobs), len(jobs)))
+
+    if jobs:
+        pool = multiprocessing.Pool(processes)
+        try:
+            for h, result in pool.imap_unordered(_run_job, jobs):
+                results[h] = result
+                if not verbose:
+                    continue
+                if 'error' in result:
+                    print('failed', h, result['error'])
+                else:
+                    print('done', h, '{:.1f}s'.format(result['time']))
+        finally:
+            pool.close()
+            pool.join()
+    return [results[config_hash(config)] for config in configs]
+
+
+def format_table(results, columns=None):
+    """Formats results as a tab-separated table
+
+    Args:
+        results(list of dict): results of :func:`sweep`
+        columns(list of str): columns to show. If ``None``, parameters
+        that vary across results and all summary statistics are shown.
+    Returns:
+        str: table with a header line
+    """
+
+    if not results:
+        return ''
+    if columns is None:
+        keys = sorted(set(itertools.chain(*[r.keys() for r in results])))
+        columns = [k for k in keys
+                   if len(set(repr(r.get(k)) for r in results)) > 1
+                   or k not in RUN_DEFAULTS]
+
+    def fmt(v):
+        if isinstance(v, float):
+            return '{:.4g}'.format(v)
+        if isinstance(v, list):
+            return ','.join(fmt(u) for u in v)
+        return str(v)
+
+    lines = ['\t'.join(columns)]
+    for r in results:
+        lines.append('\t'.join(fmt(r.get(k, '')) for k in columns))
+    return '\n'.join(lines)
+
+
+def _parse_values(s):
+    key, values = s.split('=', 1)
+    if values.startswith('log:'):
+        low, high = values[len('log:'):].split(':')
+        return key, {'log': [float(low), float(high)]}
+    parsed = []
+    for v in values.split(','):
+        try:
+            parsed.append(ast.literal_eval(v))
+        except (ValueError, SyntaxError):
+            parsed.append(v)
+    return key, parsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='hyperparameter sweep')
+    parser.add_argument('spaces', nargs='?', default=None,
+                        help='JSON file holding list of parameter spaces')
+    parser.add_argument('--sampler', default=None,
+                        choices=sorted(samplers.SAMPLERS),
+                        help='sampler of the space given by --param')
+    parser.add_argument('--param', action='append', default=[],
+                        type=_parse_values,
+                        help='candidate values as KEY=V1,V2,..., or '
+                        'log-uniform range as KEY=log:LOW:HIGH')
+    parser.add_argument('--random', default=None, type=int,
+                        help='If given, draw this many configurations '
+                        'from each space instead of the full grid')
+    parser.add_argument('--seed', default=0, type=int,
+                        help='random seed of random search')
+    parser.add_argument('--processes', default=None, type=int,
+                        help='number of worker processes')
+    parser.add_argument('--cache-dir', default='sweep', type=str,
+                        help='directory of cached results')
+    parser.add_argument('--save-trace', action='store_true',
+                        help='If true, keep samples of each configuration')
+    parser.add_argument('--table', default=None, type=str,
+                        help='path to output results table. Defaults to '
+                        '<cache-dir>/results.tsv')
+    args = parser.parse_args()
+
+    if args.spaces is not None:
+        with open(args.spaces) as f:
+            spaces = json.load(f)
+    elif args.sampler is not None:
+        space = dict(args.param)
+        space['sampler'] = [args.sampler]
+        spaces = [space]
+    else:
+        spaces = DEFAULT_SWEEP
+
+    configs = []
+    for i, space in enumerate(spaces):
+        if args.random is None:
+            configs.extend(grid(space))
+        else:
+            configs.extend(random_search(space, args.random, args.seed + i))
+
+    results = sweep(configs, args.cache_dir, args.processes, args.save_trace)
+    table = format_table(results)
+    print(table)
+    path = args.table or os.path.join(args.cache_dir, 'results.tsv')
+    with open(path, 'w') as f:
+        f.write(table + '\n')
+    n_failed = sum('error' in r for r in results)
+    if n_failed:
+        print('{} of {} configurations failed'.format(
+            n_failed, len(results)))
+
+
+if __name__ == '__main__':
+    main()
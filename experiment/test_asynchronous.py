@@ -0,0 +1,47 @@
+"""Asynchronous SG-MCMC against the sequential driver
+
+Run with ``python -m pytest`` from this directory.
+"""
+
+import numpy
+
+import backend
+import model
+import samplers
+import stepsize
+
+N = 100
+BATCHSIZE = 10
+EPOCH = 300
+CHAINS = 4
+
+
+def _posterior_mean(run, seed=0, **kwargs):
+    """Mean of the second half of the samples of the mixture
+
+    Step sizes are those of ``toy_sgld.py``.
+    """
+
+    rng = numpy.random.RandomState(seed)
+    x = model.generate(N, 0, 1, rng=numpy.random.RandomState(0))
+    sampler = samplers.SGLD(backend.get_backend('numpy'), rng)
+    theta = model.sample_from_prior(CHAINS, rng=rng)
+    eps = stepsize.StepSizeGenerator(EPOCH, 0.05, 0.01)
+    _, trace = run(sampler, theta, x, EPOCH, BATCHSIZE, eps, **kwargs)
+    samples = trace.data[trace.n_stored // 2: trace.n_stored]
+    return samples.reshape(-1, 2).mean(axis=0)
+
+
+def test_default_async_run_matches_sequential():
+    expected = _posterior_mean(samplers.run)
+    delays = samplers.DelayStats()
+    actual = _posterior_mean(samplers.run_async, n_workers=2, delays=delays)
+    assert delays.max <= 2
+    numpy.testing.assert_allclose(actual, expected, atol=0.3)
+
+
+def test_unbounded_staleness_stays_stable():
+    expected = _posterior_mean(samplers.run)
+    actual = _posterior_mean(samplers.run_async, n_workers=2,
+                             staleness=None)
+    numpy.testing.assert_allclose(actual, expected, atol=0.3)
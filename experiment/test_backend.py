@@ -0,0 +1,66 @@
+"""Agreement of the chainer and numpy backends on the Gaussian mixture
+
+Run with ``python -m pytest`` from this directory.
+"""
+
+import numpy
+import pytest
+
+import backend
+import model
+
+pytest.importorskip('chainer')
+
+# chainer evaluates in float32
+RTOL = 1e-5
+ATOL = 1e-5
+
+THETAS = [
+    numpy.array([0.0, 2.0]),
+    numpy.array([-1.5, 0.5]),
+    # far from the data, where one mixture component dominates
+    numpy.array([30.0, -20.0]),
+    numpy.array([[0.0, 2.0], [1.0, -1.0], [-25.0, 40.0], [100.0, 3.0]]),
+]
+
+
+@pytest.fixture(scope='module')
+def data():
+    return model.generate(1000, rng=numpy.random.RandomState(0))
+
+
+@pytest.fixture(scope='module')
+def backends():
+    return (backend.get_backend('chainer'), backend.get_backend('numpy'))
+
+
+@pytest.mark.parametrize('theta', THETAS)
+@pytest.mark.parametrize('n', [None, 100000])
+def test_log_posterior(backends, data, theta, n):
+    chainer_backend, numpy_backend = backends
+    expected = numpy_backend.log_posterior(theta, data, n)
+    actual = chainer_backend.log_posterior(theta, data, n)
+    assert actual.shape == theta.shape[:-1]
+    numpy.testing.assert_allclose(actual, expected, rtol=RTOL, atol=ATOL)
+
+
+@pytest.mark.parametrize('theta', THETAS)
+@pytest.mark.parametrize('n', [None, 100000])
+def test_grad(backends, data, theta, n):
+    chainer_backend, numpy_backend = backends
+    expected = numpy_backend.grad(theta, data, n)
+    actual = chainer_backend.grad(theta, data, n)
+    assert actual.shape == theta.shape
+    numpy.testing.assert_allclose(actual, expected, rtol=RTOL, atol=ATOL)
+
+
+@pytest.mark.parametrize('theta', THETAS)
+@pytest.mark.parametrize('n', [None, 100000])
+def test_value_and_grad(backends, data, theta, n):
+    chainer_backend, numpy_backend = backends
+    value, grad = chainer_backend.value_and_grad(theta, data, n)
+    numpy.testing.assert_allclose(
+        value, numpy_backend.log_posterior(theta, data, n),
+        rtol=RTOL, atol=ATOL)
+    numpy.testing.assert_allclose(
+        grad, numpy_backend.grad(theta, data, n), rtol=RTOL, atol=ATOL)
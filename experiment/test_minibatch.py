@@ -0,0 +1,40 @@
+"""Minibatch sampling
+
+Run with ``python -m pytest`` from this directory.
+"""
+
+import numpy
+import pytest
+
+import dataset
+import model
+from samplers import minibatch
+
+
+@pytest.fixture
+def memmap(tmp_path):
+    x = model.LinearRegression(3).generate(
+        5000, rng=numpy.random.RandomState(0))
+    return dataset.save(str(tmp_path / 'x.npy'), x, chunk_size=1000)
+
+
+def test_chunked_strata_match_quantiles(memmap):
+    exact = minibatch.MinibatchIterator(numpy.array(memmap), 10,
+                                        'stratified')._strata
+    # quantiles estimated from every 5th point
+    strata = minibatch._chunked_strata(memmap, 10, chunk_size=1000)
+    assert numpy.abs(strata - exact).max() <= 1
+    counts = numpy.bincount(strata, minlength=10)
+    assert counts.min() > 0.7 * 500 and counts.max() < 1.3 * 500
+
+
+@pytest.mark.parametrize('prefetch', [0, 2])
+def test_stratified_memmap_epoch(memmap, prefetch):
+    batches = minibatch.MinibatchIterator(
+        memmap, 50, 'stratified', rng=numpy.random.RandomState(0),
+        prefetch=prefetch)
+    rows = numpy.concatenate(list(batches.epoch()))
+    assert len(rows) == len(memmap)
+    # every point is drawn once
+    numpy.testing.assert_array_equal(numpy.sort(rows[:, -1]),
+                                     numpy.sort(memmap[:, -1]))
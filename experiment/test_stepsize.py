@@ -0,0 +1,37 @@
+"""Step size schedules
+
+Run with ``python -m pytest`` from this directory.
+"""
+
+import numpy
+import pytest
+
+import stepsize
+
+
+def test_polynomial_end_points():
+    schedule = stepsize.Polynomial(100, 0.01, 0.001)
+    numpy.testing.assert_allclose(schedule.values(numpy.array([0, 100])),
+                                  [0.01, 0.001])
+
+
+@pytest.mark.parametrize('args', [
+    (100, 0.001, 0.005),
+    (100, 0.01, 0.01),
+    (100, 0.01, 0.0),
+    (100, 0.01, 0.001, 0.0),
+    (0, 0.01, 0.001),
+])
+def test_polynomial_rejects_invalid_arguments(args):
+    with pytest.raises(ValueError):
+        stepsize.Polynomial(*args)
+    with pytest.raises(ValueError):
+        stepsize.StepSizeGenerator(*args)
+
+
+def test_cyclical_sampling_stage():
+    schedule = stepsize.Cyclical(100, 0.01, n_cycles=2, beta=0.8)
+    keep = stepsize.sampling_stage(schedule, 10, 10)
+    assert keep.sum() == 20
+    assert keep[40:50].all() and not keep[:40].any()
+    assert stepsize.sampling_stage(stepsize.Constant(0.01), 10, 10).all()
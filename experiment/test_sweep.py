@@ -0,0 +1,40 @@
+"""End-to-end runs of the sweep engine
+
+Run with ``python -m pytest`` from this directory.
+"""
+
+import sweep
+
+
+def test_log_uniform_random_sweep(tmp_path):
+    space = {'sampler': ['sgld'], 'epoch': [5],
+             'eps_start': {'log': [1e-2, 1e-1]},
+             'eps_end': {'log': [1e-4, 1e-3]}}
+    configs = sweep.random_search(space, 4, seed=0)
+    results = sweep.sweep(configs, str(tmp_path), processes=1,
+                          verbose=False)
+    assert len(results) == 4
+    for config, result in zip(configs, results):
+        assert 'error' not in result
+        assert 1e-2 <= config['eps_start'] <= 1e-1
+        assert 1e-4 <= config['eps_end'] <= 1e-3
+        assert len(result['mean']) == 2
+    assert len(list(tmp_path.glob('*.json'))) == 4
+
+
+def test_failed_configurations_are_recorded(tmp_path):
+    # about half of the draws have eps_start <= eps_end
+    space = {'sampler': ['sgld'], 'epoch': [5],
+             'eps_start': {'log': [1e-4, 1e-1]}}
+    configs = sweep.random_search(space, 10, seed=0)
+    results = sweep.sweep(configs, str(tmp_path), processes=1,
+                          verbose=False)
+    failed = [r for r in results if 'error' in r]
+    assert 0 < len(failed) < len(results)
+    for r in failed:
+        assert r['eps_start'] <= r['eps_end']
+        assert 'eps_start' in r['error']
+    # failures are not cached
+    assert (len(list(tmp_path.glob('*.json')))
+            == len(results) - len(failed))
+    assert 'error' in sweep.format_table(results).splitlines()[0]
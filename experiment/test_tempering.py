@@ -0,0 +1,55 @@
+"""Swap moves of replica exchange on minibatches
+
+Run with ``python -m pytest`` from this directory.
+"""
+
+import numpy
+import pytest
+
+import model
+import samplers
+
+N = 200
+B = 50
+THETA = numpy.array([[0.0, 1.0], [0.5, 0.3]])
+
+
+def _difference_estimates(sampling, n_draws=4000):
+    """Estimates of ``l_1 - l_0`` and their reported variances"""
+
+    x = model.generate(N, rng=numpy.random.RandomState(0))
+    sampler = samplers.ReplicaExchange(samplers.SGLD(), 2,
+                                       sampling=sampling)
+    sampler.reset(THETA[:1], x)
+    exact, _ = sampler._log_posterior_difference(THETA, 0, 1, x)
+    rng = numpy.random.RandomState(1)
+    diffs, variances = [], []
+    for _ in range(n_draws):
+        idx = rng.choice(N, B, replace=sampling == 'replacement')
+        diff, var = sampler._log_posterior_difference(THETA, 0, 1, x[idx])
+        diffs.append(diff)
+        variances.append(var)
+    return exact, numpy.array(diffs), numpy.array(variances)
+
+
+@pytest.mark.parametrize('sampling', ['shuffle', 'replacement'])
+def test_reported_variance_matches_estimates(sampling):
+    exact, diffs, variances = _difference_estimates(sampling)
+    std = numpy.sqrt(numpy.var(diffs))
+    assert abs(numpy.mean(diffs) - exact) < 4 * std / numpy.sqrt(len(diffs))
+    numpy.testing.assert_allclose(numpy.mean(variances), numpy.var(diffs),
+                                  rtol=0.1)
+
+
+def test_finite_population_correction_only_without_replacement():
+    x = model.generate(N, rng=numpy.random.RandomState(0))
+    batch = x[:B]
+    variances = {}
+    for sampling in ('shuffle', 'replacement'):
+        sampler = samplers.ReplicaExchange(samplers.SGLD(), 2,
+                                           sampling=sampling)
+        sampler.reset(THETA[:1], x)
+        _, variances[sampling] = sampler._log_posterior_difference(
+            THETA, 0, 1, batch)
+    numpy.testing.assert_allclose(variances['shuffle'],
+                                  variances['replacement'] * (1 - B / N))
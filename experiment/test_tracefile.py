@@ -0,0 +1,43 @@
+"""Traces and checkpoints
+
+Run with ``python -m pytest`` from this directory.
+"""
+
+import numpy
+
+import checkpoint
+import model
+import samplers
+import stepsize
+import tracefile
+
+
+def test_array_trace_state_shares_stored_samples():
+    trace = tracefile.ArrayTrace(10, (2, ))
+    for i in range(4):
+        trace.append(numpy.full(2, i))
+    state = trace.get_state()
+    assert numpy.shares_memory(state['data'], trace.data)
+    for i in range(4, 10):
+        trace.append(numpy.full(2, i))
+    numpy.testing.assert_array_equal(state['data'][:, 0], numpy.arange(4))
+
+
+def _run(x, n_epoch, trace, checkpointer=None, resume=None):
+    rng = numpy.random.RandomState(1)
+    sampler = samplers.SGLD(rng=rng)
+    theta = model.sample_from_prior(2, rng=rng)
+    samplers.run(sampler, theta, x, n_epoch, 10, stepsize.Constant(0.01),
+                 trace=trace, checkpointer=checkpointer, resume=resume)
+    return trace
+
+
+def test_resume_with_array_trace(tmp_path):
+    x = model.generate(100, rng=numpy.random.RandomState(0))
+    expected = _run(x, 20, tracefile.ArrayTrace(200, (2, 2))).data
+    path = str(tmp_path / 'run.ckpt')
+    _run(x, 10, tracefile.ArrayTrace(100, (2, 2)),
+         checkpoint.Checkpointer(path, interval=5))
+    actual = _run(x, 20, tracefile.ArrayTrace(200, (2, 2)),
+                  resume=checkpoint.load(path)).data
+    numpy.testing.assert_array_equal(actual, expected)
@@ -0,0 +1,25 @@
+import cli
+import samplers
+
+
+parser = cli.make_parser('pSGHMC', visualize='visualize_psghmc.png')
+# pSGHMC parameter
+parser.add_argument('--F', default=30, type=float, help='friction parameter')
+parser.add_argument('--D', default=10, type=float, help='diffusion parameter')
+parser.add_argument('--L', default=10, type=int, help='sampling interval')
+parser.add_argument('--alpha', default=0.99, type=float,
+                    help='decay rate of squared gradient average')
+parser.add_argument('--damping', default=1e-5, type=float,
+                    help='damping of preconditioner')
+parser.add_argument('--correction', action='store_true',
+                    help='If true, add Gamma correction term')
+cli.add_schedule_arguments(parser, eps_start=0.01, eps_end=0.005)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    grad_backend = cli.setup(args)
+    sampler = samplers.PSGHMC(args.F, args.D, args.L, args.alpha,
+                              args.damping, args.correction,
+                              grad_backend=grad_backend)
+    cli.main(args, sampler, cli.make_schedule(args))
@@ -0,0 +1,27 @@
+"""Preconditioned SGLD (pSGLD)
+
+[Li+16] [Preconditioned Stochastic Gradient Langevin Dynamics for Deep
+Neural Networks](https://arxiv.org/abs/1512.07666)
+"""
+
+import cli
+import samplers
+
+
+parser = cli.make_parser('pSGLD', visualize='visualize_psgld.png')
+# pSGLD parameter
+parser.add_argument('--alpha', default=0.99, type=float,
+                    help='decay rate of squared gradient average')
+parser.add_argument('--damping', default=1e-5, type=float,
+                    help='damping of preconditioner')
+parser.add_argument('--correction', action='store_true',
+                    help='If true, add Gamma correction term')
+cli.add_schedule_arguments(parser, eps_start=0.05, eps_end=0.01)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    grad_backend = cli.setup(args)
+    sampler = samplers.PSGLD(args.alpha, args.damping, args.correction,
+                             grad_backend=grad_backend)
+    cli.main(args, sampler, cli.make_schedule(args))
@@ -0,0 +1,32 @@
+"""Santa
+
+[Chen+15c] [Bridging the Gap between Stochastic Gradient MCMC and
+Stochastic Optimization](https://arxiv.org/abs/1512.07962)
+"""
+
+import cli
+import samplers
+
+
+parser = cli.make_parser('Santa', visualize='visualize_santa.png')
+# Santa parameter
+parser.add_argument('--sigma', default=0.999, type=float,
+                    help='decay rate of squared gradient average')
+parser.add_argument('--damping', default=1e-8, type=float,
+                    help='damping of preconditioner')
+parser.add_argument('--C', default=5, type=float,
+                    help='scale of initial thermostat')
+parser.add_argument('--anneal', default=0.0, type=float,
+                    help='exponent of inverse temperature schedule')
+parser.add_argument('--santa-burnin', default=None, type=int,
+                    help='# of updates in exploration stage. If omitted, '
+                    'the refinement stage is never entered')
+cli.add_schedule_arguments(parser, eps_start=0.001, eps_end=0.0005)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    grad_backend = cli.setup(args)
+    sampler = samplers.Santa(args.sigma, args.damping, args.C, args.anneal,
+                             args.santa_burnin, grad_backend=grad_backend)
+    cli.main(args, sampler, cli.make_schedule(args))
@@ -1,82 +1,26 @@
-from __future__ import print_function
-import argparse
-import math
+import cli
+import samplers
 
-from matplotlib import pyplot
-import numpy
-import six
 
-import model
-import plot
-import stepsize
-
-
-parser = argparse.ArgumentParser(description='SGHMC')
-# true parameter
-parser.add_argument('--theta1', default=0, type=float, help='true paremter 1')
-parser.add_argument('--theta2', default=1, type=float, help='true paremter 2')
-# data
-parser.add_argument('--N', default=100, type=int, help='training data size')
-parser.add_argument('--batchsize', default=10, type=int, help='batchsize')
-parser.add_argument('--epoch', default=1000, type=int, help='epoch num')
+parser = cli.make_parser('SGHMC', visualize='visualize_sghmc.png')
 # SGLMC parameter
 parser.add_argument('--F', default=30, type=float, help='friction parameter')
 parser.add_argument('--D', default=10, type=float, help='diffusion parameter')
 parser.add_argument('--initialize-moment', action='store_true',
                     help='If true, initialize moment in each sample')
 parser.add_argument('--L', default=10, type=int, help='sampling interval')
-parser.add_argument('--eps-start', default=0.01, type=float,
-                    help='start stepsize')
-parser.add_argument('--eps-end', default=0.005, type=float,
-                    help='end stepsize')
-# others
-parser.add_argument('--seed', default=0, type=int, help='random seed')
-parser.add_argument('--visualize', default='visualize_sghmc.png', type=str,
-                    help='path to output file')
-args = parser.parse_args()
-
-
-n_batch = (args.N + args.batchsize - 1) // args.batchsize
-numpy.random.seed(args.seed)
-
-
-def update(p, theta, x, eps):
-    def update_p(p, theta, x, eps):
-        d_theta = model.calc_grad(theta, x, args.N)
-        return ((1 - args.F * eps) * p + d_theta * eps
-                + math.sqrt(2 * args.D * eps)
-                * numpy.random.randn(*theta.shape))
-
-    def update_theta(theta, p, eps):
-        return theta + p * eps
-
-    p = update_p(p, theta, x, eps)
-    theta = update_theta(theta, p, eps)
-    return p, theta
-
-
-theta1_all = numpy.empty((args.epoch * n_batch,), dtype=numpy.float32)
-theta2_all = numpy.empty((args.epoch * n_batch,), dtype=numpy.float32)
-ssg = stepsize.StepSizeGenerator(args.epoch, args.eps_start, args.eps_end)
-theta = model.sample_from_prior()
-p = numpy.random.randn(*theta.shape)
-x = model.generate(args.N, args.theta1, args.theta2)
-for epoch in six.moves.range(args.epoch):
-    perm = numpy.random.permutation(args.N)
-    for i in six.moves.range(0, args.N, args.batchsize):
-        if args.initialize_moment:
-            p = numpy.random.randn(*theta.shape)
-        for l in six.moves.range(args.L):
-            p, theta = update(
-                p, theta, x[perm][i: i + args.batchsize], ssg(epoch))
-
-        theta1_all[epoch * n_batch + i // args.batchsize] = theta[0]
-        theta2_all[epoch * n_batch + i // args.batchsize] = theta[1]
-        if i == 0:
-            print(epoch, theta, theta[0] * 2 + theta[1])
-
-fig, axes = pyplot.subplots(ncols=1, nrows=1)
-plot.visualize2D(fig, axes, theta1_all, theta2_all,
-                 xlabel='theta1', ylabel='theta2',
-                 xlim=(-4, 4), ylim=(-4, 4))
-fig.savefig(args.visualize)
+parser.add_argument('--splitting', action='store_true',
+                    help='If true, use symmetric splitting integrator')
+cli.add_schedule_arguments(parser, eps_start=0.01, eps_end=0.005)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    grad_backend = cli.setup(args)
+    if args.splitting:
+        sampler_class = samplers.SymmetricSGHMC
+    else:
+        sampler_class = samplers.SGHMC
+    sampler = sampler_class(args.F, args.D, args.L, args.initialize_moment,
+                            grad_backend=grad_backend)
+    cli.main(args, sampler, cli.make_schedule(args))
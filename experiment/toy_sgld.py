@@ -6,76 +6,17 @@ Reimplementation of toy example in section 5.1 of [Welling+11].
 (http://www.icml-2011.org/papers/398_icmlpaper.pdf)
 """
 
-from __future__ import print_function
-import argparse
+import cli
+import samplers
 
-from matplotlib import pyplot
-import numpy
-import six
 
-import model
-import plot
-import stepsize
-
-
-parser = argparse.ArgumentParser(description='SGLD')
-# true parameter
-parser.add_argument('--theta1', default=0, type=float, help='true paremter 1')
-parser.add_argument('--theta2', default=1, type=float, help='true paremter 2')
-# data
-parser.add_argument('--N', default=100, type=int, help='training data size')
-parser.add_argument('--batchsize', default=10, type=int, help='batchsize')
-parser.add_argument('--epoch', default=1000, type=int, help='epoch num')
+parser = cli.make_parser('SGLD', visualize='visualize_sgld.png')
 # SGLD parameter
-parser.add_argument('--eps-start', default=0.05, type=float,
-                    help='start stepsize')
-parser.add_argument('--eps-end', default=0.01, type=float,
-                    help='end stepsize')
-# others
-parser.add_argument('--seed', default=0, type=int, help='random seed')
-parser.add_argument('--visualize', default='visualize_sgld.png', type=str,
-                    help='path to output file')
-args = parser.parse_args()
-
-
-n_batch = (args.N + args.batchsize - 1) // args.batchsize
-numpy.random.seed(args.seed)
-
-
-def update(theta, x, epoch, eps):
-    """One parameter-update step of SGLD
-
-    Args:
-        theta(numpy.ndarray): model parameeter
-        x(numpy.ndarray): sample data
-        epoch(int): current epoch index
-    Returns:
-        numpy.ndarray: updated parameter whose shape is
-        same as theta
-    """
-    d_theta = model.calc_grad(theta, x, args.N)
-    eta = numpy.random.randn() * numpy.sqrt(eps)
-    return theta + d_theta * eps / 2 + eta
-
-
-theta1_all = numpy.empty((args.epoch * n_batch,), dtype=numpy.float32)
-theta2_all = numpy.empty((args.epoch * n_batch,), dtype=numpy.float32)
-ssg = stepsize.StepSizeGenerator(args.epoch, args.eps_start, args.eps_end)
-theta = model.sample_from_prior()
-x = model.generate(args.N, args.theta1, args.theta2)
-for epoch in six.moves.range(args.epoch):
-    perm = numpy.random.permutation(args.N)
-    for i in six.moves.range(0, args.N, args.batchsize):
-        theta = update(theta, x[perm][i: i + args.batchsize],
-                       epoch, ssg(epoch))
+cli.add_schedule_arguments(parser, eps_start=0.05, eps_end=0.01)
 
-        theta1_all[epoch * n_batch + i // args.batchsize] = theta[0]
-        theta2_all[epoch * n_batch + i // args.batchsize] = theta[1]
-        if i == 0:
-            print(epoch, theta, theta[0] * 2 + theta[1])
 
-fig, axes = pyplot.subplots(ncols=1, nrows=1)
-plot.visualize2D(fig, axes, theta1_all, theta2_all,
-                 xlabel='theta1', ylabel='theta2',
-                 xlim=(-4, 4), ylim=(-4, 4))
-fig.savefig(args.visualize)
+if __name__ == '__main__':
+    args = parser.parse_args()
+    grad_backend = cli.setup(args)
+    sampler = samplers.SGLD(grad_backend=grad_backend)
+    cli.main(args, sampler, cli.make_schedule(args))
@@ -0,0 +1,256 @@
+"""Append-only sample traces
+
+A trace file consists of a header followed by raw samples::
+
+    MAGIC (8 bytes) | header length (uint32, little endian) | JSON header
+    | padding | sample 0 | sample 1 | ...
+
+The JSON header holds the shape and dtype of one sample, thinning and
+burn-in, and arbitrary run metadata. Samples are appended chunk by chunk,
+so memory usage of :class:`TraceWriter` is bounded by ``chunk_size``
+regardless of the run length, and :func:`open_trace` maps the file
+lazily with ``numpy.memmap``. Since the number of samples is derived from
+the file size, a trace of an interrupted run is still readable.
+"""
+
+import json
+import struct
+
+import numpy
+import six
+
+
+MAGIC = b'\x93SGTRACE'
+ALIGNMENT = 64
+
+
+class _Trace(object):
+    """Base class applying burn-in and thinning to appended samples
+
+    Args:
+        shape(tuple of ints): shape of one sample, e.g. ``(K, D)``
+        dtype: dtype of stored samples
+        thin(int): only every ``thin``-th sample after burn-in is kept
+        burnin(int): # of leading samples to discard
+    """
+
+    def __init__(self, shape, dtype=numpy.float32, thin=1, burnin=0):
+        self.shape = tuple(shape)
+        self.dtype = numpy.dtype(dtype)
+        self.thin = thin
+        self.burnin = burnin
+        self.n_seen = 0
+        self.n_stored = 0
+
+    def append(self, theta):
+        """Appends one sample, subject to burn-in and thinning"""
+
+        i = self.n_seen - self.burnin
+        self.n_seen += 1
+        if i < 0 or i % self.thin != 0:
+            return
+        self._store(theta)
+        self.n_stored += 1
+
+    def _store(self, theta):
+        raise NotImplementedError
+
+    def get_state(self):
+        """Returns state for checkpointing"""
+
+        return {'n_seen': self.n_seen, 'n_stored': self.n_stored}
+
+    def set_state(self, state):
+        """Restores state returned by :meth:`get_state`"""
+
+        self.n_seen = state['n_seen']
+        self.n_stored = state['n_stored']
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+class ArrayTrace(_Trace):
+    """Trace kept in a preallocated in-memory array
+
+    Args:
+        n(int): # of samples that will be appended (before burn-in
+        and thinning)
+    """
+
+    def __init__(self, n, shape, dtype=numpy.float32, thin=1, burnin=0):
+        super(ArrayTrace, self).__init__(shape, dtype, thin, burnin)
+        n_kept = max(0, n - burnin + thin - 1) // thin
+        self._data = numpy.empty((n_kept,) + self.shape, dtype=self.dtype)
+
+    def _store(self, theta):
+        self._data[self.n_stored] = theta
+
+    @property
+    def data(self):
+        """numpy.ndarray: stored samples of shape ``(n, ) + shape``"""
+
+        return self._data[:self.n_stored]
+
+    def get_state(self):
+        # stored rows are never written again while sampling, so the
+        # state shares them instead of copying the whole trace
+        state = super(ArrayTrace, self).get_state()
+        state['data'] = self.data
+        return state
+
+    def set_state(self, state):
+        super(ArrayTrace, self).set_state(state)
+        self._data[:self.n_stored] = state['data']
+
+
+class TraceWriter(_Trace):
+    """Trace streamed to a file in chunks
+
+    Args:
+        path(str): output file
+        shape(tuple of ints): shape of one sample
+        dtype: dtype of stored samples
+        thin(int): only every ``thin``-th sample after burn-in is kept
+        burnin(int): # of leading samples to discard
+        chunk_size(int): # of samples buffered before being written
+        metadata(dict): run metadata stored in the header. Values that
+        are not JSON-serializable are stored as their ``repr``
+        resume(bool): If true, the existing file is opened for appending
+        instead of being overwritten; :meth:`set_state` then discards
+        samples written after the checkpoint.
+    """
+
+    def __init__(self, path, shape, dtype=numpy.float32, thin=1, burnin=0,
+                 chunk_size=1024, metadata=None, resume=False):
+        super(TraceWriter, self).__init__(shape, dtype, thin, burnin)
+        self.path = path
+        self.metadata = dict(metadata or {})
+        self._buffer = numpy.empty((chunk_size,) + self.shape,
+                                   dtype=self.dtype)
+        self._n_buffered = 0
+        if resume:
+            self._offset = TraceReader(path).offset
+            self._file = open(path, 'r+b')
+            self._file.seek(0, 2)
+        else:
+            self._file = open(path, 'wb')
+            self._write_header()
+            self._offset = self._file.tell()
+
+    def _write_header(self):
+        header = json.dumps({
+            'shape': list(self.shape),
+            'dtype': self.dtype.str,
+            'thin': self.thin,
+            'burnin': self.burnin,
+            'metadata': self.metadata,
+        }, default=repr).encode('utf-8')
+        length = len(MAGIC) + 4 + len(header)
+        header += b' ' * (-length % ALIGNMENT)
+        self._file.write(MAGIC)
+        self._file.write(struct.pack('<I', len(header)))
+        self._file.write(header)
+
+    def _store(self, theta):
+        self._buffer[self._n_buffered] = theta
+        self._n_buffered += 1
+        if self._n_buffered == len(self._buffer):
+            self.flush()
+
+    def flush(self):
+        """Writes buffered samples to the file"""
+
+        if self._n_buffered:
+            self._file.write(self._buffer[:self._n_buffered].tobytes())
+            self._n_buffered = 0
+        self._file.flush()
+
+    def get_state(self):
+        # samples up to the checkpoint must be on disk
+        self.flush()
+        return super(TraceWriter, self).get_state()
+
+    def set_state(self, state):
+        super(TraceWriter, self).set_state(state)
+        self._n_buffered = 0
+        sample_size = self.dtype.itemsize * int(numpy.prod(self.shape))
+        self._file.truncate(self._offset + self.n_stored * sample_size)
+        self._file.seek(0, 2)
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+class TraceReader(object):
+    """Read-only view of a trace file
+
+    Samples are not loaded until accessed.
+
+    Attributes:
+        shape(tuple of ints): shape of one sample
+        dtype(numpy.dtype): dtype of samples
+        thin(int): thinning interval the trace was written with
+        burnin(int): burn-in the trace was written with
+        metadata(dict): run metadata
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError('not a trace file: {}'.format(path))
+            length, = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(length).decode('utf-8'))
+        self.offset = len(MAGIC) + 4 + length
+        self.shape = tuple(header['shape'])
+        self.dtype = numpy.dtype(header['dtype'])
+        self.thin = header['thin']
+        self.burnin = header['burnin']
+        self.metadata = header['metadata']
+        self._data = None
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def data(self):
+        """numpy.memmap: samples of shape ``(n, ) + shape``"""
+
+        if self._data is None:
+            sample_size = self.dtype.itemsize * int(numpy.prod(self.shape))
+            with open(self.path, 'rb') as f:
+                f.seek(0, 2)
+                n = (f.tell() - self.offset) // sample_size
+            if n == 0:
+                return numpy.empty((0,) + self.shape, dtype=self.dtype)
+            self._data = numpy.memmap(self.path, dtype=self.dtype, mode='r',
+                                      offset=self.offset,
+                                      shape=(n,) + self.shape)
+        return self._data
+
+    def iter_chunks(self, chunk_size=65536):
+        """Yields consecutive chunks of samples
+
+        Args:
+            chunk_size(int): # of samples per chunk
+        """
+
+        data = self.data
+        for i in six.moves.range(0, len(data), chunk_size):
+            yield data[i: i + chunk_size]
+
+
+def open_trace(path):
+    """Opens trace file written by :class:`TraceWriter`"""
+
+    return TraceReader(path)